@@ -0,0 +1,85 @@
+"""DataSaver 尺寸/颜色提取基准测试
+
+    python -m benchmarks.bench_attributes --count 50000
+
+对比逐模式 re.findall 的旧实现、单次扫描的逐行实现和按列批量实现，
+并校验三者的输出一致。
+"""
+import re
+import time
+import argparse
+
+from benchmarks.corpus import make_descriptions
+from data_saver import DataSaver
+
+
+# 旧实现：每个模式分别对完整描述执行 re.findall，作为基线和正确性参照
+_LEGACY_SIZE_PATTERNS = [
+    r'Size:?\s*((?:X?S|X?M|X?L|XXL|XXXL|2XL|3XL|4XL|5XL)(?:\s*,\s*(?:X?S|X?M|X?L|XXL|XXXL|2XL|3XL|4XL|5XL))*)',
+    r'Available sizes?:?\s*((?:\d+(?:\.\d+)?(?:\s*,\s*\d+(?:\.\d+)?)*))(?:\s*(?:cm|inch|inches|"|\'|mm))?',
+    r'Sizes?(?:\s+available)?:?\s*((?:Small|Medium|Large|X-Large|XX-Large)(?:\s*,\s*(?:Small|Medium|Large|X-Large|XX-Large))*)',
+]
+_LEGACY_COLOR_PATTERNS = [
+    r'Colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
+    r'Available colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
+]
+
+
+def _legacy_extract(description, patterns):
+    values = set()
+    if description and description != 'N/A':
+        for pattern in patterns:
+            for match in re.findall(pattern, description, re.IGNORECASE):
+                values.update(value.strip() for value in match.split(','))
+    return sorted(values)
+
+
+def legacy_columns(descriptions):
+    sizes = [','.join(_legacy_extract(d, _LEGACY_SIZE_PATTERNS)) for d in descriptions]
+    colors = [','.join(_legacy_extract(d, _LEGACY_COLOR_PATTERNS)) for d in descriptions]
+    return sizes, colors
+
+
+def per_row_columns(descriptions):
+    sizes = [','.join(DataSaver._extract_sizes(d)) for d in descriptions]
+    colors = [','.join(DataSaver._extract_colors(d)) for d in descriptions]
+    return sizes, colors
+
+
+def _timed(func, descriptions, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(descriptions)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50000, help='描述数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现的重复次数（取最快一次）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    descriptions = make_descriptions(args.count, seed=args.seed)
+    total_chars = sum(len(d) for d in descriptions)
+    print(f"Corpus: {len(descriptions)} descriptions, {total_chars / 1e6:.1f}M chars")
+
+    baseline_time, expected = _timed(legacy_columns, descriptions, args.repeat)
+    rows = [('legacy findall', baseline_time, True)]
+    for name, func in [('single-scan per row', per_row_columns),
+                       ('batched column', DataSaver.extract_attributes_batch)]:
+        elapsed, result = _timed(func, descriptions, args.repeat)
+        rows.append((name, elapsed, tuple(result) == tuple(expected)))
+
+    print(f"{'implementation':<22}{'total (s)':>12}{'per desc (us)':>16}{'speedup':>10}  matches")
+    for name, elapsed, matches in rows:
+        print(f"{name:<22}{elapsed:>12.3f}{elapsed / len(descriptions) * 1e6:>16.1f}"
+              f"{baseline_time / elapsed:>9.1f}x  {'yes' if matches else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
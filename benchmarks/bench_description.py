@@ -0,0 +1,159 @@
+"""商品描述规范化基准测试
+
+    python -m benchmarks.bench_description --count 20000 --json bench_description.json
+
+对比重构前的逐模式实现（原 AmazonScraper._clean_description_text 后接
+_filter_code_content，保留在本文件中作为参考）与 text_normalizer.normalize_description_text，
+在合成语料和边界用例上校验两者输出一致，并报告每段描述的处理耗时。
+"""
+import re
+import json
+import time
+import argparse
+import platform
+
+from benchmarks.corpus import make_raw_sections
+from text_normalizer import normalize_description_text
+
+
+# 手写的边界用例，覆盖各个过滤模式和标点规则
+EDGE_CASES = [
+    '',
+    '   \n\t  ',
+    'Read more',
+    'Scroll left/right to see more',
+    'Great value!!! Buy now.. Really?? Yes,, sure.',
+    'First line.\n\n\nSecond line!Third line?fourth',
+    'Visit https://example.com/help // support page',
+    'Call document.write(x); then window.open(y); done',
+    'Hassle-free 30 day return policy',
+    'Size: S, M, L. Colors: Red, Blue.',
+    'Ünïcödé ★ text — with – dashes / slashes ® and ™ marks.',
+    'var x = 1; function() { return x; }',
+    'Price: $19.99 (20% off) & free shipping #1 seller',
+    'Item Weight ‏ : ‎ 1.2 pounds\xa0\xa0Dimensions',
+]
+
+
+# 重构前的描述清理：依次应用的模式
+_REFERENCE_USELESS_PATTERNS = [
+    r'Read more',
+    r'Show more',
+    r'See more',
+    r'Click to open expanded view',
+    r'Scroll left/right to see more',
+    r'Roll over image to zoom in',
+]
+_REFERENCE_CODE_PATTERNS = [
+    r'<script[\s\S]*?</script>',
+    r'<style[\s\S]*?</style>',
+    r'function\s*\w*\s*\{[\s\S]*?\}',
+    r'var\s+\w+\s*=',
+    r'\.[\w-]+\s*\{[^}]*\}',
+    r'/\*[\s\S]*?\*/',
+    r'//.*',
+    r'console\.log\(.*?\)',
+    r'document\..*?;',
+    r'window\..*?;',
+    r'\$\(.*?\)',
+]
+_REFERENCE_CODE_INDICATORS = [
+    'function(', 'return', 'var ', 'let ', 'const ', '=>',
+    '{', '}', ';', 'if(', 'for(', 'while('
+]
+
+
+def _reference_clean(text):
+    """原 AmazonScraper._clean_description_text"""
+    if not text:
+        return None
+    text = text.strip()
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n\s*\n*', '\n\n', text)
+    text = re.sub(r'[^\w\s.,;:!?()\'"\-–—/\n]', '', text)
+    text = re.sub(r'([.,!?])\1+', r'\1', text)
+    text = re.sub(r'([.!?])\s*(\w)', r'\1\n\2', text)
+    for pattern in _REFERENCE_USELESS_PATTERNS:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    text = text.strip()
+    return text if text else None
+
+
+def _reference_filter_code(text):
+    """原 AmazonScraper._filter_code_content"""
+    if not text:
+        return None
+    for pattern in _REFERENCE_CODE_PATTERNS:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.MULTILINE)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    text = '\n'.join(lines)
+    if any(indicator in text for indicator in _REFERENCE_CODE_INDICATORS):
+        return None
+    return text.strip() if text else None
+
+
+def reference_normalize(text):
+    """重构前的逐模式实现"""
+    return _reference_filter_code(_reference_clean(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000, help='描述段落数量')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快一次）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='将结果写入JSON文件，便于对比多次运行')
+    args = parser.parse_args()
+
+    sections = [section['content'] for section in make_raw_sections(args.count, seed=args.seed)]
+    corpus = EDGE_CASES + sections
+    total_chars = sum(len(text) for text in corpus)
+    print(f"Corpus: {len(corpus)} sections, {total_chars / 1e6:.1f}M chars")
+
+    expected = [reference_normalize(text) for text in corpus]
+    actual = [normalize_description_text(text) for text in corpus]
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    print(f"Golden corpus check: {len(corpus) - len(mismatches)}/{len(corpus)} identical")
+    for i in mismatches[:5]:
+        print(f"  mismatch #{i}: {corpus[i][:80]!r}")
+
+    results = {}
+    for name, func in [('chained regex', reference_normalize),
+                       ('single pass', normalize_description_text)]:
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for text in corpus:
+                func(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {
+            'total_seconds': best,
+            'per_section_us': best / len(corpus) * 1e6,
+            'per_kchar_us': best / total_chars * 1e9,
+        }
+
+    baseline = results['chained regex']['total_seconds']
+    print(f"{'implementation':<16}{'total (s)':>12}{'per section (us)':>20}{'per 1k chars (us)':>20}{'speedup':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['total_seconds']:>12.3f}{result['per_section_us']:>20.1f}"
+              f"{result['per_kchar_us']:>20.2f}{baseline / result['total_seconds']:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'benchmark': 'description_normalizer',
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'sections': len(corpus),
+                'chars': total_chars,
+                'mismatches': len(mismatches),
+                'results': results,
+            }, fp, indent=2)
+        print(f"Results written to {args.json}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+"""离线端到端吞吐量基准测试（需要本机安装 Chrome，Linux）
+
+    python -m benchmarks.bench_e2e --workers 1 2 4 --terms 8 --products 10 --latency 0.1
+    python -m benchmarks.bench_e2e --workers 4 --throttle-rate 0.05 --json bench_e2e.json
+
+启动 fake_amazon 模拟站点，对每个 MAX_WORKERS 设置在独立的临时目录中
+以子进程运行 main.py（通过 SCRAPER_* 环境变量指向模拟站点、关闭VPN和
+随机等待），运行期间从 /proc 采样进程树。报告每分钟页面数、每个商品的
+p50/p95 耗时（来自运行写出的指标文件），以及每个采集进程（含其启动的
+chromedriver 和 Chrome）的CPU时间和内存峰值。
+"""
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+from benchmarks.fake_amazon import FakeAmazonServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _read_stat(pid):
+    """读取 /proc/<pid>/stat，返回 (父进程, CPU秒数, RSS字节)，进程已退出时返回None"""
+    try:
+        with open(f'/proc/{pid}/stat') as fp:
+            fields = fp.read().rsplit(')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS, int(fields[21]) * _PAGE_SIZE
+
+
+class ProcessTreeSampler:
+    """定期采样 main.py 子进程的进程树，按采集进程分组统计CPU时间和内存
+
+    main.py 的直接子进程为进程池的采集进程，采集进程的所有后代
+    （chromedriver、Chrome）计入该进程。已退出进程的CPU时间为最后一次采样的值。
+    """
+
+    def __init__(self, root_pid):
+        self.root_pid = root_pid
+        self.cpu = {}       # pid -> 最近一次的CPU秒数
+        self.group_of = {}  # pid -> 所属采集进程的pid（主进程为 root_pid）
+        self.peak_rss = {}  # 采集进程pid -> 进程组内存峰值（字节）
+        self.worker_rss = {}  # 采集进程pid -> 采集进程本身的内存峰值（字节）
+
+    def sample(self):
+        stats = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                stat = _read_stat(int(entry))
+                if stat:
+                    stats[int(entry)] = stat
+
+        # 从根进程向下确定每个进程所属的组
+        children = {}
+        for pid, (ppid, _, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+        stack = [(self.root_pid, self.root_pid)]
+        group_rss = {}
+        while stack:
+            pid, group = stack.pop()
+            if pid not in stats:
+                continue
+            _, cpu, rss = stats[pid]
+            self.cpu[pid] = cpu
+            self.group_of[pid] = group
+            group_rss[group] = group_rss.get(group, 0) + rss
+            if pid == group:
+                self.worker_rss[group] = max(self.worker_rss.get(group, 0), rss)
+            for child in children.get(pid, []):
+                stack.append((child, child if pid == self.root_pid else group))
+
+        for group, rss in group_rss.items():
+            self.peak_rss[group] = max(self.peak_rss.get(group, 0), rss)
+
+    def report(self):
+        """每个进程组的CPU时间和内存峰值，主进程排在最前"""
+        cpu_by_group = {}
+        for pid, cpu in self.cpu.items():
+            group = self.group_of[pid]
+            cpu_by_group[group] = cpu_by_group.get(group, 0.0) + cpu
+        groups = sorted(cpu_by_group, key=lambda group: (group != self.root_pid, group))
+        return [{
+            'pid': group,
+            'role': 'main' if group == self.root_pid else 'worker',
+            'cpu_seconds': round(cpu_by_group[group], 2),
+            'peak_rss_mb': round(self.peak_rss.get(group, 0) / 1024 / 1024, 1),
+            'python_rss_mb': round(self.worker_rss.get(group, 0) / 1024 / 1024, 1),
+        } for group in groups]
+
+
+def _quantiles(run_dir, stage):
+    """从运行写出的指标文件中读取某阶段的次数和分位数"""
+    files = sorted(glob.glob(os.path.join(run_dir, 'metrics', 'metrics_*.json')))
+    if not files:
+        return {}, {}
+    with open(files[-1], encoding='utf-8') as fp:
+        data = json.load(fp)
+    return data.get('stages', {}).get(stage, {}), data.get('counters', {})
+
+
+def run_once(server, workers, terms, args):
+    """以指定的 MAX_WORKERS 运行一次 main.py，返回统计结果"""
+    run_dir = tempfile.mkdtemp(prefix=f'bench_e2e_w{workers}_')
+    env = dict(os.environ,
+               PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               SCRAPER_BASE_URL=server.base_url,
+               SCRAPER_MAX_WORKERS=str(workers),
+               SCRAPER_MAX_PRODUCTS_PER_CATEGORY=str(args.products),
+               SCRAPER_MIN_SLEEP=str(args.sleep),
+               SCRAPER_MAX_SLEEP=str(args.sleep),
+               SCRAPER_HEADLESS='true',
+               SCRAPER_VPN_ENABLED='false',
+               SCRAPER_METRICS_FLUSH_INTERVAL='0')
+
+    before = server.snapshot()
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with open(os.path.join(run_dir, 'run.log'), 'w', encoding='utf-8') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'main.py'), *terms],
+                                   cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        sampler = ProcessTreeSampler(process.pid)
+        while process.poll() is None:
+            sampler.sample()
+            time.sleep(args.sample_interval)
+    wall = time.perf_counter() - start
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    after = server.snapshot()
+
+    served = {key: after[key] - before[key] for key in after}
+    product_stats, counters = _quantiles(run_dir, 'product')
+    pages = served['search'] + served['product']
+    return {
+        'workers': workers,
+        'exit_code': process.returncode,
+        'wall_seconds': round(wall, 2),
+        'pages': pages,
+        'pages_per_min': round(pages / wall * 60, 1) if wall else None,
+        'throttled': served['throttled'],
+        'products_extracted': counters.get('products_extracted', 0),
+        'product_p50_seconds': product_stats.get('p50_seconds'),
+        'product_p95_seconds': product_stats.get('p95_seconds'),
+        'cpu_seconds_total': round(usage_after.ru_utime + usage_after.ru_stime
+                                   - usage_before.ru_utime - usage_before.ru_stime, 2),
+        'processes': sampler.report(),
+        'run_dir': run_dir,
+    }
+
+
+def _format_seconds(value):
+    return f"{value:.2f}" if value is not None else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='要对比的 MAX_WORKERS 取值')
+    parser.add_argument('--terms', type=int, default=4, help='搜索关键词数量（每个关键词一个采集任务）')
+    parser.add_argument('--products', type=int, default=10, help='每个关键词采集的商品数量')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟站点每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.05, help='在固定延迟上增加的随机延迟上限（秒）')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回限流页面的请求比例')
+    parser.add_argument('--sleep', type=float, default=0.0, help='采集中的随机等待（MIN_SLEEP/MAX_SLEEP）')
+    parser.add_argument('--pages-dir', help='录制页面目录，未指定时使用生成的页面')
+    parser.add_argument('--sample-interval', type=float, default=0.5, help='进程树采样间隔（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='将结果写入JSON文件，便于对比多次运行')
+    args = parser.parse_args()
+
+    if not os.path.isdir('/proc'):
+        parser.error('process sampling requires Linux /proc')
+
+    terms = [f"benchmark term {i}" for i in range(args.terms)]
+    results = []
+    with FakeAmazonServer(args.pages_dir, args.latency, args.jitter, args.throttle_rate, seed=args.seed) as server:
+        for workers in args.workers:
+            print(f"Running with MAX_WORKERS={workers} against {server.base_url} ...", flush=True)
+            results.append(run_once(server, workers, terms, args))
+
+    print(f"\n{'workers':>8}{'wall (s)':>10}{'pages':>8}{'pages/min':>11}{'p50 (s)':>9}{'p95 (s)':>9}"
+          f"{'throttled':>11}{'cpu (s)':>9}")
+    for result in results:
+        print(f"{result['workers']:>8}{result['wall_seconds']:>10.2f}{result['pages']:>8}"
+              f"{result['pages_per_min']:>11.1f}{_format_seconds(result['product_p50_seconds']):>9}"
+              f"{_format_seconds(result['product_p95_seconds']):>9}{result['throttled']:>11}"
+              f"{result['cpu_seconds_total']:>9.2f}")
+
+    for result in results:
+        print(f"\nMAX_WORKERS={result['workers']} (exit code {result['exit_code']}, logs in {result['run_dir']})")
+        print(f"{'process':>10}{'pid':>9}{'cpu (s)':>10}{'peak rss incl. browser (MB)':>30}{'python rss (MB)':>17}")
+        for process in result['processes']:
+            print(f"{process['role']:>10}{process['pid']:>9}{process['cpu_seconds']:>10.2f}"
+                  f"{process['peak_rss_mb']:>30.1f}{process['python_rss_mb']:>17.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({'platform': platform.platform(), 'python': platform.python_version(),
+                       'args': vars(args), 'results': results}, fp, indent=2)
+
+    return 0 if all(result['exit_code'] == 0 for result in results) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+"""纯Python热点函数的微基准测试（无需浏览器）
+
+    python -m benchmarks.bench_hotpaths --sizes 1000 100000 --json hotpaths.json
+    python -m benchmarks.bench_hotpaths --sizes 1000 100000 1000000 --baseline hotpaths.json
+
+对每个规模的合成语料（商品、原始描述段落、价格文本、品牌参数）分别计时：
+描述清理、价格解析、品牌规范化、尺寸颜色提取、DataSaver.build_dataframe /
+save_to_excel、try_read_csv 和 process_excel。计时取多次运行中最快的一次，再单独运行一次用 tracemalloc
+记录内存峰值。结果写入JSON，指定 --baseline 时与之前的结果对比，耗时增加
+超过阈值的项目视为性能回退，返回码为1。
+"""
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from benchmarks.corpus import make_products, make_raw_sections, make_price_text, make_brand_input
+from data_saver import DataSaver
+from finalExcel import try_read_csv, process_excel
+from logger import LOG_NAME
+from text_normalizer import (normalize_description_text, build_description, clean_price_text, build_price_info,
+                             normalize_brand)
+
+# 耗时低于该值的项目不参与回退判断，避免计时误差造成误报
+NOISE_FLOOR_SECONDS = 0.01
+
+
+def _tile(items, count):
+    """将较小的语料重复到指定数量"""
+    return [items[i % len(items)] for i in range(count)]
+
+
+class Corpus:
+    """一个规模的全部输入数据，各项在第一次使用时生成"""
+
+    def __init__(self, size, seed, unique, work_dir):
+        self.size = size
+        self.seed = seed
+        self.unique = unique
+        self.work_dir = work_dir
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def products(self):
+        return self._get('products', lambda: make_products(self.size, self.seed, self.unique))
+
+    @property
+    def raw_sections(self):
+        return self._get('raw_sections', lambda: _tile(
+            make_raw_sections(min(self.size, self.unique), self.seed), self.size))
+
+    @property
+    def section_groups(self):
+        """每个商品的原始描述段落（build_description 的输入）"""
+        def build():
+            rng = random.Random(self.seed)
+            sections = self.raw_sections
+            return [rng.sample(sections[:min(len(sections), 1000)], rng.randint(1, 4)) for _ in range(self.size)]
+        return self._get('section_groups', build)
+
+    @property
+    def price_texts(self):
+        def build():
+            rng = random.Random(self.seed)
+            return [make_price_text(rng) for _ in range(self.size)]
+        return self._get('price_texts', build)
+
+    @property
+    def raw_prices(self):
+        def build():
+            texts = self.price_texts
+            return [{'current': texts[i], 'original': texts[-i - 1], 'savings': None, 'page_source': ''}
+                    for i in range(self.size)]
+        return self._get('raw_prices', build)
+
+    @property
+    def brand_inputs(self):
+        def build():
+            rng = random.Random(self.seed)
+            return [make_brand_input(rng) for _ in range(self.size)]
+        return self._get('brand_inputs', build)
+
+    @property
+    def dataframe(self):
+        return self._get('dataframe', lambda: DataSaver.build_dataframe(self.products))
+
+    @property
+    def csv_path(self):
+        return self._get('csv_path', lambda: DataSaver.save_dataframe(self.dataframe, f"bench_{self.size}"))
+
+    def release(self):
+        self._cache.clear()
+
+
+# 名称 -> 根据语料返回待计时的无参函数（语料生成不计入耗时）
+CASES = {
+    'normalize_description_text': lambda c: (
+        lambda sections=c.raw_sections: [normalize_description_text(section['content']) for section in sections]),
+    'build_description': lambda c: (
+        lambda groups=c.section_groups: [build_description(sections) for sections in groups]),
+    'clean_price_text': lambda c: (
+        lambda texts=c.price_texts: [clean_price_text(text) for text in texts]),
+    'build_price_info': lambda c: (
+        lambda prices=c.raw_prices: [build_price_info(price) for price in prices]),
+    'normalize_brand': lambda c: (
+        lambda inputs=c.brand_inputs: [normalize_brand(*args) for args in inputs]),
+    'DataSaver.extract_attributes_batch': lambda c: (
+        lambda products=c.products: DataSaver.extract_attributes_batch([p.description for p in products])),
+    'DataSaver.build_dataframe': lambda c: (
+        lambda products=c.products: DataSaver.build_dataframe(products)),
+    'DataSaver.save_to_excel': lambda c: (
+        lambda products=c.products: DataSaver.save_to_excel(products, f"bench_{c.size}")),
+    'try_read_csv': lambda c: (
+        lambda path=c.csv_path: try_read_csv(path)),
+    'process_excel': lambda c: (
+        lambda df=c.dataframe: process_excel(df, os.path.join(c.work_dir, 'output_excel'))),
+}
+
+
+def _time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _peak_memory(func):
+    """单独运行一次，返回运行期间新增内存的峰值（MiB）"""
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - baseline) / 1024 / 1024
+
+
+def compare(results, baseline_path, threshold):
+    """与之前的结果对比，返回回退的项目列表"""
+    with open(baseline_path, encoding='utf-8') as fp:
+        baseline = {(r['case'], r['size']): r for r in json.load(fp)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['case'], result['size']))
+        if not previous:
+            continue
+        result['baseline_seconds'] = previous['seconds']
+        result['change'] = result['seconds'] / previous['seconds'] - 1 if previous['seconds'] else None
+        if result['change'] is not None and result['change'] > threshold \
+                and result['seconds'] >= NOISE_FLOOR_SECONDS:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000],
+                        help='语料规模（行数），100万行需要数GB磁盘空间和较长时间')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help='只运行指定的项目')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快一次），10万行及以上只运行一次')
+    parser.add_argument('--unique', type=int, default=50000, help='不同商品的最大数量，其余行复用')
+    parser.add_argument('--no-memory', action='store_true', help='不记录内存峰值')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='将结果写入JSON文件')
+    parser.add_argument('--baseline', help='之前的JSON结果，用于检查性能回退')
+    parser.add_argument('--threshold', type=float, default=0.2, help='耗时增加超过该比例视为回退')
+    args = parser.parse_args()
+
+    # 被测函数会输出大量INFO日志
+    logging.getLogger(LOG_NAME).setLevel(logging.WARNING)
+    cases = args.cases or list(CASES)
+    results = []
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix='bench_hotpaths_') as work_dir:
+        # 输出文件和ID映射数据库都写入临时目录
+        os.chdir(work_dir)
+        try:
+            for size in args.sizes:
+                corpus = Corpus(size, args.seed, args.unique, work_dir)
+                repeat = args.repeat if size < 100000 else 1
+                for name in cases:
+                    func = CASES[name](corpus)
+                    seconds = _time(func, repeat)
+                    peak = None if args.no_memory else _peak_memory(func)
+                    results.append({
+                        'case': name,
+                        'size': size,
+                        'seconds': seconds,
+                        'per_row_us': seconds / size * 1e6,
+                        'rows_per_second': size / seconds if seconds else None,
+                        'peak_mib': peak,
+                    })
+                    memory = f"{peak:>10.1f}" if peak is not None else f"{'-':>10}"
+                    print(f"{size:>9} {name:<36}{seconds:>10.3f}s{seconds / size * 1e6:>12.2f} us/row{memory} MiB",
+                          flush=True)
+                corpus.release()
+        finally:
+            os.chdir(original_cwd)
+
+    regressions = compare(results, args.baseline, args.threshold) if args.baseline else []
+    if args.baseline:
+        print(f"\nCompared with {args.baseline} (threshold +{args.threshold:.0%}):")
+        for result in results:
+            if result.get('change') is not None:
+                flag = '  REGRESSION' if result in regressions else ''
+                print(f"{result['size']:>9} {result['case']:<36}{result['baseline_seconds']:>10.3f}s -> "
+                      f"{result['seconds']:.3f}s ({result['change']:+.1%}){flag}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'benchmark': 'hotpaths',
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'results': results,
+            }, fp, indent=2)
+        print(f"Results written to {args.json}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""图片下载流水线基准测试（本地HTTP服务，无需访问网络）
+
+    python -m benchmarks.bench_images --images 200 --latency 0.05
+
+启动一个模拟图片CDN的本地HTTP服务（可设置每个请求的延迟和重复图片
+比例），对比逐张顺序下载与 ImagePipeline 线程池下载的耗时，并校验
+内容去重和下载清单。
+"""
+import os
+import io
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import importlib.util
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from image_pipeline import ImagePipeline
+
+
+def make_image(rng, size=32 * 1024):
+    """生成一张图片；安装了 Pillow 时生成真实的PNG，否则生成带JPEG文件头的随机数据"""
+    if importlib.util.find_spec('PIL') is not None:
+        from PIL import Image
+        image = Image.new('RGB', (256, 256), tuple(rng.randrange(256) for _ in range(3)))
+        output = io.BytesIO()
+        image.save(output, format='PNG')
+        return output.getvalue()
+    return b'\xff\xd8\xff\xe0' + rng.randbytes(size)
+
+
+class ImageServer:
+    """模拟图片CDN：/images/<n>.jpg 返回第 n 张图片，部分路径返回相同内容"""
+
+    def __init__(self, images, latency=0.0):
+        self.images = images
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                try:
+                    index = int(self.path.rsplit('/', 1)[-1].split('.')[0])
+                    body = server.images[index]
+                except (ValueError, IndexError):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def sequential_download(urls):
+    """逐张下载，相当于WooCommerce导入时按顺序抓取图片"""
+    for url in urls:
+        with urllib.request.urlopen(url, timeout=20) as response:
+            response.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=200, help='图片URL数量')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.2, help='内容重复的图片比例')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的模拟延迟（秒）')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    unique = [make_image(rng) for _ in range(max(1, int(args.images * (1 - args.duplicate_ratio))))]
+    images = unique + [rng.choice(unique) for _ in range(args.images - len(unique))]
+
+    with ImageServer(images, args.latency) as server:
+        urls = [f"{server.base_url}/images/{i}.jpg" for i in range(len(images))]
+
+        start = time.perf_counter()
+        sequential_download(urls)
+        sequential_time = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as media_dir:
+            start = time.perf_counter()
+            pipeline = ImagePipeline(media_dir, workers=args.workers)
+            for i, url in enumerate(urls):
+                pipeline.submit(url, sku=f"SKU{i}")
+            pipeline.close()
+            pipeline_time = time.perf_counter() - start
+
+            files = [name for name in os.listdir(media_dir) if name != ImagePipeline.MANIFEST_NAME]
+            with open(os.path.join(media_dir, ImagePipeline.MANIFEST_NAME), encoding='utf-8') as fp:
+                manifest = [json.loads(line) for line in fp]
+
+            # 再次运行时全部命中清单，不发起请求
+            requests_before = server.requests
+            pipeline = ImagePipeline(media_dir, workers=args.workers)
+            for url in urls:
+                pipeline.submit(url)
+            pipeline.close()
+            rerun_requests = server.requests - requests_before
+
+    expected_files = len(set(images))
+    print(f"{'mode':<22}{'total (s)':>12}{'images/s':>12}")
+    print(f"{'sequential':<22}{sequential_time:>12.2f}{len(urls) / sequential_time:>12.1f}")
+    print(f"{f'pipeline ({args.workers} workers)':<22}{pipeline_time:>12.2f}{len(urls) / pipeline_time:>12.1f}")
+    print(f"Speedup: {sequential_time / pipeline_time:.1f}x")
+    print(f"Files written: {len(files)} (expected {expected_files} unique), manifest entries: {len(manifest)}")
+    print(f"Requests on re-run: {rerun_requests}")
+
+    ok = len(files) == expected_files and len(manifest) == len(urls) and rerun_requests == 0
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
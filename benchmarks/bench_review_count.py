@@ -0,0 +1,144 @@
+"""评分/评论数提取基准测试（需要本机安装 Chrome）
+
+    python -m benchmarks.bench_review_count --pages 20 --json bench_review_count.json
+
+在本地生成的合成商品页上对比旧实现（读取整个 body 文本后正则扫描、
+评分逐个查找元素）与 AmazonScraper._get_review_summary 的单次查询，
+报告每个商品的耗时、通过 WebDriver 传输的字符数，并校验提取结果。
+"""
+import re
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from benchmarks.corpus import make_product_page
+from scraper import AmazonScraper
+
+
+def legacy_review_count(driver):
+    """旧实现：序列化整个页面文本后取第一个 'ratings' 匹配"""
+    page_text = driver.find_element(By.TAG_NAME, 'body').text
+    matches = re.findall(r'(\d+(?:,\d+)?)\s*(?:[^\d\n]*\s+)?ratings?', page_text)
+    return (int(matches[0].replace(',', '')) if matches else 'N/A'), len(page_text)
+
+
+def legacy_rating(driver):
+    """旧实现：先查星级类名，再查 .a-icon-alt 文本"""
+    elements = driver.find_elements(By.CSS_SELECTOR, "[class*='a-size-base a-color-base']")
+    if elements:
+        star_match = re.search(r'a-star-(\d-\d|\d)', elements[0].get_attribute('class'))
+        if star_match:
+            return float(star_match.group(1).replace('-', '.'))
+    elements = driver.find_elements(By.CSS_SELECTOR, '.a-icon-alt')
+    if elements:
+        rating_match = re.search(r'([\d.]+) out of 5', elements[0].get_attribute('textContent'))
+        if rating_match:
+            return float(rating_match.group(1))
+    return 'N/A'
+
+
+def make_pages(count, seed, out_dir):
+    """生成商品页并返回 (路径, 期望评分, 期望评论数) 列表"""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        rating = rng.choice(['3.5', '4', '4.2', '4.5', '4.7'])
+        # 包含超过百万的评论数，旧正则会截断为后两组数字
+        review_count = rng.choice([rng.randint(1, 999), rng.randint(1000, 99999), rng.randint(1000000, 3000000)])
+        path = Path(out_dir) / f'product_{i}.html'
+        path.write_text(make_product_page(rng, rating, review_count, review_node=i % 5 != 4), encoding='utf-8')
+        pages.append((path, float(rating), review_count))
+    return pages
+
+
+def _timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help='商品页数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每个页面的重复次数（取最快一次）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='将结果写入JSON文件，便于对比多次运行')
+    args = parser.parse_args()
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--window-size=1920,1080')
+    driver = webdriver.Chrome(options=options)
+
+    # 只需要 driver，不走 DriverManager 的反检测初始化
+    scraper = AmazonScraper.__new__(AmazonScraper)
+    scraper.driver = driver
+
+    totals = {'legacy': 0.0, 'targeted': 0.0}
+    transferred = {'legacy': 0, 'targeted': 0}
+    correct = {'legacy': 0, 'targeted': 0}
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pages = make_pages(args.pages, args.seed, tmp_dir)
+            for path, rating, review_count in pages:
+                driver.get(path.as_uri())
+
+                elapsed, (legacy_value, (legacy_count, chars)) = _timed(
+                    lambda: (legacy_rating(driver), legacy_review_count(driver)), args.repeat)
+                totals['legacy'] += elapsed
+                transferred['legacy'] += chars
+                correct['legacy'] += (legacy_value, legacy_count) == (rating, review_count)
+
+                elapsed, summary = _timed(scraper._get_review_summary, args.repeat)
+                totals['targeted'] += elapsed
+                raw = driver.execute_script(AmazonScraper._REVIEW_SUMMARY_SCRIPT, 2000)
+                transferred['targeted'] += len(json.dumps(raw))
+                correct['targeted'] += (summary['rating'], summary['review_count']) == (rating, review_count)
+    finally:
+        driver.quit()
+
+    results = {
+        name: {
+            'per_product_ms': totals[name] / args.pages * 1e3,
+            'chars_per_product': transferred[name] / args.pages,
+            'correct': correct[name],
+        }
+        for name in totals
+    }
+    print(f"{'implementation':<16}{'per product (ms)':>18}{'chars transferred':>20}{'correct':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['per_product_ms']:>18.2f}{result['chars_per_product']:>20.0f}"
+              f"{result['correct']:>7}/{args.pages}")
+    saved = results['legacy']['per_product_ms'] - results['targeted']['per_product_ms']
+    print(f"Time saved per product: {saved:.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'benchmark': 'review_count',
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'os': platform.platform(),
+                'pages': args.pages,
+                'saved_ms_per_product': saved,
+                'results': results,
+            }, fp, indent=2)
+        print(f"Results written to {args.json}")
+
+    return 0 if correct['targeted'] == args.pages else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+"""启动耗时基准测试：窗口出现的时间和第一个采集进程就绪的时间
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --workers 4 --methods forkserver spawn --repeat 5 --json startup.json
+
+每次测量都在新的解释器中进行（临时目录，使用默认配置），计时从启动子进程开始：
+  - window：导入 main_window 并显示 ConfigWindow（未安装 PySide6 时只导入它依赖的
+    项目模块），同时列出此时已加载的重型依赖
+  - eager：导入 main 和采集进程需要的全部模块，即窗口原先启动时的导入量，作为对比
+  - workers：按指定启动方式创建进程池（与 ParallelScraper 相同的 initializer），
+    每个采集进程导入采集模块后报告就绪，记录第一个和全部进程就绪的时间
+结果取多次运行的中位数。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['PySide6', 'pandas', 'selenium', 'undetected_chromedriver', 'fake_useragent', 'tqdm', 'scraper']
+
+
+def _heavy_loaded():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def _child_window(start):
+    if importlib.util.find_spec('PySide6') is None:
+        import config, logger, parallel_scraper, progress  # noqa: F401  main_window 导入的项目模块
+        return {'ready': time.time() - start, 'gui': False, 'loaded': _heavy_loaded()}
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    from main_window import ConfigWindow
+    app = QApplication([])
+    window = ConfigWindow()
+    window.show()
+    app.processEvents()
+    return {'ready': time.time() - start, 'gui': True, 'loaded': _heavy_loaded()}
+
+
+def _child_eager(start):
+    from parallel_scraper import WORKER_PRELOAD
+    errors = []
+    for name in ['main', *WORKER_PRELOAD]:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            errors.append(f"{name}: {e}")
+    return {'ready': time.time() - start, 'loaded': _heavy_loaded(), 'errors': errors}
+
+
+def _worker_ready(_):
+    """在采集进程中导入启动浏览器前需要的模块，返回就绪时间"""
+    from parallel_scraper import WORKER_PRELOAD
+    missing = []
+    for name in WORKER_PRELOAD:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            missing.append(name)
+    ready = time.time()
+    time.sleep(0.2)  # 让任务分散到不同的进程
+    return os.getpid(), ready, missing
+
+
+def _child_workers(start, method, workers):
+    import profiling
+    from logger import get_log_queue
+    from parallel_scraper import ParallelScraper, get_mp_context
+    context = get_mp_context(method)
+    pool_start = time.time()
+    with context.Pool(workers, initializer=ParallelScraper.init_worker,
+                      initargs=(get_log_queue(context), profiling.settings())) as pool:
+        ready = pool.map(_worker_ready, range(workers), chunksize=1)
+    times = [ready_time - pool_start for _, ready_time, _ in ready]
+    return {
+        'method': context.get_start_method(),
+        'first_ready': min(times),
+        'all_ready': max(times),
+        'processes': len({pid for pid, _, _ in ready}),
+        'missing': sorted({name for _, _, missing in ready for name in missing}),
+        'interpreter_ready': pool_start - start,
+    }
+
+
+def _run_child(args, work_dir):
+    """在新的解释器中运行一次测量，返回其JSON结果"""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.time()
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', *args, '--start', str(start)],
+                            cwd=work_dir, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def _median(runs, key):
+    return statistics.median(run[key] for run in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='进程池大小')
+    parser.add_argument('--methods', nargs='+', default=['auto', 'fork', 'forkserver', 'spawn'],
+                        help='要对比的启动方式（auto 为 WORKER_START_METHOD 的默认行为）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项测量的次数（取中位数）')
+    parser.add_argument('--json', help='将结果写入JSON文件')
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    parser.add_argument('--start', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind = args.child[0]
+        if kind == 'window':
+            result = _child_window(args.start)
+        elif kind == 'eager':
+            result = _child_eager(args.start)
+        else:
+            result = _child_workers(args.start, args.child[1], int(args.child[2]))
+        print(json.dumps(result))
+        return 0
+
+    import multiprocessing as mp
+    methods = [method for method in args.methods if method == 'auto' or method in mp.get_all_start_methods()]
+    results = {'window': None, 'eager': None, 'workers': []}
+
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as work_dir:
+        window_runs = [_run_child(['window'], work_dir) for _ in range(args.repeat)]
+        eager_runs = [_run_child(['eager'], work_dir) for _ in range(args.repeat)]
+        results['window'] = {'seconds': _median(window_runs, 'ready'), 'gui': window_runs[0]['gui'],
+                             'loaded': window_runs[0]['loaded']}
+        results['eager'] = {'seconds': _median(eager_runs, 'ready'), 'loaded': eager_runs[0]['loaded'],
+                            'errors': eager_runs[0]['errors']}
+        for method in methods:
+            print(f"Measuring {method} pool with {args.workers} workers ...", flush=True)
+            runs = [_run_child(['workers', method, str(args.workers)], work_dir) for _ in range(args.repeat)]
+            results['workers'].append({
+                'requested': method,
+                'method': runs[0]['method'],
+                'first_ready_seconds': _median(runs, 'first_ready'),
+                'all_ready_seconds': _median(runs, 'all_ready'),
+                'processes': runs[0]['processes'],
+                'missing': runs[0]['missing'],
+            })
+
+    window, eager = results['window'], results['eager']
+    label = 'main_window shown' if window['gui'] else 'main_window imports (PySide6 not installed)'
+    print(f"\n{'time to window':<28}{window['seconds']:>8.3f}s  {label}, loaded: {', '.join(window['loaded']) or '-'}")
+    print(f"{'eager import (reference)':<28}{eager['seconds']:>8.3f}s  main + worker modules, "
+          f"loaded: {', '.join(eager['loaded']) or '-'}")
+    for error in eager['errors']:
+        print(f"{'':<38}not importable here: {error}")
+
+    print(f"\n{'start method':<22}{'first worker (s)':>18}{'all workers (s)':>17}{'processes':>11}")
+    for result in results['workers']:
+        name = result['method'] if result['requested'] != 'auto' else f"auto ({result['method']})"
+        print(f"{name:<22}{result['first_ready_seconds']:>18.3f}{result['all_ready_seconds']:>17.3f}"
+              f"{result['processes']:>11}")
+    missing = sorted({name for result in results['workers'] for name in result['missing']})
+    if missing:
+        print(f"\nWorker modules not importable here (excluded from timings): {', '.join(missing)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({'platform': platform.platform(), 'python': platform.python_version(),
+                       'args': vars(args), 'results': results}, fp, indent=2)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,298 @@
+import json
+import random
+
+from text_normalizer import empty_price_info
+from product_record import ProductRecord
+
+# 生成与 AmazonScraper._get_product_description 输出形状相近的合成描述
+
+_WORDS = (
+    "premium durable lightweight breathable waterproof comfortable classic modern soft "
+    "stainless steel cotton leather wireless portable rechargeable battery compact design "
+    "easy to clean machine washable adjustable strap non-slip ergonomic handle perfect gift "
+    "for men women kids outdoor indoor travel office home kitchen gym running hiking"
+).split()
+_SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL', '2XL', '3XL']
+_WORD_SIZES = ['Small', 'Medium', 'Large', 'X-Large', 'XX-Large']
+_COLORS = ['Black', 'White', 'Navy Blue', 'Red', 'Dark Grey', 'Green', 'Rose Gold', 'Beige']
+_NOISE = [
+    'Read more', 'See more', 'Show more', 'Click to open expanded view',
+    'Roll over image to zoom in', 'Scroll left/right to see more',
+]
+_SYMBOLS = ['★', '✓', '®', '™', '•', '→', '€', '%', '&', '#', '|', '...', '!!', '??', ',,']
+_DETAILS = [
+    'Package Dimensions', 'Item Weight', 'Item model number', 'Date First Available',
+    'Manufacturer', 'ASIN', 'Department', 'Best Sellers Rank',
+]
+
+
+def _sentence(rng, min_words=6, max_words=18):
+    words = rng.choices(_WORDS, k=rng.randint(min_words, max_words))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(_SYMBOLS))
+    text = ' '.join(words)
+    return text[0].upper() + text[1:] + rng.choice(['.', '.', '!', '.  ', '..'])
+
+
+def _attributes(rng):
+    parts = []
+    roll = rng.random()
+    if roll < 0.25:
+        parts.append('Size: ' + ', '.join(rng.sample(_SIZES, rng.randint(1, 4))))
+    elif roll < 0.4:
+        parts.append('Available sizes: ' + ', '.join(str(rng.randint(6, 14)) for _ in range(3)) + ' inch')
+    elif roll < 0.55:
+        parts.append('Sizes available: ' + ', '.join(rng.sample(_WORD_SIZES, rng.randint(1, 3))))
+    if rng.random() < 0.4:
+        label = rng.choice(['Color', 'Colour', 'Colors', 'Available colors'])
+        parts.append(f"{label}: " + ', '.join(rng.sample(_COLORS, rng.randint(1, 3))) + '.')
+    return parts
+
+
+def make_raw_section(rng, paragraphs=None):
+    """生成一段未清理的原始描述文本（相当于页面 innerText）"""
+    paragraphs = paragraphs or rng.randint(1, 6)
+    lines = []
+    for _ in range(paragraphs):
+        lines.append(' '.join(_sentence(rng) for _ in range(rng.randint(1, 5))))
+        lines.extend(_attributes(rng))
+        if rng.random() < 0.3:
+            lines.append(rng.choice(_NOISE))
+        if rng.random() < 0.2:
+            lines.append(f"\t{rng.choice(_DETAILS)} ‏ : ‎ {rng.randint(1, 999)} x {rng.randint(1, 99)} cm")
+        if rng.random() < 0.05:
+            lines.append(rng.choice([
+                'Hassle-free 30 day return policy; contact us anytime.',
+                'var config = {"a": 1}; document.write(config);',
+                'Visit https://example.com/help // support page',
+            ]))
+    return '\n'.join(lines) + ('\n\n\n' if rng.random() < 0.5 else '')
+
+
+def make_description(rng):
+    """生成一条清理后的商品描述（DataSaver 的输入形状）"""
+    sections = []
+    for title in ['Product Description', 'Key Features', 'Technical Details', 'Product Details']:
+        if rng.random() < 0.7:
+            body = '\n'.join(
+                _sentence(rng) for _ in range(rng.randint(2, 12))
+            )
+            body += '\n' + '\n'.join(_attributes(rng))
+            sections.append(f"{title}:\n{body.strip()}")
+    return '\n\n'.join(sections) if sections else 'N/A'
+
+
+def make_descriptions(count, seed=0, duplicate_ratio=0.1):
+    """生成指定数量的描述，其中一部分为重复描述（同款商品的不同搜索结果）"""
+    rng = random.Random(seed)
+    descriptions = []
+    for _ in range(count):
+        if descriptions and rng.random() < duplicate_ratio:
+            descriptions.append(rng.choice(descriptions))
+        else:
+            descriptions.append(make_description(rng))
+    return descriptions
+
+
+def make_raw_sections(count, seed=0):
+    """生成原始描述段落语料，每项为 {type, content}"""
+    rng = random.Random(seed)
+    types = ['Product Description', 'Key Features', 'Technical Details', 'Product Details']
+    return [{'type': rng.choice(types), 'content': make_raw_section(rng)} for _ in range(count)]
+
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en-us"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<div id="nav-belt">Deliver to New York 10001 | All | Hello, sign in | Returns &amp; Orders | Cart</div>
+<div id="ppd">
+  <div id="centerCol">
+    <span id="productTitle">{title}</span>
+    <a id="bylineInfo" href="/stores/{brand}/page/1">Visit the {brand} Store</a>
+    <div id="averageCustomerReviews_feature_div"><div id="averageCustomerReviews">
+      <span id="acrPopover" title="{rating} out of 5 stars">
+        <span class="a-size-base a-color-base">{rating}</span>
+        <i class="a-icon a-icon-star a-star-{star}"><span class="a-icon-alt">{rating} out of 5 stars</span></i>
+      </span>
+      {review_node}
+    </div></div>
+    <div class="a-price"><span class="a-offscreen">${price}</span></div>
+    <div id="availability"><span>In Stock</span></div>
+    <div id="feature-bullets"><ul>{bullets}</ul></div>
+  </div>
+</div>
+<div id="productDescription">{description}</div>
+<script type="a-state" data-a-state="{{&quot;key&quot;:&quot;twister-plus-buying-options-price-data&quot;}}">{price_state}</script>
+<script type="text/javascript">
+P.when('A').register("ImageBlockATF", function(A){{
+  var data = {{
+    'colorImages': {{ 'initial': {images} }},
+    'colorToAsin': {{'initial': {{}}}}
+  }};
+  return data;
+}});
+</script>
+<script type="text/javascript">
+  var dataToReturn = {{
+    "dimensionsDisplay" : {dimensions},
+    "dimensionValuesDisplayData" : {dimension_values},
+    "currentAsin" : "{asin}"
+  }};
+</script>
+<div id="similarities">{carousel}</div>
+<div id="reviewsMedley"><h2>Customer reviews</h2>{reviews}</div>
+</body></html>
+"""
+
+
+def make_variants(rng):
+    """生成部分尺寸/颜色组合存在的变体矩阵，返回 (维度名称, {ASIN: 维度取值})"""
+    sizes = rng.sample(_SIZES, rng.randint(0, 4))
+    colors = rng.sample(_COLORS, rng.randint(0 if sizes else 1, 3))
+    dimensions = (['Size'] if sizes else []) + (['Color'] if colors else [])
+    values = {}
+    for size in sizes or [None]:
+        for color in colors or [None]:
+            # 并非所有组合都有货
+            if values and rng.random() < 0.3:
+                continue
+            asin = 'B0' + ''.join(rng.choices('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789', k=8))
+            values[asin] = [value for value in (size, color) if value is not None]
+    return dimensions, values
+
+
+def make_product_page(rng, rating, review_count, review_blocks=40, review_node=True, variants=None):
+    """生成一个结构与亚马逊商品页相近的静态页面
+
+    页面下方包含推荐商品轮播和大量评论正文，用于衡量读取整页文本的开销；
+    review_node=False 时不生成 #acrCustomerReviewText，用于测试兜底路径。
+    页面中同时嵌入价格、图片和变体矩阵的结构化数据，variants 为
+    make_variants 的返回值，缺省时随机生成。a-state 属性与 driver.page_source
+    的序列化结果一致（双引号，值中的引号为 &quot;）。
+    """
+    brand = rng.choice(['Acme', 'Northwind', 'Contoso', 'Fabrikam'])
+    dimensions, dimension_values = variants or make_variants(rng)
+    price = f"{rng.randint(5, 200)}.{rng.randint(0, 99):02d}"
+    images = [
+        {'hiRes': f"https://m.media-amazon.com/images/I/{rng.randrange(16 ** 8):08x}._AC_SL1500_.jpg",
+         'large': f"https://m.media-amazon.com/images/I/{rng.randrange(16 ** 8):08x}._AC_.jpg"}
+        for _ in range(rng.randint(1, 6))
+    ]
+    count_text = f"{review_count:,} ratings"
+    carousel = ''.join(
+        f'<div class="a-carousel-card">{_sentence(rng, 3, 6)} '
+        f'<i class="a-icon a-star-4"><span class="a-icon-alt">4.0 out of 5 stars</span></i> '
+        f'{rng.randint(1, 999):,}</div>'
+        for _ in range(12)
+    )
+    reviews = ''.join(
+        f'<div class="review"><span class="a-icon-alt">{rng.randint(1, 5)}.0 out of 5 stars</span>'
+        f'<p>{" ".join(_sentence(rng) for _ in range(rng.randint(3, 10)))}</p>'
+        f'<span>{rng.randint(2, 80)} people found this helpful</span></div>'
+        for _ in range(review_blocks)
+    )
+    return _PAGE_TEMPLATE.format(
+        title=f"{brand} {_sentence(rng, 4, 8)}",
+        brand=brand,
+        rating=rating,
+        star=str(rating).replace('.', '-'),
+        review_node=f'<a id="acrCustomerReviewLink"><span id="acrCustomerReviewText">{count_text}</span></a>'
+        if review_node else f'<span class="a-size-small">{count_text}</span>',
+        price=price,
+        price_state=json.dumps({'desktop_buybox_group_1': [
+            {'displayPrice': f'${price}', 'priceAmount': float(price), 'buyingOptionType': 'NEW'}]}),
+        images=json.dumps(images),
+        dimensions=json.dumps(dimensions),
+        dimension_values=json.dumps(dimension_values),
+        asin=next(iter(dimension_values), ''),
+        bullets=''.join(f'<li>{_sentence(rng)}</li>' for _ in range(6)),
+        description='<br>'.join(make_raw_section(rng).splitlines()),
+        carousel=carousel,
+        reviews=reviews,
+    )
+
+
+_BRANDS = ['Acme', 'Northwind', 'Contoso', 'Fabrikam', 'Wide World', 'Tailspin Toys', 'Proseware']
+
+
+def make_price_text(rng):
+    """生成一个页面上的原始价格文本，包括千位分隔符、价格区间、空白和缺失值"""
+    value = f"{rng.randint(1, 2500):,}.{rng.randint(0, 99):02d}"
+    roll = rng.random()
+    if roll < 0.6:
+        return f"${value}"
+    if roll < 0.7:
+        return f" $ {value}\n"
+    if roll < 0.8:
+        return f"${value} - ${rng.randint(2501, 5000):,}.99"
+    if roll < 0.9:
+        return f"US${value}"
+    return rng.choice(['', 'N/A', 'Currently unavailable.', 'See all buying options'])
+
+
+def make_brand_input(rng):
+    """生成 normalize_brand 的参数 (品牌文本, 品牌链接, 商品标题)"""
+    brand = rng.choice(_BRANDS)
+    title = f"{brand} {_sentence(rng, 3, 8)}"
+    roll = rng.random()
+    if roll < 0.5:
+        return f"Visit the {brand} Store", None, title
+    if roll < 0.7:
+        return f"Brand: {brand}", None, title
+    if roll < 0.8:
+        return f"‹ {brand} {brand} ›", None, title
+    if roll < 0.9:
+        return None, f"https://www.amazon.com/stores/{brand.replace(' ', '-')}/page/{rng.randrange(16 ** 8):08X}", title
+    return None, None, title
+
+
+def _make_product(rng, asin):
+    """生成一个 finalize_product 输出形状的商品（不含预先提取的尺寸和颜色）"""
+    current = f"{rng.randint(5, 200)}.{rng.randint(0, 99):02d}"
+    original = f"{float(current) * rng.uniform(1.1, 1.6):.2f}" if rng.random() < 0.4 else 'N/A'
+    images = [f"https://m.media-amazon.com/images/I/{rng.randrange(16 ** 8):08x}._AC_SL1500_.jpg"
+              for _ in range(rng.randint(1, 6))]
+    variants = []
+    if rng.random() < 0.3:
+        _, values = make_variants(rng)
+        variants = [{'asin': variant_asin, 'size': '', 'color': ''} for variant_asin in values]
+        for variant, dimension_values in zip(variants, values.values()):
+            for value in dimension_values:
+                variant['size' if value in _SIZES else 'color'] = value
+    return {
+        'url': f"https://www.amazon.com/dp/{asin}",
+        'asin': asin,
+        'title': f"{rng.choice(_BRANDS)} {_sentence(rng, 4, 10)}",
+        'price': dict(empty_price_info(), current_price=current, original_price=original),
+        'rating': round(rng.uniform(3.0, 5.0), 1),
+        'review_count': rng.randint(0, 50000),
+        'description': make_description(rng),
+        'image_url': images[0],
+        'images': images,
+        'variants': variants,
+        'brand': rng.choice(_BRANDS),
+        'availability': 'In Stock',
+        'category': rng.choice(['apple', 'laptop', 'shoes for men', 'headphones']),
+        'timestamp': '2025-01-01 12:00:00',
+    }
+
+
+def make_products(count, seed=0, unique=50000):
+    """生成指定数量的商品记录（ProductRecord）
+
+    大规模语料（如100万行）只生成 unique 个不同的商品，其余行复用其内容
+    并使用新的ASIN和标题，控制生成时间和内存；描述因此有较高的重复率。
+    """
+    rng = random.Random(seed)
+    templates, products = [], []
+    for i in range(count):
+        asin = f"B{i:09d}"
+        if i < unique:
+            product = _make_product(rng, asin)
+            templates.append(product)
+        else:
+            template = templates[rng.randrange(unique)]
+            product = dict(template, asin=asin, url=f"https://www.amazon.com/dp/{asin}",
+                           title=f"{template['title']} #{i}")
+        products.append(ProductRecord.from_product(product))
+    return products
@@ -0,0 +1,218 @@
+"""模拟亚马逊的本地HTTP服务，用于离线的端到端基准测试
+
+    python -m benchmarks.fake_amazon --port 8000 --latency 0.2 --throttle-rate 0.05
+    python -m benchmarks.fake_amazon --record pages/ --terms apple laptop
+
+提供搜索页 /s?k=<关键词> 和商品页 /dp/<ASIN>。页面优先从录制目录
+（search/<关键词>.html、dp/<ASIN>.html）读取，其中指向亚马逊的绝对地址
+会改写为本服务的地址；没有录制的页面由 corpus.make_product_page 按关键词
+和ASIN确定性地生成，同一参数每次得到相同的页面。可以设置每个请求的延迟
+和返回限流页面的比例。采集进程通过 SCRAPER_BASE_URL 指向本服务。
+"""
+import os
+import re
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs, quote_plus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.corpus import make_product_page
+
+THROTTLE_PAGE = ("<html><head><title>Amazon.com</title></head><body>"
+                 "<p>Request was throttled. Please wait a moment and refresh the page.</p></body></html>")
+_AMAZON_URL = re.compile(r'https?://(?:www\.)?amazon\.com')
+
+_SEARCH_TEMPLATE = """<!DOCTYPE html>
+<html lang="en-us"><head><meta charset="utf-8"><title>Amazon.com : {term}</title></head>
+<body>
+<div id="search"><div class="s-main-slot s-result-list">
+{results}
+</div></div>
+</body></html>
+"""
+_RESULT_TEMPLATE = """<div data-component-type="{component}" data-asin="{asin}" class="s-result-item s-asin">
+  <div class="s-include-content-margin">
+    <h2><a class="a-link-normal a-text-normal" href="/dp/{asin}/ref=sr_1_{rank}">{title}</a></h2>
+    <span class="a-price"><span class="a-offscreen">${price}</span></span>
+  </div>
+</div>"""
+
+
+def _asin(rng):
+    return 'B0' + ''.join(rng.choices('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789', k=8))
+
+
+class FakeAmazonServer:
+    """在后台线程中运行的模拟站点，按页面类型统计请求数"""
+
+    def __init__(self, pages_dir=None, latency=0.0, jitter=0.0, throttle_rate=0.0,
+                 results_per_search=24, seed=0, port=0):
+        self.pages_dir = pages_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.results_per_search = results_per_search
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.stats = {'search': 0, 'product': 0, 'other': 0, 'throttled': 0}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = server.handle(self.path)
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _recorded(self, *parts):
+        """读取录制的页面，并将亚马逊的绝对地址改写为本服务的地址"""
+        if not self.pages_dir:
+            return None
+        path = os.path.join(self.pages_dir, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as fp:
+            return _AMAZON_URL.sub(self.base_url, fp.read())
+
+    def search_asins(self, term):
+        """关键词对应的搜索结果ASIN（确定性生成）"""
+        rng = random.Random(f"{self.seed}:search:{term}")
+        return [_asin(rng) for _ in range(self.results_per_search)]
+
+    def search_page(self, term):
+        recorded = self._recorded('search', f"{quote_plus(term)}.html")
+        if recorded:
+            return recorded
+        rng = random.Random(f"{self.seed}:search:{term}")
+        results = []
+        for rank, asin in enumerate(self.search_asins(term), 1):
+            # 第一个结果为赞助商品，采集时应被跳过
+            component = 'sp-sponsored-result' if rank == 1 else 's-search-result'
+            results.append(_RESULT_TEMPLATE.format(
+                component=component, asin=asin, rank=rank,
+                title=f"{term.title()} result {rank}", price=f"{rng.randint(5, 200)}.99"))
+        return _SEARCH_TEMPLATE.format(term=term, results='\n'.join(results))
+
+    def product_page(self, asin):
+        recorded = self._recorded('dp', f"{asin}.html")
+        if recorded:
+            return recorded
+        rng = random.Random(f"{self.seed}:product:{asin}")
+        rating = round(rng.uniform(3.0, 5.0), 1)
+        return make_product_page(rng, rating, rng.randint(0, 250000), review_blocks=rng.randint(10, 60))
+
+    def _page(self, kind, key, build):
+        with self._lock:
+            page = self._cache.get((kind, key))
+        if page is None:
+            page = build(key)
+            with self._lock:
+                self._cache[(kind, key)] = page
+        return page
+
+    def handle(self, path):
+        """返回 (状态码, 页面内容)"""
+        parsed = urlparse(path)
+        match = re.match(r'/(?:[^/]+/)?dp/([A-Z0-9]{10})', parsed.path)
+        if parsed.path == '/s':
+            kind = 'search'
+        elif match:
+            kind = 'product'
+        else:
+            kind = 'other'
+
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            throttled = kind != 'other' and self._rng.random() < self.throttle_rate
+            self.stats['throttled' if throttled else kind] += 1
+        if delay:
+            time.sleep(delay)
+
+        if throttled:
+            return 503, THROTTLE_PAGE
+        if kind == 'search':
+            term = (parse_qs(parsed.query).get('k') or [''])[0]
+            return 200, self._page('search', term, self.search_page)
+        if kind == 'product':
+            return 200, self._page('product', match.group(1), self.product_page)
+        if parsed.path in ('/', ''):
+            return 200, "<html><head><title>Amazon.com</title></head><body>Amazon.com</body></html>"
+        return 404, "<html><body>Not Found</body></html>"
+
+    def record(self, pages_dir, terms):
+        """将关键词的搜索页和所有结果商品页写入录制目录，便于固定语料或替换为真实页面"""
+        os.makedirs(os.path.join(pages_dir, 'search'), exist_ok=True)
+        os.makedirs(os.path.join(pages_dir, 'dp'), exist_ok=True)
+        for term in terms:
+            with open(os.path.join(pages_dir, 'search', f"{quote_plus(term)}.html"), 'w', encoding='utf-8') as fp:
+                fp.write(self.search_page(term))
+            for asin in self.search_asins(term):
+                with open(os.path.join(pages_dir, 'dp', f"{asin}.html"), 'w', encoding='utf-8') as fp:
+                    fp.write(self.product_page(asin))
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pages-dir', help='录制页面目录（search/、dp/）')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='在固定延迟上增加的随机延迟上限（秒）')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回限流页面的请求比例')
+    parser.add_argument('--results', type=int, default=24, help='每个搜索页的结果数量')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', metavar='DIR', help='将生成的页面写入目录后退出')
+    parser.add_argument('--terms', nargs='*', default=['apple', 'laptop'], help='--record 时生成的关键词')
+    args = parser.parse_args()
+
+    server = FakeAmazonServer(args.pages_dir, args.latency, args.jitter, args.throttle_rate,
+                              args.results, args.seed, args.port)
+    if args.record:
+        server.record(args.record, args.terms)
+        server.httpd.server_close()
+        print(f"Recorded {len(args.terms)} search pages and their product pages to {args.record}")
+        return 0
+
+    with server:
+        print(f"Serving fake Amazon at {server.base_url} (Ctrl+C to stop)")
+        print(f"Point the scraper at it with: SCRAPER_BASE_URL={server.base_url}")
+        try:
+            while True:
+                time.sleep(10)
+                print(f"Requests: {server.snapshot()}")
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+import os
+import re
+import csv
+import time
+import argparse
+from urllib.parse import urlparse
+from config import ScraperConfig
+from logger import logger, get_log_queue
+from metrics import metrics
+import profiling
+
+# 畅销榜类别树的整站排名快照
+#   - 从根类别开始按层（广度优先）发现类别树，最多 BESTSELLER_MAX_DEPTH 层
+#   - 每一层的类别页面分给进程池中的各进程，每个类别读取前 BESTSELLER_PAGES 页（每页50名）
+#   - 只读取榜单页面，不打开商品页；每个类别一个排名文件，另有按ASIN去重的汇总文件和类别树文件
+#
+#   python bestseller_crawl.py
+#   python bestseller_crawl.py https://www.amazon.com/Best-Sellers-Electronics/zgbs/electronics --depth 2
+
+_CATEGORY_PATH = re.compile(r'/(?:zgbs|gp/bestsellers)(?:/(.*))?$')
+
+
+def category_key(url):
+    """类别在畅销榜中的路径（如 electronics/172456），用于去重；根类别为空字符串"""
+    path = urlparse(url).path.split('/ref=')[0].rstrip('/')
+    match = _CATEGORY_PATH.search(path)
+    return (match.group(1) or '').strip('/') if match else path.strip('/')
+
+
+def canonical_url(url):
+    """去掉 ref 和查询参数后的类别地址"""
+    parsed = urlparse(url)
+    path = parsed.path.split('/ref=')[0].rstrip('/')
+    host = f"{parsed.scheme}://{parsed.netloc}" if parsed.netloc else ScraperConfig.BASE_URL
+    return f"{host}{path}"
+
+
+def crawl_chunk(nodes):
+    """采集进程中读取一组类别页面，返回每个类别的结果列表和本进程的指标"""
+    from driver_manager import DriverManager
+    from scraper import AmazonScraper
+
+    results = []
+    driver_manager = DriverManager()
+    try:
+        driver_manager.setup_driver(ScraperConfig.HEADLESS)
+        scraper = AmazonScraper(driver_manager)
+        for i, node in enumerate(nodes, 1):
+            with metrics.timer('bestseller_category'):
+                page = scraper.get_bestseller_page(node['url'], node['name'])
+            results.append({**node, 'page': page})
+            if i < len(nodes):
+                scraper.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+    except Exception as e:
+        logger.error(f"Error crawling bestseller categories: {str(e)}")
+        # 浏览器出错后未读取的类别记为失败
+        results.extend({**node, 'page': None} for node in nodes[len(results):])
+    finally:
+        driver_manager.quit()
+    return results, metrics.snapshot(reset=True)
+
+
+def _child_nodes(result, seen):
+    """一个类别页面中尚未发现的子类别
+
+    页面只返回类别树中当前节点下的子节点；按层遍历时已发现的类别（包括在其他父类别下
+    重复出现的）不再加入。
+    """
+    children = []
+    for link in result['page']['subcategories']:
+        key = category_key(link['url'])
+        if key in seen:
+            continue
+        seen.add(key)
+        children.append({'url': canonical_url(link['url']), 'key': key, 'name': link['name'] or None,
+                         'depth': result['depth'] + 1, 'parent': result['key']})
+    return children
+
+
+def _write_csv(path, columns, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def save_snapshot(categories, output_dir):
+    """保存每个类别的排名文件、按ASIN去重的汇总文件和类别树文件"""
+    os.makedirs(output_dir, exist_ok=True)
+    asins = {}
+    tree = []
+    for category in categories:
+        page = category['page']
+        safe_name = re.sub(r'[<>:"/\\|?*\s]', '_', page['category'] or 'category')
+        safe_key = re.sub(r'[^\w-]', '_', category['key']) or 'all'
+        filename = f"{safe_name}_{safe_key}.csv"
+        _write_csv(os.path.join(output_dir, filename), ['rank', 'asin', 'title', 'price', 'url'], page['products'])
+        tree.append({'key': category['key'], 'name': page['category'], 'depth': category['depth'],
+                     'parent': category['parent'], 'products': len(page['products']), 'url': category['url'],
+                     'file': filename})
+
+        for item in page['products']:
+            entry = asins.setdefault(item['asin'], {'asin': item['asin'], 'title': item['title'],
+                                                    'url': item['url'], 'best_rank': item['rank'],
+                                                    'best_category': page['category'], 'categories': []})
+            entry['categories'].append(f"{page['category']}#{item['rank']}")
+            if item['rank'] < entry['best_rank']:
+                entry.update(best_rank=item['rank'], best_category=page['category'])
+            entry['title'] = entry['title'] or item['title']
+
+    rows = sorted(asins.values(), key=lambda entry: (entry['best_rank'], entry['asin']))
+    for entry in rows:
+        entry['categories'] = ', '.join(entry['categories'])
+    _write_csv(os.path.join(output_dir, 'asins.csv'),
+               ['asin', 'title', 'best_rank', 'best_category', 'categories', 'url'], rows)
+    _write_csv(os.path.join(output_dir, 'categories.csv'),
+               ['key', 'name', 'depth', 'parent', 'products', 'url', 'file'], tree)
+    return len(rows)
+
+
+def run_bestsellers(root_urls=None, max_depth=None, max_workers=None):
+    """按层发现畅销榜类别树并读取各类别的排名，返回快照目录"""
+    from parallel_scraper import ParallelScraper, get_mp_context
+    from data_saver import DataSaver
+
+    max_depth = ScraperConfig.BESTSELLER_MAX_DEPTH if max_depth is None else max_depth
+    max_categories = ScraperConfig.BESTSELLER_MAX_CATEGORIES
+    root_urls = root_urls or [f"{ScraperConfig.BASE_URL}/Best-Sellers/zgbs/"]
+    seen = set()
+    frontier = []
+    for url in root_urls:
+        key = category_key(url)
+        if key not in seen:
+            seen.add(key)
+            frontier.append({'url': canonical_url(url), 'key': key, 'name': None, 'depth': 0, 'parent': None})
+
+    start_time = time.time()
+    categories, failed = [], 0
+    pool_size = max(max_workers or ScraperConfig.MAX_WORKERS, 1)
+    context = get_mp_context()
+    with context.Pool(pool_size, initializer=ParallelScraper.init_worker,
+                      initargs=(get_log_queue(context), profiling.settings())) as pool:
+        while frontier:
+            if max_categories:
+                frontier = frontier[:max(max_categories - len(categories) - failed, 0)]
+                if not frontier:
+                    logger.warning(f"Reached BESTSELLER_MAX_CATEGORIES ({max_categories}), stopping discovery")
+                    break
+            depth = frontier[0]['depth']
+            workers = min(pool_size, len(frontier))
+            chunks = [frontier[i::workers] for i in range(workers)]
+            logger.info(f"Crawling {len(frontier)} bestseller categories at depth {depth} with {workers} workers")
+
+            next_frontier = []
+            for results, snapshot in pool.imap_unordered(crawl_chunk, chunks):
+                metrics.merge(snapshot)
+                for result in results:
+                    if result['page'] is None:
+                        failed += 1
+                        logger.warning(f"Failed to load bestseller category {result['url']}")
+                        continue
+                    categories.append(result)
+                    if depth < max_depth:
+                        next_frontier.extend(_child_nodes(result, seen))
+            frontier = next_frontier
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start_time
+    output_dir = os.path.join(DataSaver.BESTSELLER_DIR, time.strftime('%Y%m%d_%H%M%S'))
+    unique = save_snapshot(categories, output_dir) if categories else 0
+    logger.info(f"Crawled {len(categories)} bestseller categories in {elapsed:.1f}s ({failed} failed), "
+                f"{sum(len(c['page']['products']) for c in categories)} ranks, {unique} unique ASINs")
+    metrics.write()
+    return output_dir if categories else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按层发现畅销榜类别树，生成每个类别的排名快照")
+    parser.add_argument("urls", nargs="*", help="起始类别地址，默认整站畅销榜")
+    parser.add_argument("--depth", type=int, help="向下发现的层数，默认BESTSELLER_MAX_DEPTH")
+    parser.add_argument("--workers", type=int, help="并行进程数，默认MAX_WORKERS")
+    args = parser.parse_args()
+
+    output = run_bestsellers(args.urls, args.depth, args.workers)
+    if output:
+        print(f"Bestseller snapshot written to: {output}")
@@ -1,8 +1,11 @@
 import os
+import json
 import pickle
+import importlib.util
 
 
 default_conf = {
+    "base_url": "https://www.amazon.com",
     "headless": True,
     "max_products_per_category": 10,
     "max_workers": 12,
@@ -11,10 +14,55 @@ default_conf = {
     "min_sleep": 1,
     "max_sleep": 2,
     "scroll_steps": 1,
+    "scroll_timeout": 10,
+    "scroll_settle_time": 1.0,
     "vpn_enabled": True,
     "vpn_name": "",
     "vpn_username": "",
     "vpn_password": "",
+    "save_intermediate_csv": False,
+    "id_db_path": "woo_ids.sqlite3",
+    "id_block_size": 1000,
+    "id_start": 100000,
+    "parquet_enabled": False,
+    "merge_exports": True,
+    "postprocess_queue_size": 8,
+    "review_fallback_chars": 2000,
+    "product_time_budget": 5,
+    "image_download_enabled": False,
+    "image_media_dir": "media",
+    "image_workers": 8,
+    "image_format": "jpg",
+    "image_base_url": "",
+    "log_format": "text",
+    "log_rate_limit": 30,
+    "metrics_dir": "metrics",
+    "metrics_flush_interval": 60,
+    "profile_enabled": False,
+    "profile_mode": "cprofile",
+    "profile_memory": True,
+    "profile_memory_frames": 1,
+    "profile_dir": "profiles",
+    "stop_grace_period": 20,
+    "worker_start_method": "auto",
+    "coordinator_port": 50000,
+    "coordinator_authkey": "",
+    "coordinator_db_path": "distributed/tasks.db",
+    "lease_timeout": 300,
+    "task_max_attempts": 3,
+    "recrawl_tracking": False,
+    "recrawl_db_path": "recrawl/history.db",
+    "recrawl_daily_budget": 2000,
+    "recrawl_initial_interval": 86400,
+    "recrawl_min_interval": 3600,
+    "recrawl_max_interval": 1209600,
+    "recrawl_backoff": 1.5,
+    "refresh_ready_timeout": 5,
+    "bestseller_max_depth": 1,
+    "bestseller_pages": 2,
+    "bestseller_max_categories": 0,
+    "search_cache_ttl": 21600,
+    "search_cache_dir": "search_cache",
 }
 
 
@@ -22,7 +70,8 @@ def load_pickle(pkl):
     if not os.path.exists(pkl):
         return default_conf
     with open(pkl, "rb") as fp:
-        return pickle.load(fp)
+        # 旧版本保存的配置可能缺少新增的键，使用默认值补齐
+        return {**default_conf, **pickle.load(fp)}
 
 
 def dump_pickle(pkl, data):
@@ -30,11 +79,46 @@ def dump_pickle(pkl, data):
         pickle.dump(data, fp)
 
 
+def apply_env_overrides(conf, prefix="SCRAPER_"):
+    """用环境变量覆盖配置，如 SCRAPER_MIN_SLEEP=0、SCRAPER_BASE_URL=http://127.0.0.1:8000
+
+    值按 default_conf 中对应项的类型转换：字符串配置（如密码、认证密钥）原样使用，
+    布尔和数值配置按JSON解析（true/false、数字），类型不符时报错。环境变量会被子进程继承，
+    基准测试等场景可以不修改 configure.pkl 而改变所有采集进程的配置。
+    """
+    conf = dict(conf)
+    for key, default in default_conf.items():
+        name = prefix + key.upper()
+        value = os.environ.get(name)
+        if value is None:
+            continue
+        if isinstance(default, str):
+            conf[key] = value
+            continue
+
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        if isinstance(default, bool):
+            valid = isinstance(parsed, bool)
+        else:
+            # 整数配置也接受小数（如 SCRAPER_MAX_SLEEP=1.5）
+            valid = isinstance(parsed, (int, float)) and not isinstance(parsed, bool)
+            if valid and isinstance(default, float):
+                parsed = float(parsed)
+        if not valid:
+            raise ValueError(f"{name}={value!r} is not a valid {type(default).__name__}")
+        conf[key] = parsed
+    return conf
+
+
 conf_pkl = "configure.pkl"
-CONF = load_pickle(conf_pkl)
+CONF = apply_env_overrides(load_pickle(conf_pkl))
 
 
 class ScraperConfig:
+    BASE_URL = CONF["base_url"].rstrip("/")  # 站点地址，可指向本地的模拟服务器（benchmarks/fake_amazon.py）
     HEADLESS = CONF["headless"]
     MAX_PRODUCTS_PER_CATEGORY = CONF[
         "max_products_per_category"
@@ -45,10 +129,55 @@ class ScraperConfig:
     MIN_SLEEP = CONF["min_sleep"]  # 最小等待时间
     MAX_SLEEP = CONF["max_sleep"]  # 最大等待时间
     SCROLL_STEPS = CONF["scroll_steps"]  # 滚动次数
+    SCROLL_TIMEOUT = CONF["scroll_timeout"]  # 滚动等待内容加载的最长时间（秒）
+    SCROLL_SETTLE_TIME = CONF["scroll_settle_time"]  # 滚动后页面高度在此时间（秒）内不再增长即视为加载完成
     VPN_ENABLE = CONF["vpn_enabled"]  # 是否启用VPN
     VPN_NAME = CONF["vpn_name"]  # VPN名称
     VPN_USERNAME = CONF["vpn_username"]  # VPN用户名
     VPN_PASSWORD = CONF["vpn_password"]  # VPN密码
+    SAVE_INTERMEDIATE_CSV = CONF["save_intermediate_csv"]  # 是否保留中间CSV（调试用）
+    ID_DB_PATH = CONF["id_db_path"]  # 商品ID映射数据库路径
+    ID_BLOCK_SIZE = CONF["id_block_size"]  # 每个进程一次预留的ID数量
+    ID_START = CONF["id_start"]  # 商品ID起始值，避开旧版随机ID的范围
+    PARQUET_ENABLED = CONF["parquet_enabled"]  # 是否同时输出按类别和日期分区的Parquet文件
+    MERGE_EXPORTS = CONF["merge_exports"]  # 是否将各搜索词的导出文件合并为一个导入文件
+    POSTPROCESS_QUEUE_SIZE = CONF["postprocess_queue_size"]  # 等待文本后处理的商品数量上限
+    REVIEW_FALLBACK_CHARS = CONF["review_fallback_chars"]  # 找不到评论数节点时最多读取的评分区域文本长度
+    PRODUCT_TIME_BUDGET = CONF["product_time_budget"]  # 商品页就绪后提取所有字段的总时间预算（秒）
+    IMAGE_DOWNLOAD_ENABLED = CONF["image_download_enabled"]  # 是否在采集时下载商品主图
+    IMAGE_MEDIA_DIR = CONF["image_media_dir"]  # 图片和下载清单的保存目录
+    IMAGE_WORKERS = CONF["image_workers"]  # 每个采集进程的图片下载线程数
+    IMAGE_FORMAT = CONF["image_format"]  # 图片转换的目标格式（需要安装Pillow）
+    IMAGE_BASE_URL = CONF["image_base_url"]  # 媒体目录上传后的访问地址，设置后导入文件使用本地图片
+    LOG_FORMAT = CONF["log_format"]  # 日志文件格式：text 或 json（每行一条JSON）
+    LOG_RATE_LIMIT = CONF["log_rate_limit"]  # 同一位置每分钟最多输出的INFO日志条数，0表示不限制
+    METRICS_DIR = CONF["metrics_dir"]  # 阶段耗时指标（JSON和Prometheus文本文件）的输出目录
+    METRICS_FLUSH_INTERVAL = CONF["metrics_flush_interval"]  # 运行中写出指标的最小间隔（秒），0表示只在结束时写出
+    PROFILE_ENABLED = CONF["profile_enabled"]  # 是否对每个采集任务进行性能分析（调试用）
+    PROFILE_MODE = CONF["profile_mode"]  # 分析方式：cprofile 或 sampling（需要安装pyinstrument）
+    PROFILE_MEMORY = CONF["profile_memory"]  # 分析时是否同时用tracemalloc记录内存分配
+    PROFILE_MEMORY_FRAMES = CONF["profile_memory_frames"]  # tracemalloc 每次分配记录的调用栈深度
+    PROFILE_DIR = CONF["profile_dir"]  # 分析文件的输出目录，每次运行一个子目录
+    STOP_GRACE_PERIOD = CONF["stop_grace_period"]  # 界面请求停止后等待进行中商品完成的最长时间（秒），超时强制结束
+    WORKER_START_METHOD = CONF["worker_start_method"]  # 采集进程的启动方式：auto、forkserver、spawn 或 fork
+    COORDINATOR_PORT = CONF["coordinator_port"]  # 分布式模式下协调节点的监听端口
+    COORDINATOR_AUTHKEY = CONF["coordinator_authkey"]  # 协调节点与工作节点的连接认证密钥
+    COORDINATOR_DB_PATH = CONF["coordinator_db_path"]  # 协调节点的任务数据库（SQLite）
+    LEASE_TIMEOUT = CONF["lease_timeout"]  # 任务租约时长（秒），工作进程处理期间定期续租，过期后重新分配
+    TASK_MAX_ATTEMPTS = CONF["task_max_attempts"]  # 每个任务的最大尝试次数，超过后记为失败
+    RECRAWL_TRACKING = CONF["recrawl_tracking"]  # 正常采集时是否记录每个ASIN的价格和可用性历史
+    RECRAWL_DB_PATH = CONF["recrawl_db_path"]  # 复查计划和变化历史的数据库（SQLite）
+    RECRAWL_DAILY_BUDGET = CONF["recrawl_daily_budget"]  # 每天复查的页面数上限，0表示不限制
+    RECRAWL_INITIAL_INTERVAL = CONF["recrawl_initial_interval"]  # 新ASIN第一次观察后的复查间隔（秒）
+    RECRAWL_MIN_INTERVAL = CONF["recrawl_min_interval"]  # 复查间隔下限（秒），也是提取失败后的重试间隔
+    RECRAWL_MAX_INTERVAL = CONF["recrawl_max_interval"]  # 复查间隔上限（秒）
+    RECRAWL_BACKOFF = CONF["recrawl_backoff"]  # 未发生变化时复查间隔的增长倍数（变化时减半）
+    REFRESH_READY_TIMEOUT = CONF["refresh_ready_timeout"]  # 价格刷新模式等待价格或可用性区域出现的最长时间（秒）
+    BESTSELLER_MAX_DEPTH = CONF["bestseller_max_depth"]  # 畅销榜从起始类别向下发现的层数，0表示只读取起始类别
+    BESTSELLER_PAGES = CONF["bestseller_pages"]  # 每个畅销榜类别读取的页数（每页50名）
+    BESTSELLER_MAX_CATEGORIES = CONF["bestseller_max_categories"]  # 一次运行最多读取的类别数，0表示不限制
+    SEARCH_CACHE_TTL = CONF["search_cache_ttl"]  # 搜索结果缓存的有效期（秒），0表示不使用缓存
+    SEARCH_CACHE_DIR = CONF["search_cache_dir"]  # 搜索结果缓存目录，每个搜索一个JSON文件
     WINDOW_SIZE = (1920, 1080)
 
     TITLE_SELECTORS = [
@@ -275,3 +404,20 @@ class ScraperConfig:
         ".s-sponsored-label-info-icon",
         ".puis-sponsored-label-text",
     ]
+
+
+def reload_config():
+    """重新读取配置文件和环境变量，原地更新 CONF 和 ScraperConfig
+
+    其他模块通过 from config import ScraperConfig 持有同一个类，因此不能替换模块，
+    而是重新执行一次本模块并复制新的配置值。界面修改配置后的下一次运行，
+    以及从长期存在的 forkserver 进程派生的采集进程，都需要调用。
+    """
+    spec = importlib.util.find_spec(__name__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    CONF.clear()
+    CONF.update(fresh.CONF)
+    for name, value in vars(fresh.ScraperConfig).items():
+        if name.isupper():
+            setattr(ScraperConfig, name, value)
@@ -1,73 +1,106 @@
 import os
 import time
 import re
+import json
+import importlib.util
 import pandas as pd
 from logger import logger
+from metrics import metrics
+from product_record import ProductRecord, format_cents
 
 
 class DataSaver:
     OUTPUT_DIR = 'scraper_excel'
     FINAL_OUTPUT_DIR = 'output_excel'
+    PARQUET_DIR = 'scraper_parquet'
+    FINAL_PARQUET_DIR = 'output_parquet'
+    PRICE_SNAPSHOT_DIR = 'price_snapshots'
+    BESTSELLER_DIR = 'bestsellers'
+
+    # Parquet分区列，查询时可以只读取需要的类别和日期
+    PARQUET_PARTITION_COLS = ['category', 'scrape_date']
+
+    # WooCommerce中间数据的列及其读取类型
+    WOO_COLUMNS = [
+        'Title', 'Description', 'Short description', 'Regular price', 'Sale_Price',
+        'Category', 'Images', 'SKU', 'Sizes', 'Color', 'Variations'
+    ]
+    WOO_DTYPES = {column: str for column in WOO_COLUMNS}
 
     @staticmethod
     def save_to_excel(products, category_name):
         """保存商品信息到Excel文件，适配WooCommerce格式"""
         try:
-            if not products:
-                logger.warning("No products to save")
+            df = DataSaver.build_dataframe(products)
+            if df is None:
                 return None
+            return DataSaver.save_dataframe(df, category_name)
 
-            # 创建输出目录
-            os.makedirs(DataSaver.OUTPUT_DIR, exist_ok=True)
-            os.makedirs(DataSaver.FINAL_OUTPUT_DIR, exist_ok=True)
+        except Exception as e:
+            logger.error(f"Error saving data: {str(e)}")
+            return None
 
-            # 准备WooCommerce所需的列
-            woo_columns = [
-                'Title', 'Description', 'Short description', 'Regular price', 'Sale_Price',
-                'Category', 'Images', 'SKU', 'Sizes', 'Color'
-            ]
+    @staticmethod
+    def build_dataframe(products):
+        """将商品记录（ProductRecord，旧格式的字典会先转换）转换为WooCommerce格式的DataFrame"""
+        try:
+            if not products:
+                logger.warning("No products to save")
+                return None
+            products = [ProductRecord.coerce(product) for product in products]
 
-            # 转换数据为WooCommerce格式
+            # 转换数据为WooCommerce格式，列顺序与 WOO_COLUMNS 相同（尺寸和颜色在最后统一填充）
             woo_data = []
             for product in products:
-                # 提取价格信息
-                regular_price = product['price']['original_price']
-                if regular_price == 'N/A':
-                    regular_price = product['price']['current_price']
-
-                sale_price = product['price']['current_price'] if product['price'][
-                                                                      'current_price'] != regular_price else ''
+                # 价格以分保存，原价缺失时以当前价格作为常规价格
+                regular_price = product.original_price if product.original_price is not None \
+                    else product.current_price
+                sale_price = format_cents(product.current_price) if product.current_price != regular_price else ''
 
-                # 提取尺寸信息（从描述中查找）
-                sizes = DataSaver._extract_sizes(product['description'])
+                # 处理图片URL，有完整图集时全部导入（WooCommerce以逗号分隔多张图片）
+                images = product.images or ((product.image_url,) if product.image_url else ())
+                image_url = ', '.join(image.replace('fmt=webp', 'fmt=jpg') for image in images)
 
-                # 提取颜色信息（从描述中查找）
-                colors = DataSaver._extract_colors(product['description'])
+                # 页面中的真实变体组合，供 process_excel 生成变体行
+                variations = json.dumps(product.variants, ensure_ascii=False) if product.variants else ''
 
-                # 生成简短描述（取描述的前100个字符）
-                short_description = DataSaver._create_short_description(product['description'])
+                woo_data.append((
+                    product.title,
+                    product.description,
+                    # 简短描述（取描述的前100个字符）
+                    DataSaver._create_short_description(product.description),
+                    format_cents(regular_price),
+                    sale_price,
+                    product.category,
+                    image_url,
+                    product.asin or '',
+                    None,
+                    None,
+                    variations,
+                ))
 
-                # 处理图片URL
-                image_url = product['image_url'].replace('fmt=webp', 'fmt=jpg') if product['image_url'] != 'N/A' else ''
+            df = pd.DataFrame.from_records(woo_data, columns=DataSaver.WOO_COLUMNS)
 
-                # 生成SKU
-                sku = f"{product['asin']}" if product['asin'] != 'N/A' else ''
+            # 后处理阶段已提取尺寸和颜色时直接使用，否则按列批量提取（从描述中查找）
+            if all(product.sizes is not None and product.colors is not None for product in products):
+                sizes = [product.sizes for product in products]
+                colors = [product.colors for product in products]
+            else:
+                sizes, colors = DataSaver.extract_attributes_batch(df['Description'])
+            df['Sizes'] = sizes
+            df['Color'] = [color or 'As shown in the figure' for color in colors]
+            return df
 
-                woo_data.append({
-                    'Title': product['title'],
-                    'Description': product['description'],
-                    'Short description': short_description,
-                    'Regular price': regular_price,
-                    'Sale_Price': sale_price,
-                    'Category': product['category'],
-                    'Images': image_url,
-                    'SKU': sku,
-                    'Sizes': ','.join(sizes) if sizes else '',
-                    'Color': ','.join(colors) if colors else 'As shown in the figure',
-                })
+        except Exception as e:
+            logger.error(f"Error building product data: {str(e)}")
+            return None
 
-            # 创建DataFrame
-            df = pd.DataFrame(woo_data, columns=woo_columns)
+    @staticmethod
+    def save_dataframe(df, category_name):
+        """将WooCommerce格式的DataFrame保存为CSV文件"""
+        try:
+            # 创建输出目录
+            os.makedirs(DataSaver.OUTPUT_DIR, exist_ok=True)
 
             # 保存文件
             safe_category_name = re.sub(r'[<>:"/\\|?*]', '_', category_name)
@@ -76,7 +109,8 @@ class DataSaver:
             full_path = os.path.join(DataSaver.OUTPUT_DIR, filename)
 
             # 保存为CSV格式
-            df.to_csv(full_path, index=False, encoding='utf-8-sig')
+            with metrics.timer('save_csv'):
+                df.to_csv(full_path, index=False, encoding='utf-8-sig')
             logger.info(f"Successfully saved to {full_path}")
 
             return full_path
@@ -85,42 +119,175 @@ class DataSaver:
             logger.error(f"Error saving data: {str(e)}")
             return None
 
+    # 价格快照文件的列
+    PRICE_SNAPSHOT_COLUMNS = [
+        'asin', 'current_price', 'original_price', 'savings_amount', 'savings_percentage',
+        'availability', 'checked_at', 'url'
+    ]
+
     @staticmethod
-    def _extract_sizes(description):
-        """从描述中提取尺寸信息"""
-        size_patterns = [
+    def save_price_snapshot(snapshots, name='prices'):
+        """保存价格刷新的结果（extract_price_snapshot 返回的记录）为紧凑的CSV文件"""
+        try:
+            if not snapshots:
+                logger.warning("No price snapshots to save")
+                return None
+
+            rows = [(
+                snapshot.asin,
+                format_cents(snapshot.current_price),
+                format_cents(snapshot.original_price),
+                format_cents(snapshot.savings_amount),
+                snapshot.savings_percentage,
+                snapshot.availability,
+                snapshot.timestamp,
+                snapshot.url,
+            ) for snapshot in map(ProductRecord.coerce, snapshots)]
+
+            os.makedirs(DataSaver.PRICE_SNAPSHOT_DIR, exist_ok=True)
+            safe_name = re.sub(r'[<>:"/\\|?*]', '_', name)
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            full_path = os.path.join(DataSaver.PRICE_SNAPSHOT_DIR, f'{safe_name}_{timestamp}.csv')
+            with metrics.timer('save_csv'):
+                pd.DataFrame.from_records(rows, columns=DataSaver.PRICE_SNAPSHOT_COLUMNS).to_csv(
+                    full_path, index=False, encoding='utf-8-sig')
+            logger.info(f"Saved {len(rows)} price snapshots to {full_path}")
+            return full_path
+
+        except Exception as e:
+            logger.error(f"Error saving price snapshots: {str(e)}")
+            return None
+
+    @staticmethod
+    def build_product_table(products):
+        """将商品记录转换为带类型的列式表（记录中的数值已解析，无需再转换文本）"""
+        rows = [ProductRecord.coerce(product).to_row() for product in products]
+        table = pd.DataFrame.from_records(rows, columns=ProductRecord.COLUMNS)
+        for column in ['current_price', 'original_price', 'savings_amount', 'savings_percentage']:
+            table[column] = table[column].astype('float64')
+        table['rating'] = table['rating'].astype('float32')
+        table['review_count'] = table['review_count'].astype('Int64')
+        table['scraped_at'] = pd.to_datetime(table['scraped_at'], errors='coerce')
+        table['scrape_date'] = table['scraped_at'].dt.strftime('%Y-%m-%d').fillna(time.strftime('%Y-%m-%d'))
+        for column in ['asin', 'title', 'brand', 'availability', 'description', 'image_url', 'url']:
+            table[column] = table[column].astype('string')
+        return table
+
+    @staticmethod
+    def save_to_parquet(products, category_name):
+        """以Parquet格式保存原始商品信息，按类别和采集日期分区"""
+        try:
+            if not products:
+                logger.warning("No products to save")
+                return None
+
+            table = DataSaver.build_product_table(products)
+            table['category'] = DataSaver._safe_partition_value(category_name)
+            return DataSaver.write_parquet_dataset(table, DataSaver.PARQUET_DIR)
+
+        except Exception as e:
+            logger.error(f"Error saving parquet data: {str(e)}")
+            return None
+
+    @staticmethod
+    def write_parquet_dataset(table, root_dir):
+        """将带分区列的DataFrame追加写入Parquet数据集"""
+        if importlib.util.find_spec('pyarrow') is None:
+            logger.warning("pyarrow is not installed, skipping parquet output")
+            return None
+
+        with metrics.timer('save_parquet'):
+            table.to_parquet(
+                root_dir,
+                engine='pyarrow',
+                compression='zstd',
+                index=False,
+                partition_cols=DataSaver.PARQUET_PARTITION_COLS,
+            )
+        logger.info(f"Successfully saved parquet dataset to {root_dir}")
+        return root_dir
+
+    @staticmethod
+    def _safe_partition_value(value):
+        """清理分区目录名中不允许出现的字符"""
+        return re.sub(r'[<>:"/\\|?*=]', '_', str(value)) if value else 'Uncategorized'
+
+    # 尺寸/颜色提取使用的预编译正则。所有模式都以关键词开头，因此先用锚点
+    # 正则对描述做一次扫描，只在命中的位置上锚定匹配完整模式。
+    # 每项为 (模式起点相对锚点的偏移, 模式)，"Available " 长度为10
+    _SIZE_ANCHOR = re.compile(r'size', re.IGNORECASE)
+    _SIZE_PATTERNS = [
+        (0, re.compile(
             r'Size:?\s*((?:X?S|X?M|X?L|XXL|XXXL|2XL|3XL|4XL|5XL)(?:\s*,\s*(?:X?S|X?M|X?L|XXL|XXXL|2XL|3XL|4XL|5XL))*)',
+            re.IGNORECASE)),
+        (10, re.compile(
             r'Available sizes?:?\s*((?:\d+(?:\.\d+)?(?:\s*,\s*\d+(?:\.\d+)?)*))(?:\s*(?:cm|inch|inches|"|\'|mm))?',
+            re.IGNORECASE)),
+        (0, re.compile(
             r'Sizes?(?:\s+available)?:?\s*((?:Small|Medium|Large|X-Large|XX-Large)(?:\s*,\s*(?:Small|Medium|Large|X-Large|XX-Large))*)',
-        ]
+            re.IGNORECASE)),
+    ]
+    _COLOR_ANCHOR = re.compile(r'colou?r', re.IGNORECASE)
+    _COLOR_PATTERNS = [
+        (0, re.compile(
+            r'Colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
+            re.IGNORECASE)),
+        (10, re.compile(
+            r'Available colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
+            re.IGNORECASE)),
+    ]
 
-        sizes = set()
-        if description and description != 'N/A':
-            for pattern in size_patterns:
-                matches = re.findall(pattern, description, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, str):
-                        sizes.update(size.strip() for size in match.split(','))
+    @staticmethod
+    def _scan_attribute(description, anchor, patterns):
+        """单次扫描描述提取属性值，结果与对每个模式分别 findall 相同"""
+        values = set()
+        if not description or description == 'N/A':
+            return values
 
-        return sorted(list(sizes)) if sizes else []
+        # 记录每个模式下一次允许匹配的起点，保持 findall 的不重叠语义
+        next_pos = [0] * len(patterns)
+        for hit in anchor.finditer(description):
+            for i, (offset, pattern) in enumerate(patterns):
+                start = hit.start() - offset
+                if start < next_pos[i]:
+                    continue
+                match = pattern.match(description, start)
+                if match:
+                    values.update(value.strip() for value in match.group(1).split(','))
+                    next_pos[i] = match.end()
+        return values
+
+    @staticmethod
+    def _extract_sizes(description):
+        """从描述中提取尺寸信息"""
+        sizes = DataSaver._scan_attribute(description, DataSaver._SIZE_ANCHOR, DataSaver._SIZE_PATTERNS)
+        return sorted(sizes) if sizes else []
 
     @staticmethod
     def _extract_colors(description):
         """从描述中提取颜色信息"""
-        color_patterns = [
-            r'Colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
-            r'Available colou?rs?:?\s*((?:[A-Za-z]+(?:\s+[A-Za-z]+)*(?:\s*,\s*[A-Za-z]+(?:\s+[A-Za-z]+)*)*))(?:\.|$|\n)',
-        ]
+        colors = DataSaver._scan_attribute(description, DataSaver._COLOR_ANCHOR, DataSaver._COLOR_PATTERNS)
+        return sorted(colors) if colors else []
 
-        colors = set()
-        if description and description != 'N/A':
-            for pattern in color_patterns:
-                matches = re.findall(pattern, description, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, str):
-                        colors.update(color.strip() for color in match.split(','))
+    @staticmethod
+    def extract_attributes_batch(descriptions):
+        """按列批量提取尺寸和颜色，返回逗号分隔的 (尺寸列表, 颜色列表)
+
+        同一商品常出现在多个搜索词的结果中，整列先按描述去重，
+        每条不同的描述只扫描一次。
+        """
+        scan = DataSaver._scan_attribute
+        size_anchor, size_patterns = DataSaver._SIZE_ANCHOR, DataSaver._SIZE_PATTERNS
+        color_anchor, color_patterns = DataSaver._COLOR_ANCHOR, DataSaver._COLOR_PATTERNS
+
+        descriptions = [text if isinstance(text, str) else '' for text in descriptions]
+        found = {}
+        for text in dict.fromkeys(descriptions):
+            found[text] = (','.join(sorted(scan(text, size_anchor, size_patterns))),
+                           ','.join(sorted(scan(text, color_anchor, color_patterns))))
 
-        return sorted(list(colors)) if colors else []
+        pairs = [found[text] for text in descriptions]
+        return [pair[0] for pair in pairs], [pair[1] for pair in pairs]
 
     @staticmethod
     def _create_short_description(description):
@@ -0,0 +1,494 @@
+import os
+import re
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from multiprocessing.managers import BaseManager
+from config import ScraperConfig
+from logger import logger, get_log_queue
+from metrics import metrics
+from product_record import ProductRecord
+from main import build_search_url
+import profiling
+
+# 多台机器协同采集
+#   - 协调节点（coordinator）持有SQLite任务表：每个搜索词一个搜索任务，搜索完成后
+#     按ASIN生成商品任务（多个搜索词中的同一商品只采集一次）
+#   - 工作节点（worker）的每个进程通过TCP（multiprocessing.managers，authkey认证）
+#     租用任务，处理期间定期续租，完成后交回结果和指标
+#   - 租约到期未续租（节点崩溃、断网）的任务会重新分配给其他进程，超过最大次数记为失败
+#   - 一个搜索词的所有商品任务结束后，协调节点生成该搜索词的导出文件
+#
+#   python distributed.py coordinator apple laptop --port 50000 --authkey secret
+#   python distributed.py worker --coordinator 192.168.1.10:50000 --authkey secret --processes 4
+#   python distributed.py status --coordinator 192.168.1.10:50000 --authkey secret
+
+_ASIN_PATTERN = re.compile(r'/dp/([A-Z0-9]{10})')
+
+
+class TaskBoard:
+    """SQLite任务表：任务的租用、续租、重新分配和结果收集
+
+    协调节点中只有一个实例，由 manager 的服务线程并发调用，所有操作在锁内进行。
+    数据库保存在磁盘上，协调节点重启后继续未完成的任务。
+    """
+
+    def __init__(self, db_path=None, lease_timeout=None, max_attempts=None):
+        self.db_path = db_path or ScraperConfig.COORDINATOR_DB_PATH
+        self.lease_timeout = lease_timeout or ScraperConfig.LEASE_TIMEOUT
+        self.max_attempts = max_attempts or ScraperConfig.TASK_MAX_ATTEMPTS
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self):
+        """打开数据库并创建所需的表"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,              -- search 或 product
+            key TEXT NOT NULL,               -- 搜索词或ASIN
+            url TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',  -- pending、leased、done、failed
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            finalized INTEGER NOT NULL DEFAULT 0,  -- 搜索任务：是否已生成导出文件
+            output TEXT,
+            UNIQUE (kind, key))''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS term_products (
+            term_id INTEGER NOT NULL,
+            asin TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY (term_id, asin))''')
+        return conn
+
+    def add_terms(self, terms):
+        """添加搜索任务，已存在的搜索词不重复添加，返回新增数量"""
+        with self._lock:
+            added = 0
+            for term in terms:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO tasks (kind, key, url) VALUES ('search', ?, ?)",
+                    (term, build_search_url(term)))
+                added += cursor.rowcount
+            return added
+
+    def lease(self, worker):
+        """租用一个任务，优先分配商品任务；没有可用任务时返回None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                task = None
+                rows = self._conn.execute(
+                    "SELECT * FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY kind = 'search', id", (now,)).fetchall()
+                for row in rows:
+                    if row['status'] == 'leased':
+                        logger.warning(f"Lease of {row['kind']} task {row['key']} held by {row['worker']} expired")
+                        if row['attempts'] >= self.max_attempts:
+                            self._conn.execute(
+                                "UPDATE tasks SET status = 'failed', error = ? WHERE id = ?",
+                                (f"lease expired after {row['attempts']} attempts", row['id']))
+                            continue
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (worker, now + self.lease_timeout, row['id']))
+                    task = {'id': row['id'], 'kind': row['kind'], 'key': row['key'], 'url': row['url'],
+                            'term': self._term_of(row), 'lease_timeout': self.lease_timeout}
+                    break
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            return task
+
+    def _term_of(self, row):
+        """商品任务所属的（第一个）搜索词，用于采集时的类别名称"""
+        if row['kind'] == 'search':
+            return row['key']
+        term = self._conn.execute(
+            "SELECT t.key FROM term_products tp JOIN tasks t ON t.id = tp.term_id "
+            "WHERE tp.asin = ? ORDER BY t.id LIMIT 1", (row['key'],)).fetchone()
+        return term['key'] if term else None
+
+    def heartbeat(self, task_id, worker):
+        """续租，租约已被重新分配时返回False"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_timeout, task_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, result):
+        """交回任务结果；租约过期后原进程仍完成了任务时同样接受，重复的结果被忽略
+
+        重复结果附带的指标同样忽略，同一任务的耗时不会被计入两次。
+        """
+        snapshot = result.pop('metrics', None)
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
+            if row is None or row['status'] == 'done':
+                return False
+
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if row['kind'] == 'search':
+                    asins = []
+                    for link in result['links']:
+                        match = _ASIN_PATTERN.search(link)
+                        if match and match.group(1) not in asins:
+                            asins.append(match.group(1))
+                    for rank, asin in enumerate(asins, 1):
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO tasks (kind, key, url) VALUES ('product', ?, ?)",
+                            (asin, f'{ScraperConfig.BASE_URL}/dp/{asin}'))
+                        self._conn.execute(
+                            'INSERT OR IGNORE INTO term_products (term_id, asin, rank) VALUES (?, ?, ?)',
+                            (task_id, asin, rank))
+                    stored = json.dumps({'products': len(asins)})
+                    logger.info(f"Search '{row['key']}' by {worker}: {len(asins)} products queued")
+                else:
+                    stored = json.dumps(result['product'], ensure_ascii=False, default=str)
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'done', worker = ?, result = ?, error = NULL WHERE id = ?",
+                    (worker, stored, task_id))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            metrics.merge(snapshot)
+            return True
+
+    def fail(self, task_id, worker, error):
+        """任务处理失败：未超过最大次数时重新排队
+
+        只接受仍持有租约的进程的失败；租约过期、任务已交给其他进程后迟到的失败被忽略，
+        不会打断新进程的处理，也不计入失败次数。
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
+            if row is None or row['status'] != 'leased' or row['worker'] != worker:
+                logger.debug(f"Ignoring stale failure of task {task_id} from {worker}")
+                return
+            status = 'failed' if row['attempts'] >= self.max_attempts else 'pending'
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (status, error, task_id, worker))
+            logger.warning(f"{row['kind'].title()} task {row['key']} failed on {worker} "
+                           f"(attempt {row['attempts']}/{self.max_attempts}): {error}")
+
+    def ready_terms(self):
+        """搜索和所有商品任务都已结束、尚未生成导出文件的搜索词"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, status FROM tasks s WHERE kind = 'search' AND finalized = 0 "
+                "AND status IN ('done', 'failed') AND NOT EXISTS ("
+                "  SELECT 1 FROM term_products tp JOIN tasks p ON p.kind = 'product' AND p.key = tp.asin "
+                "  WHERE tp.term_id = s.id AND p.status NOT IN ('done', 'failed')) ORDER BY id").fetchall()
+            return [dict(row) for row in rows]
+
+    def term_products(self, term_id, term):
+        """搜索词的已采集商品（按搜索结果排序），类别统一为该搜索词"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.result FROM term_products tp JOIN tasks p ON p.kind = 'product' AND p.key = tp.asin "
+                "WHERE tp.term_id = ? AND p.status = 'done' ORDER BY tp.rank", (term_id,)).fetchall()
+        return [ProductRecord.from_dict(dict(json.loads(row['result']), category=term)) for row in rows]
+
+    def mark_finalized(self, term_id, output):
+        with self._lock:
+            self._conn.execute('UPDATE tasks SET finalized = 1, output = ? WHERE id = ?', (output, term_id))
+
+    def finished(self):
+        """所有任务都已结束且导出文件都已生成"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased') "
+                "OR (kind = 'search' AND finalized = 0)").fetchone()
+            return row[0] == 0
+
+    def stats(self):
+        """按任务类型和状态统计数量，以及各进程完成的任务数"""
+        with self._lock:
+            counts = {}
+            for row in self._conn.execute('SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status'):
+                counts.setdefault(row['kind'], {})[row['status']] = row['n']
+            workers = {row['worker']: row['n'] for row in self._conn.execute(
+                "SELECT worker, COUNT(*) AS n FROM tasks WHERE status = 'done' GROUP BY worker")}
+            return {'tasks': counts, 'workers': workers}
+
+    def term_outputs(self):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT key, status, output, error FROM tasks WHERE kind = 'search' ORDER BY id")]
+
+
+class CoordinatorManager(BaseManager):
+    """协调节点与工作节点之间的连接，工作节点通过 board() 得到任务表的代理"""
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port or ScraperConfig.COORDINATOR_PORT)
+
+
+def _authkey(value):
+    return str(value or ScraperConfig.COORDINATOR_AUTHKEY).encode('utf-8')
+
+
+def connect(address, authkey):
+    """连接协调节点，返回任务表的代理"""
+    CoordinatorManager.register('board')
+    manager = CoordinatorManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.board()
+
+
+def _finalize_term(board, term):
+    """生成一个搜索词的导出文件，返回最终文件路径"""
+    from data_saver import DataSaver
+    from finalExcel import process_excel
+
+    products = board.term_products(term['id'], term['key'])
+    if not products:
+        logger.warning(f"No products collected for '{term['key']}'")
+        return None
+    dataframe = DataSaver.build_dataframe(products)
+    if ScraperConfig.SAVE_INTERMEDIATE_CSV:
+        DataSaver.save_dataframe(dataframe, term['key'])
+    if ScraperConfig.PARQUET_ENABLED:
+        DataSaver.save_to_parquet(products, term['key'])
+    final_output = process_excel(dataframe, DataSaver.FINAL_OUTPUT_DIR, term['key'])
+    logger.info(f"'{term['key']}': {len(products)} products written to {final_output}")
+    return final_output
+
+
+def run_coordinator(terms, host, port, authkey, db_path=None, report_interval=30):
+    """启动协调节点，所有任务完成并生成导出文件后返回各搜索词的结果"""
+    from data_saver import DataSaver
+    from merge_exports import merge_exports
+
+    board = TaskBoard(db_path)
+    added = board.add_terms(terms)
+    logger.info(f"Coordinator queued {added} new search terms (database: {board.db_path})")
+
+    CoordinatorManager.register('board', callable=lambda: board)
+    manager = CoordinatorManager(address=(host, port), authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Coordinator listening on {host}:{port}")
+
+    run_id = time.strftime('%Y%m%d_%H%M%S')
+    start_time = time.time()
+    last_report = 0
+    while not board.finished():
+        for term in board.ready_terms():
+            try:
+                output = _finalize_term(board, term)
+            except Exception as e:
+                logger.error(f"Error writing output for '{term['key']}': {str(e)}")
+                output = None
+            board.mark_finalized(term['id'], output)
+        if time.time() - last_report >= report_interval:
+            stats = board.stats()
+            logger.info(f"Tasks: {stats['tasks']}, completed per worker: {stats['workers']}")
+            last_report = time.time()
+        time.sleep(1)
+    # 工作节点在下一次租用时得知已全部完成，或在连接关闭后退出
+    server.stop_event.set()
+
+    outputs = board.term_outputs()
+    final_files = [term['output'] for term in outputs if term['output']]
+    if ScraperConfig.MERGE_EXPORTS and len(final_files) > 1:
+        merged_file = merge_exports(final_files, DataSaver.FINAL_OUTPUT_DIR)
+        logger.info(f"Merged Import File: {merged_file}")
+
+    logger.info("=" * 50)
+    logger.info(f"Distributed run finished in {time.time() - start_time:.2f} seconds")
+    stats = board.stats()
+    logger.info(f"Tasks: {stats['tasks']}")
+    for worker, count in sorted(stats['workers'].items()):
+        logger.info(f"{worker}: {count} tasks")
+    for term in outputs:
+        logger.info(f"{term['key']}: {term['status']} -> {term['output'] or 'no output'}")
+    metrics.log_summary()
+    logger.info(f"Metrics written to: {metrics.write(run_id=run_id)}")
+    return outputs
+
+
+class _LeaseKeeper:
+    """处理任务期间在后台线程中定期续租"""
+
+    def __init__(self, board, task, worker):
+        self._stop = threading.Event()
+        interval = max(task['lease_timeout'] / 3, 1)
+
+        def renew():
+            while not self._stop.wait(interval):
+                try:
+                    if not board.heartbeat(task['id'], worker):
+                        logger.warning(f"Lease on {task['kind']} task {task['key']} was reassigned")
+                        return
+                except Exception as e:
+                    logger.warning(f"Error renewing lease: {str(e)}")
+                    return
+
+        self._thread = threading.Thread(target=renew, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_task(scraper, task):
+    """在浏览器中处理一个任务，返回交给协调节点的结果"""
+    from post_processor import finalize_product
+
+    scraper.category_name = task['term']
+    if task['kind'] == 'search':
+        links = scraper.discover_products(task['url'])
+        if not links:
+            raise RuntimeError('no search results')
+        return {'links': links}
+
+    start = time.perf_counter()
+    product = finalize_product(scraper.extract_raw_product_info(task['url']))
+    metrics.observe('product', time.perf_counter() - start)
+    if product is None:
+        raise RuntimeError('no product data extracted')
+    return {'product': product.to_dict()}
+
+
+def worker_loop(address, authkey, poll_interval=5):
+    """工作进程：不断租用并处理任务，全部完成或协调节点关闭后退出"""
+    from driver_manager import DriverManager
+    from scraper import AmazonScraper
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    board = connect(address, authkey)
+    driver_manager = None
+    scraper = None
+    processed = 0
+    try:
+        while True:
+            try:
+                task = board.lease(worker)
+                if task is None:
+                    if board.finished():
+                        break
+                    time.sleep(poll_interval)
+                    continue
+            except (EOFError, OSError) as e:
+                logger.info(f"Coordinator closed the connection ({str(e)}), stopping")
+                break
+
+            try:
+                # 浏览器在第一个任务时启动，之后的任务复用
+                if scraper is None:
+                    driver_manager = DriverManager()
+                    driver_manager.setup_driver(ScraperConfig.HEADLESS)
+                    scraper = AmazonScraper(driver_manager)
+                logger.info(f"{worker} processing {task['kind']} task {task['key']}")
+                with _LeaseKeeper(board, task, worker):
+                    result = process_task(scraper, task)
+                result['metrics'] = metrics.snapshot(reset=True)
+                board.complete(task['id'], worker, result)
+                processed += 1
+            except (EOFError, ConnectionError) as e:
+                logger.info(f"Coordinator closed the connection ({str(e)}), stopping")
+                break
+            except Exception as e:
+                logger.error(f"{worker} error on {task['kind']} task {task['key']}: {str(e)}")
+                try:
+                    board.fail(task['id'], worker, str(e))
+                except (EOFError, OSError):
+                    break
+                # 浏览器可能已失效，下一个任务时重新启动
+                if driver_manager:
+                    driver_manager.quit()
+                driver_manager = scraper = None
+            if scraper:
+                scraper.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+    finally:
+        if driver_manager:
+            driver_manager.quit()
+    logger.info(f"{worker} finished after {processed} tasks")
+
+
+def _node_process(address, authkey, log_queue, profile_settings):
+    from parallel_scraper import ParallelScraper
+    ParallelScraper.init_worker(log_queue, profile_settings)
+    worker_loop(address, authkey)
+
+
+def run_worker_node(address, authkey, processes):
+    """在本机启动多个工作进程，每个进程一个浏览器"""
+    from parallel_scraper import get_mp_context
+
+    context = get_mp_context()
+    log_queue = get_log_queue(context)
+    workers = [context.Process(target=_node_process, args=(address, authkey, log_queue, profiling.settings()),
+                               name=f"DistributedWorker-{i + 1}")
+               for i in range(processes)]
+    logger.info(f"Starting {processes} worker processes for coordinator {address[0]}:{address[1]}")
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        # 未交回的任务在租约到期后由协调节点重新分配
+        for process in workers:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多台机器协同采集：协调节点分配任务，工作节点拉取任务")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = subparsers.add_parser("coordinator", help="启动协调节点")
+    coordinator.add_argument("terms", nargs="*", help="搜索关键词（数据库中未完成的任务会继续）")
+    coordinator.add_argument("--host", default="0.0.0.0", help="监听地址")
+    coordinator.add_argument("--port", type=int, default=ScraperConfig.COORDINATOR_PORT)
+    coordinator.add_argument("--db", help="任务数据库路径，默认使用COORDINATOR_DB_PATH")
+
+    worker = subparsers.add_parser("worker", help="启动工作节点")
+    worker.add_argument("--coordinator", required=True, help="协调节点地址 host:port")
+    worker.add_argument("--processes", type=int, default=ScraperConfig.MAX_WORKERS, help="本机的工作进程数")
+
+    status = subparsers.add_parser("status", help="查看协调节点的任务状态")
+    status.add_argument("--coordinator", required=True, help="协调节点地址 host:port")
+
+    for subparser in (coordinator, worker, status):
+        subparser.add_argument("--authkey", help="连接认证密钥，默认使用COORDINATOR_AUTHKEY")
+    args = parser.parse_args()
+
+    authkey = _authkey(args.authkey)
+    if not authkey:
+        parser.error("an authkey is required: pass --authkey or set COORDINATOR_AUTHKEY")
+
+    if args.command == "coordinator":
+        run_coordinator(args.terms, args.host, args.port, authkey, args.db)
+    elif args.command == "worker":
+        run_worker_node(parse_address(args.coordinator), authkey, args.processes)
+    else:
+        print(json.dumps(connect(parse_address(args.coordinator), authkey).stats(), indent=2, ensure_ascii=False))
@@ -28,6 +28,8 @@ class DriverManager:
 
                 self.driver = uc.Chrome(options=options)
                 self.wait = WebDriverWait(self.driver, ScraperConfig.WAIT_TIME)
+                # 滚动等待脚本自己控制超时，浏览器一侧的脚本超时只需留出余量
+                self.driver.set_script_timeout(ScraperConfig.SCROLL_TIMEOUT + 5)
                 self._setup_anti_detection()
                 logger.info(f"Chrome driver setup successful with {'headless' if headless else 'normal'} mode")
                 return self.driver, self.wait
@@ -111,6 +113,17 @@ class DriverManager:
         except Exception as e:
             logger.warning(f"Failed to setup anti-detection: {str(e)}")
 
+    def process_ids(self):
+        """chromedriver 和浏览器主进程的进程号，主进程在强制停止时用于清理"""
+        pids = []
+        process = getattr(getattr(self.driver, 'service', None), 'process', None)
+        if process is not None:
+            pids.append(process.pid)
+        browser_pid = getattr(self.driver, 'browser_pid', None)
+        if browser_pid:
+            pids.append(browser_pid)
+        return pids
+
     def quit(self):
         """安全关闭驱动"""
         if hasattr(self, 'driver') and self.driver:
@@ -0,0 +1,50 @@
+import time
+from logger import logger
+
+
+class ExtractionContext:
+    """单个商品页的字段提取上下文
+
+    同一页面上的字段只提取一次（例如可用性复用价格、品牌复用标题），
+    并且所有字段共享一个总时间预算：预算用完后剩余字段直接记为默认值，
+    元素等待时间也不会超过剩余预算。每个字段的耗时记录在 timings 中。
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.deadline = time.monotonic() + budget
+        self.timings = {}  # 字段名 -> 耗时（秒）
+        self.skipped = []  # 因预算用完而未提取的字段
+        self._values = {}
+
+    def remaining(self):
+        """剩余的时间预算（秒）"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def cap_timeout(self, timeout):
+        """将等待时间限制在剩余预算内"""
+        return min(timeout, self.remaining())
+
+    def get(self, name, extractor, default='N/A'):
+        """获取字段值，首次访问时调用 extractor 提取并缓存"""
+        if name in self._values:
+            return self._values[name]
+
+        if self.expired():
+            self.skipped.append(name)
+            self.timings[name] = 0.0
+            value = default
+        else:
+            start = time.monotonic()
+            try:
+                value = extractor()
+            except Exception as e:
+                logger.warning(f"Error extracting {name}: {str(e)}")
+                value = default
+            self.timings[name] = time.monotonic() - start
+
+        self._values[name] = value
+        return value
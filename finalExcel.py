@@ -1,17 +1,28 @@
+import re
 import time
+import json
 import pandas as pd
-import random
 import os
 from logger import logger
+from config import ScraperConfig
+from data_saver import DataSaver
+from id_allocator import get_allocator
+from metrics import metrics
 
 
 def try_read_csv(file_path):
-    """尝试使用不同编码格式读取CSV文件"""
-    encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb18030', 'iso-8859-1']
+    """读取DataSaver保存的CSV文件，编码和列类型均为已知"""
+    try:
+        df = pd.read_csv(file_path, encoding='utf-8-sig', dtype=DataSaver.WOO_DTYPES)
+        logger.info("Successfully read file with utf-8-sig encoding")
+        return df
+    except UnicodeDecodeError:
+        logger.warning(f"File is not utf-8 encoded, trying legacy encodings: {file_path}")
 
-    for encoding in encodings:
+    # 兼容手工编辑过的旧文件
+    for encoding in ['gbk', 'gb18030', 'iso-8859-1']:
         try:
-            df = pd.read_csv(file_path, encoding=encoding)
+            df = pd.read_csv(file_path, encoding=encoding, dtype=DataSaver.WOO_DTYPES)
             logger.info(f"Successfully read file with {encoding} encoding")
             return df
         except UnicodeDecodeError:
@@ -23,18 +34,56 @@ def try_read_csv(file_path):
     raise ValueError("Unable to read file with any common encoding")
 
 
-def generate_unique_random_ids(count, length=5):
-    """生成指定数量的唯一随机ID"""
-    return random.sample(range(10 ** (length - 1), 10 ** length), count)
+def load_input_data(input_data):
+    """将文件路径、DataFrame或记录列表统一转换为DataFrame"""
+    if isinstance(input_data, (str, os.PathLike)):
+        return try_read_csv(input_data)
+
+    if isinstance(input_data, pd.DataFrame):
+        df = input_data
+    else:
+        df = pd.DataFrame(list(input_data), columns=DataSaver.WOO_COLUMNS)
+
+    # 与读取CSV时的缺失值处理保持一致
+    return df.replace(['', 'N/A'], float('nan'))
+
+
+def describe_input(input_data):
+    """生成用于日志的输入数据描述"""
+    if isinstance(input_data, (str, os.PathLike)):
+        return f"file: {input_data}"
+    return f"in-memory data ({len(input_data)} rows)"
+
 
+def build_woo_table(woo_df):
+    """将WooCommerce导出数据转换为带类型、带分区列的列式表"""
+    table = woo_df.astype('string')
+    table['ID'] = pd.to_numeric(woo_df['ID'], errors='coerce').astype('Int64')
+    for column in ['Sale price', 'Regular price']:
+        table[column] = pd.to_numeric(woo_df[column], errors='coerce').astype('float64')
 
-def process_excel(input_file_path, output_dir):
-    """处理Excel文件并转换为WooCommerce格式"""
+    # 变体行没有分类，沿用其父商品的分类
+    categories = woo_df['Categories'].where(woo_df['Type'] != 'variation').ffill()
+    table['category'] = categories.fillna('Uncategorized').map(
+        lambda value: DataSaver._safe_partition_value(str(value).split(',')[0].strip())
+    )
+    table['scrape_date'] = time.strftime('%Y-%m-%d')
+    return table
+
+
+def process_excel(input_data, output_dir, name=None):
+    """处理采集数据并转换为WooCommerce格式
+
+    input_data 可以是CSV文件路径，也可以是 DataSaver.build_dataframe 返回的
+    DataFrame 或记录列表，后两者无需经过中间CSV文件。
+    指定 name（如搜索词）时加入文件名，避免同一秒内生成的文件互相覆盖。
+    """
+    start_time = time.perf_counter()
     try:
-        logger.info(f"Starting to process file: {input_file_path}")
+        logger.info(f"Starting to process {describe_input(input_data)}")
 
-        # 读取原始Excel文件
-        df = try_read_csv(input_file_path)
+        # 读取原始数据
+        df = load_input_data(input_data)
 
         # 创建WooCommerce需要的字段
         columns = [
@@ -54,14 +103,21 @@ def process_excel(input_file_path, output_dir):
         # 创建空的DataFrame
         woo_df = pd.DataFrame(columns=columns)
         rows_to_add = []
+        # 每行对应的ID映射键，变体使用 SKU|尺寸|颜色
+        row_keys = []
 
         # 处理每个产品
         for _, row in df.iterrows():
             # 处理图片链接
             images = row['Images'].replace('fmt=webp', 'fmt=jpg') if pd.notna(row['Images']) else ''
 
+            # 页面中的真实变体组合（旧版中间数据没有该列）
+            variations = row.get('Variations')
+            variants = json.loads(variations) if isinstance(variations, str) and variations else []
+
             # 确定产品类型
-            product_type = 'variable' if pd.notna(row['Sizes']) and row['Sizes'] else 'simple'
+            has_sizes = pd.notna(row['Sizes']) and bool(row['Sizes'])
+            product_type = 'variable' if variants or has_sizes else 'simple'
 
             # 处理颜色值
             color_value = row['Color'] if pd.notna(row['Color']) and row['Color'] != '' else 'As shown in the figure'
@@ -87,52 +143,58 @@ def process_excel(input_file_path, output_dir):
                 'Regular price': row['Regular price'],
                 'Categories': row['Category'] if pd.notna(row['Category']) else 'Uncategorized',
                 'Images': images,
-                'Attribute 1 name': 'Size' if product_type == 'variable' else '',
-                'Attribute 1 value(s)': row['Sizes'] if pd.notna(row['Sizes']) else '',
-                'Attribute 1 visible': 1 if product_type == 'variable' else '',
-                'Attribute 1 global': 1 if product_type == 'variable' else '',
+                'Attribute 1 name': 'Size' if has_sizes else '',
+                'Attribute 1 value(s)': row['Sizes'] if has_sizes else '',
+                'Attribute 1 visible': 1 if has_sizes else '',
+                'Attribute 1 global': 1 if has_sizes else '',
                 'Attribute 2 name': 'Color',
                 'Attribute 2 value(s)': color_value,
                 'Attribute 2 visible': 1,
                 'Attribute 2 global': 1
             }
             rows_to_add.append(base_product)
+            row_keys.append(sku_value)
 
             # 处理变体
             if product_type == 'variable':
-                sizes = row['Sizes'].split(',') if pd.notna(row['Sizes']) else []
-                colors = row['Color'].split(',') if pd.notna(row['Color']) else [color_value]
+                if variants:
+                    # 只生成页面中实际存在的组合
+                    combinations = [(v['size'], v['color'] or color_value) for v in variants]
+                else:
+                    # 没有变体数据时，使用从描述中提取的尺寸和颜色的全部组合
+                    sizes = row['Sizes'].split(',') if has_sizes else []
+                    colors = row['Color'].split(',') if pd.notna(row['Color']) else [color_value]
+                    combinations = [(size.strip(), color.strip()) for size in sizes for color in colors]
                 base_sale_price = row['Sale_Price'] if pd.notna(row['Sale_Price']) else row['Regular price']
                 base_regular_price = row['Regular price']
 
-                for size in sizes:
-                    for color in colors:
-                        variant = {
-                            'ID': '',
-                            'Type': 'variation',
-                            'SKU': '',
-                            'Name': row['Title'],
-                            'Published': 1,
-                            'Parent': row['Title'],
-                            'Sale price': base_sale_price,
-                            'Regular price': base_regular_price,
-                            'Attribute 1 name': 'Size',
-                            'Attribute 1 value(s)': size.strip(),
-                            'Attribute 1 visible': 1,
-                            'Attribute 1 global': 1,
-                            'Attribute 2 name': 'Color',
-                            'Attribute 2 value(s)': color.strip(),
-                            'Attribute 2 visible': 1,
-                            'Attribute 2 global': 1
-                        }
-                        rows_to_add.append(variant)
+                for size, color in combinations:
+                    variant = {
+                        'ID': '',
+                        'Type': 'variation',
+                        'SKU': '',
+                        'Name': row['Title'],
+                        'Published': 1,
+                        'Parent': row['Title'],
+                        'Sale price': base_sale_price,
+                        'Regular price': base_regular_price,
+                        'Attribute 1 name': 'Size' if has_sizes else '',
+                        'Attribute 1 value(s)': size,
+                        'Attribute 1 visible': 1 if has_sizes else '',
+                        'Attribute 1 global': 1 if has_sizes else '',
+                        'Attribute 2 name': 'Color',
+                        'Attribute 2 value(s)': color,
+                        'Attribute 2 visible': 1,
+                        'Attribute 2 global': 1
+                    }
+                    rows_to_add.append(variant)
+                    row_keys.append(f"{sku_value}|{size}|{color}" if sku_value else '')
 
         # 将所有行添加到DataFrame
         woo_df = pd.concat([woo_df, pd.DataFrame(rows_to_add)], ignore_index=True)
 
-        # 生成并分配唯一ID
-        unique_ids = generate_unique_random_ids(len(woo_df))
-        woo_df['ID'] = unique_ids
+        # 分配持久化ID，同一SKU在每次导出中保持相同ID
+        woo_df['ID'] = get_allocator().allocate(row_keys)
 
         # 设置库存和可见性
         woo_df['In stock?'] = 1000
@@ -149,7 +211,8 @@ def process_excel(input_file_path, output_dir):
                 woo_df.at[index, 'Regular price'] = ''
             elif row['Type'] == 'variation' and variable_id is not None:
                 woo_df.at[index, 'Parent'] = f"id:{variable_id}"
-                attribute_value = row['Attribute 1 value(s)']
+                # 只有颜色维度的变体以颜色命名
+                attribute_value = row['Attribute 1 value(s)'] or row['Attribute 2 value(s)']
                 woo_df.at[index, 'Name'] = f"{product_name} - {attribute_value}"
 
         # 创建输出目录
@@ -157,10 +220,20 @@ def process_excel(input_file_path, output_dir):
 
         # 保存文件
         timestamp = time.strftime("%Y%m%d_%H%M%S")
+        if name:
+            safe_name = re.sub(r'[<>:"/\\|?*\s]', '_', name)
+            timestamp = f'{safe_name}_{timestamp}'
         output_filename = f'updated_wc_product_export_with_multiple_products_{timestamp}.csv'
         output_path = os.path.join(output_dir, output_filename)
         woo_df.to_csv(output_path, index=False, encoding='utf-8-sig')
 
+        # 可选的列式输出，失败时不影响已经写出的CSV导出文件
+        if ScraperConfig.PARQUET_ENABLED:
+            try:
+                DataSaver.write_parquet_dataset(build_woo_table(woo_df), DataSaver.FINAL_PARQUET_DIR)
+            except Exception as e:
+                logger.warning(f"Error saving parquet export for {output_path}: {str(e)}")
+
         logger.info(f"Successfully processed and saved to: {output_path}")
         return output_path
 
@@ -168,6 +241,9 @@ def process_excel(input_file_path, output_dir):
         logger.error(f"Error processing file: {str(e)}")
         return None
 
+    finally:
+        metrics.observe('process_excel', time.perf_counter() - start_time)
+
 
 if __name__ == "__main__":
     # 测试用例
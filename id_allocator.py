@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import threading
+from config import ScraperConfig
+from logger import logger
+
+
+class IdAllocator:
+    """基于SQLite的持久化WooCommerce商品ID分配器
+
+    同一个键（SKU或变体键）在每次运行中都映射到同一个ID，重复导入时
+    WooCommerce会更新已有商品而不是新建。新ID按块从全局序列中预留，
+    每个进程只在预留新块和写入新映射时短暂持有写锁。
+    """
+
+    SEQUENCE_NAME = 'product'
+
+    def __init__(self, db_path=None, block_size=None, start_id=None):
+        self.db_path = db_path or ScraperConfig.ID_DB_PATH
+        self.block_size = block_size or ScraperConfig.ID_BLOCK_SIZE
+        self.start_id = start_id or ScraperConfig.ID_START
+        self._next_id = 0
+        self._block_end = 0
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self):
+        """打开数据库并创建所需的表"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS sequence (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS sku_ids (sku TEXT PRIMARY KEY, id INTEGER NOT NULL UNIQUE)')
+        return conn
+
+    def _reserve_block(self, count):
+        """从全局序列中预留一段连续ID"""
+        size = max(count, self.block_size)
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._conn.execute(
+                'SELECT next_id FROM sequence WHERE name = ?', (self.SEQUENCE_NAME,)
+            ).fetchone()
+            start = row[0] if row else self.start_id
+            self._conn.execute(
+                'INSERT INTO sequence (name, next_id) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET next_id = excluded.next_id',
+                (self.SEQUENCE_NAME, start + size)
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+        self._next_id = start
+        self._block_end = start + size
+        logger.debug(f"Reserved product IDs {start}-{start + size - 1}")
+
+    def _take(self, count):
+        """从本进程已预留的ID块中取出指定数量的ID"""
+        ids = []
+        while len(ids) < count:
+            if self._next_id >= self._block_end:
+                self._reserve_block(count - len(ids))
+            take = min(count - len(ids), self._block_end - self._next_id)
+            ids.extend(range(self._next_id, self._next_id + take))
+            self._next_id += take
+        return ids
+
+    def _lookup(self, keys):
+        """批量查询已分配的ID"""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = self._conn.execute(
+                f'SELECT sku, id FROM sku_ids WHERE sku IN ({placeholders})', batch
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def allocate(self, keys):
+        """为每个键分配ID，键为空时分配一个不做映射的新ID"""
+        with self._lock:
+            unique_keys = {key for key in keys if key}
+            assigned = self._lookup(unique_keys)
+
+            missing = sorted(unique_keys - assigned.keys())
+            if missing:
+                new_ids = self._take(len(missing))
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    # 其他进程可能已抢先写入同一键，以先写入者为准
+                    self._conn.executemany(
+                        'INSERT OR IGNORE INTO sku_ids (sku, id) VALUES (?, ?)',
+                        zip(missing, new_ids)
+                    )
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+                assigned.update(self._lookup(missing))
+
+            fresh_ids = iter(self._take(sum(1 for key in keys if not key)))
+            return [assigned[key] if key else next(fresh_ids) for key in keys]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# (数据库路径, 进程ID) -> 分配器。fork 出的子进程会继承父进程的缓存，其中的SQLite连接
+# 和已预留的ID段不能在子进程中使用，按进程ID区分后子进程会打开自己的连接
+_allocators = {}
+
+
+def get_allocator(db_path=None):
+    """获取当前进程共享的ID分配器"""
+    key = (db_path or ScraperConfig.ID_DB_PATH, os.getpid())
+    if key not in _allocators:
+        _allocators[key] = IdAllocator(key[0])
+    return _allocators[key]
@@ -0,0 +1,199 @@
+import os
+import io
+import json
+import time
+import hashlib
+import threading
+import importlib.util
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from config import ScraperConfig
+from logger import logger
+from metrics import metrics
+
+
+class ImagePipeline:
+    """在后台线程池中下载商品主图并保存到本地媒体目录
+
+    与采集同时进行：浏览器线程提交图片URL后立即继续，下载在线程池中完成。
+    同一URL只下载一次，内容相同的图片（按SHA-256）只保存一份；安装了
+    Pillow 时转换为目标格式，否则按原格式保存。每张图片记录在媒体目录的
+    manifest.jsonl 中，下次运行时已下载的URL会直接复用。
+    """
+
+    MANIFEST_NAME = 'manifest.jsonl'
+    QUALITY = 85
+    TIMEOUT = 20
+    USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    # 文件头与扩展名的对应关系，未安装 Pillow 时用于确定保存的扩展名
+    _SIGNATURES = [(b'\xff\xd8\xff', 'jpg'), (b'\x89PNG', 'png'), (b'GIF8', 'gif'), (b'RIFF', 'webp')]
+
+    def __init__(self, media_dir=None, workers=None, target_format=None):
+        self.media_dir = media_dir or ScraperConfig.IMAGE_MEDIA_DIR
+        self.workers = workers or ScraperConfig.IMAGE_WORKERS
+        self.target_format = (target_format or ScraperConfig.IMAGE_FORMAT).lower()
+        os.makedirs(self.media_dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.media_dir, self.MANIFEST_NAME)
+
+        self._lock = threading.Lock()
+        self._by_url = {}   # URL -> 清单记录
+        self._by_hash = {}  # 原始内容SHA-256 -> 本地文件名
+        self._submitted = set()  # 本次运行已提交的URL
+        self._load_manifest()
+
+        self._can_convert = importlib.util.find_spec('PIL') is not None
+        if not self._can_convert:
+            logger.warning("Pillow is not installed, images are saved in their original format")
+
+        # 限制排队的下载数量，避免采集速度远超下载时积压过多任务
+        self._slots = threading.BoundedSemaphore(self.workers * 4)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-download')
+        self.downloaded = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _load_manifest(self):
+        """读取已有的下载清单"""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, encoding='utf-8') as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if os.path.exists(os.path.join(self.media_dir, record['file'])):
+                    self._by_url[record['url']] = record
+                    self._by_hash[record['sha256']] = record['file']
+
+    def _append_manifest(self, record):
+        # 一条记录一次写入，多个采集进程追加同一清单时不会互相截断
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with open(self.manifest_path, 'a', encoding='utf-8') as fp:
+            fp.write(line)
+
+    def _guess_extension(self, data):
+        for signature, extension in self._SIGNATURES:
+            if data.startswith(signature):
+                return extension
+        return 'bin'
+
+    def _convert(self, data):
+        """转换为目标格式，返回 (内容, 扩展名)"""
+        if not self._can_convert:
+            return data, self._guess_extension(data)
+
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            pil_format = 'JPEG' if self.target_format in ('jpg', 'jpeg') else self.target_format.upper()
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, format=pil_format, quality=self.QUALITY)
+        return output.getvalue(), self.target_format
+
+    def _download(self, url, sku):
+        """下载、去重、转换并保存一张图片，返回清单记录"""
+        try:
+            start = time.perf_counter()
+            request = urllib.request.Request(url, headers={'User-Agent': self.USER_AGENT})
+            with urllib.request.urlopen(request, timeout=self.TIMEOUT) as response:
+                data = response.read()
+                content_type = response.headers.get('Content-Type', '')
+
+            sha256 = hashlib.sha256(data).hexdigest()
+            with self._lock:
+                file_name = self._by_hash.get(sha256)
+
+            duplicate = file_name is not None
+            if not duplicate:
+                converted, extension = self._convert(data)
+                file_name = f"{sha256[:20]}.{extension}"
+                path = os.path.join(self.media_dir, file_name)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as fp:
+                    fp.write(converted)
+                os.replace(tmp_path, path)
+
+            record = {
+                'url': url,
+                'sku': sku,
+                'sha256': sha256,
+                'file': file_name,
+                'content_type': content_type,
+                'bytes': len(data),
+                'seconds': round(time.perf_counter() - start, 3),
+            }
+            metrics.observe('image_download', record['seconds'])
+            with self._lock:
+                if duplicate:
+                    self.reused += 1
+                else:
+                    self.downloaded += 1
+                self._by_hash.setdefault(sha256, file_name)
+                self._by_url[url] = record
+                self._append_manifest(record)
+            return record
+
+        except Exception as e:
+            metrics.inc('images_failed')
+            with self._lock:
+                self.failed += 1
+            logger.warning(f"Error downloading image {url}: {str(e)}")
+            return None
+
+        finally:
+            self._slots.release()
+
+    def submit(self, url, sku=None):
+        """提交一张图片，已下载或已提交的URL不会重复下载"""
+        if not url or url == 'N/A':
+            return
+        url = url.replace('fmt=webp', 'fmt=jpg')
+        with self._lock:
+            if url in self._by_url or url in self._submitted:
+                return
+            self._submitted.add(url)
+
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._download, url, sku)
+        except Exception:
+            # 线程池已关闭等情况下任务不会运行，归还名额，避免之后的提交一直阻塞
+            self._slots.release()
+            with self._lock:
+                self._submitted.discard(url)
+            raise
+
+    def local_file(self, url):
+        """返回图片在媒体目录中的文件名，未下载时返回None"""
+        if not url or url == 'N/A':
+            return None
+        record = self._by_url.get(url.replace('fmt=webp', 'fmt=jpg'))
+        return record['file'] if record else None
+
+    def local_url(self, file_name):
+        """本地文件上传到网站后的访问地址，未配置 IMAGE_BASE_URL 时返回None"""
+        if not ScraperConfig.IMAGE_BASE_URL:
+            return None
+        return f"{ScraperConfig.IMAGE_BASE_URL.rstrip('/')}/{file_name}"
+
+    def attach(self, products):
+        """为已下载主图的商品记录本地文件，配置了 IMAGE_BASE_URL 时改用本地图片地址"""
+        for product in products:
+            file_name = self.local_file(product.image_url)
+            if not file_name:
+                continue
+            product.image_file = file_name
+            local_url = self.local_url(file_name)
+            if local_url:
+                original = product.image_url
+                product.image_url = local_url
+                product.images = tuple(local_url if image == original else image for image in product.images)
+
+    def close(self):
+        """等待所有下载完成"""
+        self._executor.shutdown(wait=True)
+        logger.info(f"Images: {self.downloaded} downloaded, {self.reused} duplicates, "
+                    f"{self.failed} failed, saved in {self.media_dir}")
@@ -1,73 +1,226 @@
 import logging
+import logging.handlers
+import json
 import os
+import time
+import queue
+import threading
+import multiprocessing as mp
 from datetime import datetime
 import atexit
+from config import ScraperConfig
 
 # 使用模块级变量来跟踪logger是否已经被初始化
 _logger = None
 _log_file = None
+_handlers = []
+_listeners = []
+_worker_queue = None
+_setup_lock = threading.Lock()
+
+LOG_NAME = 'amazon_scraper'
+LOG_FORMAT = '%(asctime)s - [%(processName)s/%(threadName)s] - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，便于用工具检索和统计"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'process': record.processName,
+            'thread': record.threadName,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """限制同一调用位置的高频日志
+
+    每个调用位置（文件+行号）在每个时间窗口内最多输出 limit 条 INFO 及以下
+    的日志，其余的丢弃并计数，下一条放行的日志会附带被丢弃的条数。
+    WARNING 及以上级别不受限制。
+    """
+
+    def __init__(self, limit, window=60.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._sites = {}  # (文件, 行号) -> [窗口开始时间, 已输出条数, 已丢弃条数]
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+            if now - site[0] >= self.window:
+                site[0], site[1] = now, 0
+            if site[1] >= self.limit:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def _is_main_process():
+    return mp.parent_process() is None
+
+
+def _build_handlers():
+    """创建实际写日志的处理器，只在主进程的监听线程中使用"""
+    global _log_file
+
+    # 创建日志文件名
+    timestamp = datetime.now().strftime('%Y%m%d')
+    extension = 'jsonl' if ScraperConfig.LOG_FORMAT == 'json' else 'log'
+    _log_file = f'logs/scraper_{timestamp}.{extension}'
+
+    # 确保logs目录存在
+    os.makedirs('logs', exist_ok=True)
+
+    # 创建文件处理器，JSON格式只用于文件，控制台保持文本格式
+    file_handler = logging.FileHandler(_log_file, encoding='utf-8')
+    text_formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    file_handler.setFormatter(JsonFormatter() if ScraperConfig.LOG_FORMAT == 'json' else text_formatter)
+
+    # 创建控制台处理器
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(text_formatter)
+    return [file_handler, console_handler]
+
+
+def _make_queue_handler(log_queue):
+    """进程内的日志只放入队列，由主进程的监听线程统一写出"""
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(ScraperConfig.LOG_RATE_LIMIT))
+    return handler
+
+
+def _start_listener(log_queue):
+    listener = logging.handlers.QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+class _DeferredSetupHandler(logging.Handler):
+    """主进程的第一条日志到来时才创建处理器和监听线程，再把这条日志交给它们
+
+    从 forkserver 服务进程 fork 出的采集进程会继承这个处理器，其中接入日志队列之前的
+    日志不在本进程建立文件处理器。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() != self._pid:
+            return
+        _setup_main_process()
+        _logger.handle(record)
+
+
+def _cleanup():
+    """程序退出时写出队列中剩余的日志并关闭处理器"""
+    for listener in _listeners:
+        listener.stop()
+    for handler in _handlers:
+        handler.close()
+    for handler in _logger.handlers[:]:
+        _logger.removeHandler(handler)
+
+    # 如果存在空的日志文件，删除它
+    if _log_file and os.path.exists(_log_file) and os.path.getsize(_log_file) == 0:
+        try:
+            os.remove(_log_file)
+        except:
+            pass
+
+
+def _setup_main_process():
+    """创建文件和控制台处理器、启动监听线程并注册退出清理，只执行一次"""
+    with _setup_lock:
+        if _handlers:
+            return
+        for handler in _logger.handlers[:]:
+            if isinstance(handler, _DeferredSetupHandler):
+                _logger.removeHandler(handler)
+
+        # 日志记录只入队，文件和控制台的写入在监听线程中完成，不阻塞采集
+        local_queue = queue.SimpleQueue()
+        _handlers.extend(_build_handlers())
+        _start_listener(local_queue)
+        _logger.addHandler(_make_queue_handler(local_queue))
+        atexit.register(_cleanup)
+
+
+def get_log_queue(context=None):
+    """子进程的日志队列，传给进程池的 initializer 后子进程的日志由主进程统一写出
+
+    队列在第一次需要时才创建，不会在导入时固定 multiprocessing 的启动方式。
+    context 为创建进程池所用的 multiprocessing 上下文。
+    """
+    global _worker_queue
+    get_logger()
+    _setup_main_process()
+    if _worker_queue is None:
+        _worker_queue = (context or mp).Queue()
+        _start_listener(_worker_queue)
+    return _worker_queue
+
+
+def init_worker_logging(log_queue):
+    """进程池 initializer：子进程的日志全部转发到主进程的队列"""
+    worker_logger = logging.getLogger(LOG_NAME)
+    for handler in worker_logger.handlers[:]:
+        worker_logger.removeHandler(handler)
+    worker_logger.addHandler(_make_queue_handler(log_queue))
+    worker_logger.setLevel(logging.INFO)
+    worker_logger.propagate = False
 
 
 def get_logger():
-    global _logger, _log_file
+    global _logger
 
     # 如果logger已经初始化，直接返回
     if _logger is not None:
         return _logger
 
     # 创建logger
-    _logger = logging.getLogger('amazon_scraper')
+    _logger = logging.getLogger(LOG_NAME)
     _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+    # 子进程不直接写文件，由 init_worker_logging 接入主进程的队列
+    if not _is_main_process():
+        return _logger
 
     # 如果logger已经有handlers，说明已经配置过，直接返回
     if _logger.handlers:
         return _logger
 
-    # 创建日志文件名
-    timestamp = datetime.now().strftime('%Y%m%d')
-    _log_file = f'logs/scraper_{timestamp}.log'
-
-    # 确保logs目录存在
-    os.makedirs('logs', exist_ok=True)
-
-    # 创建文件处理器
-    file_handler = logging.FileHandler(_log_file, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-
-    # 创建格式化器
-    formatter = logging.Formatter('%(asctime)s - [%(threadName)s] - %(levelname)s - %(message)s',
-                                  datefmt='%Y-%m-%d %H:%M:%S')
-
-    # 设置格式化器
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-
-    # 添加处理器
-    _logger.addHandler(file_handler)
-    _logger.addHandler(console_handler)
-
-    # 注册程序退出时的清理函数
-    def cleanup():
-        # 如果存在空的日志文件，删除它
-        if _log_file and os.path.exists(_log_file) and os.path.getsize(_log_file) == 0:
-            try:
-                os.remove(_log_file)
-            except:
-                pass
-
-        # 关闭所有处理器
-        for handler in _logger.handlers[:]:
-            handler.close()
-            _logger.removeHandler(handler)
-
-    atexit.register(cleanup)
+    # 文件处理器和监听线程推迟到第一条日志或第一次创建进程池时再建立：forkserver 服务进程
+    # 会预先导入采集模块，其中 mp.parent_process() 同样为None，导入时就打开日志文件、
+    # 启动线程的话，所有采集进程都会从带线程的服务进程 fork 出来
+    _logger.addHandler(_DeferredSetupHandler())
 
     return _logger
 
 
 # 创建一个默认的logger实例
-logger = get_logger()
\ No newline at end of file
+logger = get_logger()
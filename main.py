@@ -5,9 +5,12 @@ from config import ScraperConfig
 from urllib.parse import quote_plus
 import time
 from vpn_helper import VPNConnector
-from finalExcel import process_excel
+from merge_exports import merge_exports
 from data_saver import DataSaver
+from metrics import metrics
 import os
+import argparse
+import profiling
 
 
 def connect_vpn():
@@ -28,7 +31,12 @@ def connect_vpn():
             return False
 
 
-def main(search_terms: list = []):
+def build_search_url(term):
+    """构建搜索URL，添加排序参数以获取最相关的结果"""
+    return f"{ScraperConfig.BASE_URL}/s?k={quote_plus(term)}&s=exact-aware-popularity-rank&language=en_US&currency=USD"
+
+
+def main(search_terms: list = [], control=None):
     vpn = None
     if ScraperConfig.VPN_ENABLE:
         vpn = connect_vpn()
@@ -48,32 +56,21 @@ def main(search_terms: list = []):
         logger.info(f"Starting parallel scraping for {len(search_terms)} search terms")
         start_time = time.time()
 
-        # 构建搜索URL，添加排序参数以获取最相关的结果
-        search_urls = [
-            f"https://www.amazon.com/s?k={quote_plus(term)}&s=exact-aware-popularity-rank&language=en_US&currency=USD"
-            for term in search_terms
-        ]
+        search_urls = [build_search_url(term) for term in search_terms]
 
         # 创建并行爬虫实例，设置合理的worker数量
         max_workers = min(len(search_terms), ScraperConfig.MAX_WORKERS)
-        parallel_scraper = ParallelScraper(max_workers)
+        parallel_scraper = ParallelScraper(max_workers, control)
 
         # 运行并行爬虫
         results = parallel_scraper.run_parallel(search_urls)
 
-        for result in results:
-            if result["success"] and "saved_file_path" in result:
-                saved_file_path = result["saved_file_path"]
-                if saved_file_path:
-                    # 处理保存的CSV文件
-                    final_output = process_excel(
-                        saved_file_path,
-                        DataSaver.FINAL_OUTPUT_DIR
-                    )
-                    if final_output:
-                        logger.info(f"Successfully processed and saved final output: {final_output}")
-                    else:
-                        logger.error(f"Failed to process file: {saved_file_path}")
+        # 将各搜索词的导出文件合并为一个去重后的导入文件
+        final_files = [r["final_file_path"] for r in results if r["success"] and r.get("final_file_path")]
+        merged_file = None
+        if ScraperConfig.MERGE_EXPORTS and len(final_files) > 1:
+            with metrics.timer('merge_exports'):
+                merged_file = merge_exports(final_files, DataSaver.FINAL_OUTPUT_DIR)
 
         # 统计结果
         successful = sum(1 for r in results if r["success"])
@@ -89,12 +86,23 @@ def main(search_terms: list = []):
         logger.info(f"Total Search Terms: {len(search_terms)}")
         logger.info(f"Successfully Scraped: {successful}")
         logger.info(f"Failed: {failed}")
+        if control and control.stopping:
+            logger.info("Run was stopped before completion, partial results were saved")
+        if merged_file:
+            logger.info(f"Merged Import File: {merged_file}")
         logger.info(f"Total Execution Time: {total_time:.2f} seconds")
+        metrics.observe('run_total', total_time)
         logger.info(
             f"Average Time Per Term: {total_time/len(search_terms):.2f} seconds"
         )
         logger.info("=" * 50)
 
+        # 各阶段耗时汇总，完整的直方图写入JSON和Prometheus文本文件
+        logger.info("Stage Latency (sorted by total time):")
+        metrics.log_summary()
+        metrics_file = metrics.write(run_id=parallel_scraper.run_id)
+        logger.info(f"Metrics written to: {metrics_file}")
+
         # 打印每个搜索词的结果
         logger.info("\nDetailed Results:")
         for term, result in zip(search_terms, results):
@@ -122,4 +130,12 @@ if __name__ == "__main__":
         # "headphones",
         # "gaming mouse"
     ]
-    main()
+    parser = argparse.ArgumentParser(description="并行采集亚马逊搜索结果并生成WooCommerce导入文件")
+    parser.add_argument("terms", nargs="*", default=search_terms, help="搜索关键词")
+    parser.add_argument("--profile", action="store_true", help="对每个采集任务进行性能分析（写入PROFILE_DIR）")
+    parser.add_argument("--profile-mode", choices=["cprofile", "sampling"], help="分析方式，默认使用配置中的PROFILE_MODE")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.configure(enabled=True, mode=args.profile_mode)
+    main(args.terms)
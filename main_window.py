@@ -1,5 +1,6 @@
 import sys
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -14,25 +15,41 @@ from PySide6.QtWidgets import (
     QCheckBox,
     QGroupBox,
     QGridLayout,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
 )
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, Signal, QTimer
 from PySide6.QtGui import QFont
-from config import load_pickle, dump_pickle, conf_pkl
+from config import load_pickle, dump_pickle, conf_pkl, reload_config
 from logger import logger
-from main import main as runner
+from parallel_scraper import get_mp_context
+from progress import RunControl
 from threading import Thread
 
+WORKER_STATUS = {
+    'starting': '启动中',
+    'searching': '搜索中',
+    'scraping': '采集中',
+    'done': '完成',
+    'failed': '失败',
+    'cancelled': '已停止',
+}
+
 
 class WorkerThread(QThread):
     finished = Signal(bool)  # 添加执行结果参数
 
-    def __init__(self, search_terms, parent=None):
+    def __init__(self, search_terms, control, parent=None):
         super().__init__(parent)
         self.search_terms = search_terms
+        self.control = control
 
     def run(self):
         try:
-            runner(search_terms=self.search_terms)
+            # 采集相关的模块（selenium、pandas 等）在第一次运行时才导入，加快窗口启动
+            from main import main as runner
+            runner(search_terms=self.search_terms, control=self.control)
             self.finished.emit(True)
         except Exception as e:
             print(f"执行出错: {str(e)}")
@@ -43,6 +60,7 @@ class ConfigWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.worker_thread = None
+        self.control = None
         self.setWindowTitle("Amazon采集器 v1.0")
         self.init_ui()
         self.load_config()
@@ -89,6 +107,24 @@ class ConfigWindow(QMainWindow):
         self.log_area.setMinimumHeight(300)
         log_layout.addWidget(self.log_area)
 
+        # 运行状态区域：总体进度和每个采集进程的状态
+        status_group = QGroupBox("运行状态")
+        status_layout = QVBoxLayout(status_group)
+        self.status_label = QLabel("未运行")
+        status_layout.addWidget(self.status_label)
+        self.worker_table = QTableWidget(0, 4)
+        self.worker_table.setHorizontalHeaderLabels(["进程", "状态", "搜索词", "进度"])
+        self.worker_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.worker_table.verticalHeader().setVisible(False)
+        self.worker_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.worker_table.setMaximumHeight(160)
+        status_layout.addWidget(self.worker_table)
+
+        # 运行期间定时刷新状态
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(500)
+        self.status_timer.timeout.connect(self.refresh_status)
+
         # 配置区域（三列网格布局）
         config_group = QGroupBox("配置参数")
         config_layout = QGridLayout(config_group)
@@ -167,22 +203,28 @@ class ConfigWindow(QMainWindow):
         btn_group = QWidget()
         btn_layout = QHBoxLayout(btn_group)
         self.start_btn = QPushButton("启动")
+        self.stop_btn = QPushButton("停止")
         self.exit_btn = QPushButton("退出")
         self.start_btn.setFixedSize(150, 45)
+        self.stop_btn.setFixedSize(150, 45)
         self.exit_btn.setFixedSize(150, 45)
+        self.stop_btn.setEnabled(False)
         btn_layout.addStretch()
         btn_layout.addWidget(self.start_btn)
+        btn_layout.addWidget(self.stop_btn)
         btn_layout.addWidget(self.exit_btn)
 
         # 组合所有区域
         main_layout.addWidget(search_group)
         main_layout.addWidget(log_group)
+        main_layout.addWidget(status_group)
         main_layout.addWidget(config_group)
         main_layout.addWidget(btn_group)
 
         # 连接信号
         self.exit_btn.clicked.connect(self.close)
         self.start_btn.clicked.connect(self.start_process)
+        self.stop_btn.clicked.connect(self.stop_process)
         self.vpn_enabled.stateChanged.connect(self.toggle_vpn_fields)
 
         # 样式设置
@@ -210,6 +252,18 @@ class ConfigWindow(QMainWindow):
                 font-weight: bold;
                 color: #CCCCCC;
             }
+            QTableWidget {
+                background-color: #1E1E1E;
+                color: #D4D4D4;
+                border: 1px solid #404040;
+                gridline-color: #404040;
+            }
+            QHeaderView::section {
+                background-color: #3A3A3A;
+                color: #CCCCCC;
+                border: 1px solid #404040;
+                padding: 4px;
+            }
             QTextEdit {
                 background-color: #1E1E1E;
                 color: #D4D4D4;
@@ -296,7 +350,9 @@ class ConfigWindow(QMainWindow):
             return True
 
     def save_config(self):
+        # 保留界面上未展示的配置项
         config = {
+            **load_pickle(conf_pkl),
             "headless": self.headless.isChecked(),
             "max_products_per_category": self.max_products.value(),
             "max_workers": self.max_workers.value(),
@@ -327,12 +383,15 @@ class ConfigWindow(QMainWindow):
             control.setEnabled(enabled)
         self.start_btn.setEnabled(enabled)
         self.start_btn.setText("🚀 启动" if enabled else "🔄 运行中...")
+        self.stop_btn.setEnabled(not enabled)
+        self.stop_btn.setText("停止")
 
     def start_process(self):
         if not self.check_config():
             self.log("间隔时间范围配置错误,请重新配置")
             return
         config = self.save_config()
+        reload_config()
         logger.info(config)
         search_input = self.search_input.text().strip()
         if not search_input:
@@ -342,14 +401,74 @@ class ConfigWindow(QMainWindow):
         self.log(f"工作线程数: {self.max_workers.value()}")
         self.log("启动处理流程...")
         search_terms = search_input.split(",")
-        self.worker_thread = WorkerThread(search_terms)
+        self.control = RunControl(get_mp_context())
+        self.worker_thread = WorkerThread(search_terms, self.control)
         self.worker_thread.finished.connect(self.on_process_finished)
         self.worker_thread.start()
+        self.status_timer.start()
+
+    def stop_process(self):
+        """请求停止：跳过未开始的搜索词，进行中的任务保存已采集的商品"""
+        if not self.control or self.control.stopping:
+            return
+        self.control.request_stop()
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.setText("正在停止...")
+        self.log("已请求停止，等待进行中的商品完成后保存已采集的数据")
+
+    @staticmethod
+    def format_duration(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+    @staticmethod
+    def display_term(url):
+        """任务的搜索URL显示为搜索关键词"""
+        return (parse_qs(urlparse(url).query).get('k') or [url])[0]
+
+    def refresh_status(self):
+        """从运行控制读取最新状态并更新界面"""
+        if not self.control:
+            return
+        status = self.control.snapshot()
+        if status['stopping']:
+            eta = "正在停止"
+        elif status['eta_seconds'] is not None:
+            eta = f"预计剩余 {self.format_duration(status['eta_seconds'])}"
+        else:
+            eta = "预计剩余 --"
+        self.status_label.setText(
+            f"搜索词 {status['tasks_done']}/{status['total_tasks']}    "
+            f"商品 {status['products_done']}/{status['products_expected']}"
+            f"（失败 {status['products_failed']}）    "
+            f"页面 {status['pages']}（{status['pages_per_min']:.1f}/分钟）    "
+            f"限流 {status['throttled']}    "
+            f"已运行 {self.format_duration(status['elapsed'])}    {eta}"
+        )
+
+        workers = status['workers']
+        self.worker_table.setRowCount(len(workers))
+        for row, (name, worker) in enumerate(workers.items()):
+            total = worker['total']
+            values = [
+                name,
+                WORKER_STATUS.get(worker['status'], worker['status']),
+                self.display_term(worker['term']),
+                f"{worker['done']}/{total}" if total is not None else "-",
+            ]
+            for col, value in enumerate(values):
+                self.worker_table.setItem(row, col, QTableWidgetItem(value))
 
     def on_process_finished(self, success):
         """任务完成处理"""
+        self.status_timer.stop()
+        self.refresh_status()
         self.toggle_ui_state(True)
-        status = "成功" if success else "失败"
+        if self.control and self.control.stopping:
+            status = "已停止"
+        else:
+            status = "成功" if success else "失败"
         self.log(f"处理流程完成 [{status}]")
         self.worker_thread.deleteLater()
         self.worker_thread = None
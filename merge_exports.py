@@ -0,0 +1,173 @@
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+from logger import logger
+
+
+# 商品描述可能很长，放宽csv模块的字段长度限制
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+BATCH_SIZE = 5000
+
+
+def merge_categories(existing, incoming):
+    """合并两个逗号分隔的WooCommerce分类列表，保持首次出现的顺序"""
+    merged = []
+    for value in (existing, incoming):
+        for category in (value or '').split(','):
+            category = category.strip()
+            if category and category not in merged:
+                merged.append(category)
+    return ', '.join(merged)
+
+
+def _open_staging_db(path):
+    """创建用于去重的临时SQLite库"""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.create_function('merge_categories', 2, merge_categories, deterministic=True)
+    conn.execute(
+        'CREATE TABLE parents ('
+        'key TEXT PRIMARY KEY, seq INTEGER NOT NULL, source INTEGER NOT NULL, '
+        'row TEXT NOT NULL, categories TEXT)'
+    )
+    conn.execute('CREATE TABLE variations (parent_key TEXT NOT NULL, source INTEGER NOT NULL, row TEXT NOT NULL)')
+    return conn
+
+
+_UPSERT_PARENT = (
+    'INSERT INTO parents (key, seq, source, row, categories) VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT(key) DO UPDATE SET '
+    'row = CASE WHEN excluded.source >= parents.source THEN excluded.row ELSE parents.row END, '
+    'source = MAX(excluded.source, parents.source), '
+    'categories = merge_categories(parents.categories, excluded.categories)'
+)
+_INSERT_VARIATION = 'INSERT INTO variations (parent_key, source, row) VALUES (?, ?, ?)'
+
+
+def _stage_file(conn, file_path, source, seq_start):
+    """逐行读取一个导出文件并写入临时库，返回读取到的表头和下一个序号"""
+    parents, variations = [], []
+    # 仅保存当前文件内父商品ID到去重键的映射，内存占用与单个文件大小相关
+    id_to_key = {}
+    seq = seq_start
+    parent_key = None
+
+    with open(file_path, newline='', encoding='utf-8-sig') as fp:
+        reader = csv.DictReader(fp)
+        fieldnames = reader.fieldnames or []
+        for line_no, row in enumerate(reader):
+            if row.get('Type') == 'variation':
+                parent_ref = row.get('Parent') or ''
+                key = id_to_key.get(parent_ref[3:], parent_key) if parent_ref.startswith('id:') else parent_key
+                if key is None:
+                    logger.warning(f"Skipping orphan variation in {file_path} (line {line_no + 2})")
+                    continue
+                variations.append((key, source, json.dumps(row, ensure_ascii=False)))
+            else:
+                # 以SKU(ASIN)去重，没有SKU的行视为独立商品
+                parent_key = row.get('SKU') or f"row:{source}:{line_no}"
+                if row.get('ID'):
+                    id_to_key[row['ID']] = parent_key
+                parents.append((parent_key, seq, source, json.dumps(row, ensure_ascii=False), row.get('Categories')))
+                seq += 1
+
+            if len(parents) + len(variations) >= BATCH_SIZE:
+                conn.executemany(_UPSERT_PARENT, parents)
+                conn.executemany(_INSERT_VARIATION, variations)
+                parents, variations = [], []
+
+    conn.executemany(_UPSERT_PARENT, parents)
+    conn.executemany(_INSERT_VARIATION, variations)
+    conn.commit()
+    return fieldnames, seq
+
+
+def merge_exports(file_paths, output_dir):
+    """将多个WooCommerce导出文件流式合并为一个去重后的导入文件
+
+    按SKU去重，保留最新文件中的行并合并各文件的分类；变体行跟随其父商品
+    所在的文件输出。中间数据保存在临时SQLite库中，内存占用与总行数无关。
+    """
+    file_paths = [path for path in file_paths if path and os.path.exists(path)]
+    if not file_paths:
+        logger.warning("No export files to merge")
+        return None
+
+    # 按修改时间排序，越晚生成的文件越新
+    file_paths = sorted(file_paths, key=os.path.getmtime)
+    logger.info(f"Merging {len(file_paths)} export files")
+
+    fd, staging_path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    conn = None
+    try:
+        conn = _open_staging_db(staging_path)
+        columns = []
+        seq = 0
+        for source, file_path in enumerate(file_paths):
+            fieldnames, seq = _stage_file(conn, file_path, source, seq)
+            columns.extend(name for name in fieldnames if name not in columns)
+            logger.info(f"Staged export file {source + 1}/{len(file_paths)}: {file_path}")
+
+        conn.execute('CREATE INDEX idx_variations ON variations (parent_key, source)')
+
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(output_dir, f'merged_wc_product_import_{timestamp}.csv')
+        tmp_path = output_path + '.tmp'
+
+        parent_count = variation_count = 0
+        with open(tmp_path, 'w', newline='', encoding='utf-8-sig') as fp:
+            writer = csv.DictWriter(fp, fieldnames=columns, restval='', extrasaction='ignore')
+            writer.writeheader()
+            variation_cursor = conn.cursor()
+            for key, source, row, categories in conn.execute(
+                    'SELECT key, source, row, categories FROM parents ORDER BY seq'):
+                parent = json.loads(row)
+                if categories:
+                    parent['Categories'] = categories
+                writer.writerow(parent)
+                parent_count += 1
+
+                for (variation,) in variation_cursor.execute(
+                        'SELECT row FROM variations WHERE parent_key = ? AND source = ? ORDER BY rowid',
+                        (key, source)):
+                    writer.writerow(json.loads(variation))
+                    variation_count += 1
+
+        os.replace(tmp_path, output_path)
+        logger.info(f"Merged {parent_count} products and {variation_count} variations into {output_path}")
+        return output_path
+
+    except Exception as e:
+        logger.error(f"Error merging export files: {str(e)}")
+        return None
+
+    finally:
+        if conn is not None:
+            conn.close()
+        try:
+            os.remove(staging_path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并多个WooCommerce导出文件并按SKU去重")
+    parser.add_argument("files", nargs="+", help="process_excel生成的CSV文件")
+    parser.add_argument("-o", "--output-dir", default="output_excel", help="合并结果输出目录")
+    args = parser.parse_args()
+
+    result = merge_exports(args.files, args.output_dir)
+    if result:
+        print(f"Merge completed. Output file: {result}")
+    else:
+        print("Merge failed.")
+        sys.exit(1)
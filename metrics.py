@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from config import ScraperConfig
+from logger import logger
+
+# 延迟直方图的桶上限（秒），覆盖从单次脚本调用到整页加载的范围
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 7.5, 10, 15, 30, 60, 120)
+
+
+class Histogram:
+    """固定分桶的延迟直方图，可以跨进程合并"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, data):
+        for i, value in enumerate(data['counts']):
+            self.counts[i] += value
+        self.count += data['count']
+        self.sum += data['sum']
+
+    def quantile(self, q):
+        """根据分桶估算分位数（桶内线性插值）"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, value in enumerate(self.counts):
+            if cumulative + value >= target and value:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (target - cumulative) / value
+            cumulative += value
+        return BUCKETS[-1]
+
+    def to_dict(self):
+        return {'counts': list(self.counts), 'count': self.count, 'sum': self.sum}
+
+
+class MetricsRegistry:
+    """进程内的阶段耗时直方图和事件计数
+
+    每个采集进程各自记录，任务结束时通过 snapshot() 随结果返回主进程，
+    主进程用 merge() 汇总后写出JSON和Prometheus文本文件。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # 阶段名 -> Histogram
+        self.counters = {}    # 事件名 -> 次数
+
+    def observe(self, stage, seconds):
+        """记录一次阶段耗时（秒）"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, event, value=1):
+        """事件计数"""
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        """记录代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self, reset=False):
+        """导出为可序列化的字典，reset=True 时同时清空，避免重复合并"""
+        with self._lock:
+            data = {
+                'histograms': {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+                'counters': dict(self.counters),
+            }
+            if reset:
+                self.histograms, self.counters = {}, {}
+        return data
+
+    def merge(self, data):
+        """合并其他进程的 snapshot"""
+        if not data:
+            return
+        with self._lock:
+            for stage, histogram_data in data.get('histograms', {}).items():
+                self.histograms.setdefault(stage, Histogram()).merge(histogram_data)
+            for event, value in data.get('counters', {}).items():
+                self.counters[event] = self.counters.get(event, 0) + value
+
+    def summary(self):
+        """每个阶段的次数、总耗时和分位数"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': histogram.count,
+                    'total_seconds': round(histogram.sum, 3),
+                    'mean_seconds': round(histogram.sum / histogram.count, 4) if histogram.count else None,
+                    'p50_seconds': histogram.quantile(0.5),
+                    'p95_seconds': histogram.quantile(0.95),
+                    'p99_seconds': histogram.quantile(0.99),
+                }
+                for stage, histogram in sorted(self.histograms.items(), key=lambda item: -item[1].sum)
+            }
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（node_exporter textfile collector）"""
+        lines = [
+            '# HELP scraper_stage_seconds Latency of scraper stages in seconds',
+            '# TYPE scraper_stage_seconds histogram',
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, value in zip(list(BUCKETS) + ['+Inf'], histogram.counts):
+                    cumulative += value
+                    lines.append(f'scraper_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines.append('# HELP scraper_events_total Scraper event counters')
+            lines.append('# TYPE scraper_events_total counter')
+            for event, value in sorted(self.counters.items()):
+                lines.append(f'scraper_events_total{{event="{event}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output_dir=None, run_id=None):
+        """写出JSON汇总和Prometheus文本文件，返回JSON文件路径"""
+        output_dir = output_dir or ScraperConfig.METRICS_DIR
+        run_id = run_id or time.strftime('%Y%m%d_%H%M%S')
+        os.makedirs(output_dir, exist_ok=True)
+
+        json_path = os.path.join(output_dir, f'metrics_{run_id}.json')
+        prom_path = os.path.join(output_dir, 'scraper.prom')
+        data = {'run_id': run_id, 'written_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'stages': self.summary(), **self.snapshot()}
+
+        # 先写临时文件再替换，采集器不会读到写了一半的文件
+        for path, content in [(json_path, json.dumps(data, indent=2, ensure_ascii=False)),
+                              (prom_path, self.to_prometheus())]:
+            with open(path + '.tmp', 'w', encoding='utf-8') as fp:
+                fp.write(content)
+            os.replace(path + '.tmp', path)
+        return json_path
+
+    def log_summary(self, top=12):
+        """在日志中输出耗时最多的阶段"""
+        for stage, stats in list(self.summary().items())[:top]:
+            logger.info(f"{stage:<28} n={stats['count']:<6} total={stats['total_seconds']:>9.2f}s "
+                        f"p50={stats['p50_seconds'] or 0:.3f}s p95={stats['p95_seconds'] or 0:.3f}s")
+
+
+# 当前进程的指标
+metrics = MetricsRegistry()
@@ -0,0 +1,142 @@
+import re
+import html
+import json
+from logger import logger
+
+# 商品页中嵌入的结构化数据：
+#   - <script type="a-state" data-a-state="{&quot;key&quot;: ...}"> 中的 JSON（价格等）；
+#     driver.page_source 是序列化后的DOM，属性值总是双引号，其中的引号转义为 &quot;
+#   - <script type="application/ld+json"> 中的 Product 数据（品牌、价格）
+#   - 图片区脚本中的 'colorImages': {'initial': [...]}（图片列表）
+#   - 变体选择器脚本中的 dimensionsDisplay / dimensionValuesDisplayData（变体矩阵）
+# 页面源码只扫描一遍脚本块，各字段从对应的脚本中解析，找不到时由调用方回退到DOM选择器。
+
+_SCRIPT = re.compile(r'<script(?P<attrs>[^>]*)>(?P<body>.*?)</script>', re.DOTALL | re.IGNORECASE)
+_A_STATE_KEY = re.compile(r'data-a-state=(?P<quote>[\'"])(?P<state>\{.*?\})(?P=quote)')
+_LD_JSON = re.compile(r'type=["\']application/ld\+json["\']', re.IGNORECASE)
+
+_PRICE_STATE_KEYS = ('twister-plus-buying-options-price-data', 'desktop-dp-price-data')
+_IMAGE_KEY = re.compile(r'[\'"]colorImages[\'"]\s*:\s*\{\s*[\'"]initial[\'"]\s*:\s*')
+_DIMENSIONS_KEY = re.compile(r'"dimensionsDisplay"\s*:\s*')
+_DIMENSION_VALUES_KEY = re.compile(r'"dimensionValuesDisplayData"\s*:\s*')
+
+_DECODER = json.JSONDecoder()
+
+
+def _decode_at(text, match):
+    """从正则匹配结束的位置解析一个JSON值，失败时返回None"""
+    if not match:
+        return None
+    try:
+        value, _ = _DECODER.raw_decode(text, match.end())
+        return value
+    except ValueError:
+        return None
+
+
+def _dimension_role(name):
+    """将变体维度名称映射为WooCommerce属性（Size/Color）"""
+    name = name.lower()
+    if 'size' in name:
+        return 'size'
+    if 'color' in name or 'colour' in name:
+        return 'color'
+    return None
+
+
+def parse_variants(script):
+    """从变体选择器脚本中解析真实的尺寸/颜色组合"""
+    dimensions = _decode_at(script, _DIMENSIONS_KEY.search(script))
+    values = _decode_at(script, _DIMENSION_VALUES_KEY.search(script))
+    if not isinstance(dimensions, list) or not isinstance(values, dict):
+        return []
+
+    roles = [_dimension_role(str(name)) for name in dimensions]
+    if not any(roles):
+        return []
+
+    variants = []
+    seen = set()
+    for asin, dimension_values in values.items():
+        if not isinstance(dimension_values, list):
+            continue
+        variant = {'asin': asin, 'size': '', 'color': ''}
+        for role, value in zip(roles, dimension_values):
+            if role and not variant[role]:
+                variant[role] = str(value).strip()
+        combination = (variant['size'], variant['color'])
+        if combination != ('', '') and combination not in seen:
+            seen.add(combination)
+            variants.append(variant)
+    return variants
+
+
+def parse_images(script):
+    """从图片区脚本中解析图片列表，优先使用高清图"""
+    initial = _decode_at(script, _IMAGE_KEY.search(script))
+    images = []
+    for image in initial if isinstance(initial, list) else []:
+        if isinstance(image, dict):
+            url = image.get('hiRes') or image.get('large')
+            if url and url not in images:
+                images.append(url)
+    return images
+
+
+def _parse_price_state(state):
+    """从a-state价格数据中取出新品的显示价格"""
+    for group in state.values() if isinstance(state, dict) else []:
+        for option in group if isinstance(group, list) else []:
+            if isinstance(option, dict) and option.get('displayPrice') \
+                    and option.get('buyingOptionType', 'NEW') == 'NEW':
+                return option['displayPrice']
+    return None
+
+
+def _parse_ld_product(data):
+    """从ld+json中取出Product的品牌和价格"""
+    items = data if isinstance(data, list) else [data]
+    for item in items:
+        if not isinstance(item, dict) or item.get('@type') != 'Product':
+            continue
+        brand = item.get('brand')
+        if isinstance(brand, dict):
+            brand = brand.get('name')
+        offers = item.get('offers')
+        if isinstance(offers, list):
+            offers = offers[0] if offers else None
+        price = offers.get('price') if isinstance(offers, dict) else None
+        return (str(brand).strip() if brand else None), (str(price) if price is not None else None)
+    return None, None
+
+
+def parse_page_data(page_source):
+    """解析商品页源码中嵌入的结构化数据
+
+    返回 {'price', 'brand', 'images', 'variants'}，未找到的字段为 None 或空列表。
+    """
+    page_data = {'price': None, 'brand': None, 'images': [], 'variants': []}
+    if not page_source:
+        return page_data
+
+    for match in _SCRIPT.finditer(page_source):
+        attrs, body = match.group('attrs'), match.group('body')
+        try:
+            state_match = _A_STATE_KEY.search(attrs)
+            if state_match:
+                key = json.loads(html.unescape(state_match.group('state'))).get('key')
+                if key in _PRICE_STATE_KEYS and not page_data['price']:
+                    page_data['price'] = _parse_price_state(json.loads(body))
+            elif _LD_JSON.search(attrs):
+                brand, price = _parse_ld_product(json.loads(body))
+                page_data['brand'] = page_data['brand'] or brand
+                page_data['price'] = page_data['price'] or price
+            else:
+                if not page_data['images'] and 'colorImages' in body:
+                    page_data['images'] = parse_images(body)
+                if not page_data['variants'] and 'dimensionValuesDisplayData' in body:
+                    page_data['variants'] = parse_variants(body)
+        except (ValueError, AttributeError) as e:
+            logger.debug(f"Skipping malformed embedded data: {str(e)}")
+
+    return page_data
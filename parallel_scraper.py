@@ -1,41 +1,111 @@
 import multiprocessing as mp
-from multiprocessing import Pool
-from driver_manager import DriverManager
-from scraper import AmazonScraper
-from logger import logger
+from logger import logger, get_log_queue, init_worker_logging
 import time
-from config import ScraperConfig
-from tqdm import tqdm
-from finalExcel import process_excel
-from data_saver import DataSaver
+from config import ScraperConfig, reload_config
+from metrics import metrics
+import profiling
+import progress
+import os
+
+# 采集进程需要的模块（selenium、undetected_chromedriver、pandas 等）
+#   - 本模块只在采集任务中导入它们，界面和主进程启动时不需要加载
+#   - forkserver 启动方式下由服务进程预先导入一次，之后的采集进程从它派生，无需重复导入
+WORKER_PRELOAD = ['scraper', 'driver_manager', 'finalExcel', 'data_saver']
+
+
+def get_mp_context(method=None):
+    """进程池使用的 multiprocessing 上下文
+
+    auto：支持 forkserver 时使用（Linux、macOS），预先导入 WORKER_PRELOAD；
+    否则使用 spawn（Windows）。不直接 fork 主进程，界面进程中有Qt和日志等线程。
+    传给采集进程的队列、事件必须由同一上下文创建。
+    """
+    method = method or ScraperConfig.WORKER_START_METHOD
+    available = mp.get_all_start_methods()
+    if method == 'auto':
+        method = 'forkserver' if 'forkserver' in available else 'spawn'
+    elif method not in available:
+        logger.warning(f"Start method {method} is not available, using spawn")
+        method = 'spawn'
+    context = mp.get_context(method)
+    if method == 'forkserver':
+        # 服务进程启动后再设置不会生效，重复设置没有影响
+        context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
 
 
 class ParallelScraper:
-    def __init__(self, max_workers=None):
+    def __init__(self, max_workers=None, control=None):
         self.max_workers = max_workers or mp.cpu_count()
+        self.control = control  # progress.RunControl，界面运行时用于显示进度和停止
+        self.context = get_mp_context()
+        self.run_id = time.strftime('%Y%m%d_%H%M%S')  # 本次运行的指标文件名
         logger.info(f"Initializing parallel scraper with {self.max_workers} workers")
 
     @staticmethod
+    def init_worker(log_queue, profile_settings, progress_args=None):
+        """进程池 initializer：接入日志队列和进度通道，并使用与主进程相同的分析设置"""
+        # forkserver 服务进程导入配置后会一直存在，重新读取界面保存的最新配置
+        reload_config()
+        init_worker_logging(log_queue)
+        profiling.configure(**profile_settings)
+        if progress_args:
+            progress.init_worker_progress(*progress_args)
+
+    @staticmethod
+    @profiling.profiled
     def scrape_category(category_url):
         """单个类别的爬取函数"""
         process_name = mp.current_process().name
+
+        # 已请求停止时跳过尚未开始的任务，不再启动浏览器
+        if progress.cancel_requested():
+            progress.report('task_done', success=False, cancelled=True)
+            return {
+                'url': category_url,
+                'success': False,
+                'cancelled': True,
+                'category_name': None,
+                'execution_time': 0,
+                'process_name': process_name,
+                'initial_file_path': None,
+                'final_file_path': None,
+                'metrics': metrics.snapshot(reset=True)
+            }
+
         logger.info(f"Process {process_name} starting to scrape: {category_url}")
+        progress.report('task_start', term=category_url)
 
         try:
+            from driver_manager import DriverManager
+            from scraper import AmazonScraper
+            from finalExcel import process_excel
+            from data_saver import DataSaver
+
             driver_manager = DriverManager()
             driver_manager.setup_driver(ScraperConfig.HEADLESS)
+            progress.report('driver', pids=driver_manager.process_ids())
             scraper = AmazonScraper(driver_manager)
 
             try:
                 start_time = time.time()
                 scrape_result = scraper.run(category_url)
                 execution_time = time.time() - start_time
-
-                # 如果爬取成功且有保存的文件路径，处理Excel文件
-                if scrape_result['success'] and scrape_result['saved_file_path']:
-                    # 处理Excel文件并保存到最终目录
+                metrics.observe('category_total', execution_time)
+
+                # 记录价格和可用性，供按变化频率安排的复查使用
+                if ScraperConfig.RECRAWL_TRACKING and scrape_result['success']:
+                    try:
+                        from recrawl_scheduler import RecrawlScheduler
+                        RecrawlScheduler().record_products(scraper.products, scrape_result['category_name'])
+                    except Exception as e:
+                        logger.warning(f"Error recording price history: {str(e)}")
+
+                # 如果爬取成功，直接将内存中的数据交给process_excel处理
+                if scrape_result['success'] and scrape_result['dataframe'] is not None:
+                    # 处理数据并保存到最终目录
                     final_output_path = process_excel(
-                        scrape_result['saved_file_path'],
+                        scrape_result['dataframe'],
                         DataSaver.FINAL_OUTPUT_DIR
                     )
                 else:
@@ -44,11 +114,14 @@ class ParallelScraper:
                 result = {
                     'url': category_url,
                     'success': scrape_result['success'],
+                    'cancelled': scrape_result.get('cancelled', False),
                     'category_name': scrape_result['category_name'],
                     'execution_time': execution_time,
                     'process_name': process_name,
                     'initial_file_path': scrape_result.get('saved_file_path'),
-                    'final_file_path': final_output_path
+                    'final_file_path': final_output_path,
+                    # 子进程会被复用，取出后清空，避免重复计入
+                    'metrics': metrics.snapshot(reset=True)
                 }
 
                 logger.info(f"Process {process_name} completed scraping: {category_url} "
@@ -56,6 +129,7 @@ class ParallelScraper:
                 if final_output_path:
                     logger.info(f"Final output saved to: {final_output_path}")
 
+                progress.report('task_done', success=result['success'], cancelled=result['cancelled'])
                 return result
 
             finally:
@@ -63,15 +137,18 @@ class ParallelScraper:
 
         except Exception as e:
             logger.error(f"Process {process_name} error scraping {category_url}: {str(e)}")
+            progress.report('task_done', success=False, cancelled=progress.cancel_requested())
             return {
                 'url': category_url,
                 'success': False,
+                'cancelled': progress.cancel_requested(),
                 'category_name': None,
                 'execution_time': 0,
                 'process_name': process_name,
                 'error': str(e),
                 'initial_file_path': None,
-                'final_file_path': None
+                'final_file_path': None,
+                'metrics': metrics.snapshot(reset=True)
             }
 
     def run_parallel(self, category_urls):
@@ -82,14 +159,57 @@ class ParallelScraper:
         logger.info(f"Starting parallel scraping of {total_urls} URLs with {self.max_workers} workers")
 
         try:
-            # 使用进程池并行处理
-            with Pool(self.max_workers) as pool:
-                # 使用tqdm显示进度
-                results = list(tqdm(
-                    pool.imap(self.scrape_category, category_urls),
-                    total=total_urls,
-                    desc="Scraping Progress"
-                ))
+            # 开启性能分析时，本次运行的分析文件写入单独的子目录
+            profile_settings = profiling.settings()
+            if profile_settings['enabled']:
+                profile_settings['output_dir'] = os.path.join(profile_settings['output_dir'], self.run_id)
+                logger.info(f"Profiling enabled, profiles will be written to {profile_settings['output_dir']}")
+
+            progress_args = None
+            if self.control:
+                self.control.reset(total_urls)
+                progress_args = self.control.worker_args()
+
+            # 使用进程池并行处理，子进程的日志通过队列交给主进程统一写出
+            from tqdm import tqdm
+            with self.context.Pool(self.max_workers, initializer=self.init_worker,
+                                   initargs=(get_log_queue(self.context), profile_settings, progress_args)) as pool:
+                # 使用tqdm显示进度，每完成一个任务合并其指标
+                results = []
+                last_flush = time.time()
+                terminated = False
+                iterator = pool.imap(self.scrape_category, category_urls)
+                with tqdm(total=total_urls, desc="Scraping Progress") as progress_bar:
+                    while len(results) < total_urls:
+                        try:
+                            result = iterator.next(timeout=1)
+                        except mp.TimeoutError:
+                            # 停止后超过等待时间仍未结束的任务强制终止，并清理其浏览器进程
+                            if self.control and self.control.grace_expired():
+                                logger.warning("In-flight tasks did not finish in time, terminating workers")
+                                pool.terminate()
+                                self.control.kill_drivers()
+                                terminated = True
+                                break
+                            continue
+                        metrics.merge(result.pop('metrics', None))
+                        results.append(result)
+                        progress_bar.update(1)
+                        # 可选的定期写出，长时间运行时也能看到中间结果
+                        if ScraperConfig.METRICS_FLUSH_INTERVAL and \
+                                time.time() - last_flush >= ScraperConfig.METRICS_FLUSH_INTERVAL:
+                            metrics.write(run_id=self.run_id)
+                            last_flush = time.time()
+                # 让子进程正常退出，确保队列中的日志全部送达
+                if not terminated:
+                    pool.close()
+                pool.join()
+
+            # 合并各进程的分析文件
+            if profile_settings['enabled'] and os.path.isdir(profile_settings['output_dir']):
+                report = profiling.merge_profiles(profile_settings['output_dir'])
+                if report:
+                    logger.info(f"Profile report written to: {report}")
 
             # 计算统计信息
             end_time = time.time()
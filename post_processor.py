@@ -0,0 +1,95 @@
+import time
+import queue
+import threading
+from config import ScraperConfig
+from logger import logger
+from metrics import metrics
+from profiling import thread_profile
+from data_saver import DataSaver
+from product_record import ProductRecord
+from text_normalizer import build_description, build_price_info, normalize_brand
+
+
+def finalize_product(raw_product):
+    """将 extract_raw_product_info 的原始结果转换为最终的商品记录（ProductRecord）
+
+    只做纯文本处理，不访问浏览器：解析价格、清理并组合描述、规范化品牌，
+    并根据变体数据（没有时从描述中）预先确定尺寸和颜色。
+    """
+    if not raw_product:
+        return None
+
+    product = dict(raw_product)
+    raw_brand = product.pop('raw_brand', None) or {}
+    product['price'] = build_price_info(product.pop('raw_price', None))
+    product['description'] = build_description(product.pop('raw_description', None))
+    product['brand'] = normalize_brand(raw_brand.get('text'), raw_brand.get('url'), product.get('title'))
+
+    # 有真实变体数据时直接使用，否则从描述中查找尺寸和颜色
+    variants = product.setdefault('variants', [])
+    if variants:
+        product['sizes'] = ','.join(dict.fromkeys(v['size'] for v in variants if v['size']))
+        product['colors'] = ','.join(dict.fromkeys(v['color'] for v in variants if v['color']))
+    else:
+        sizes, colors = DataSaver.extract_attributes_batch([product['description']])
+        product['sizes'] = sizes[0]
+        product['colors'] = colors[0]
+
+    record = ProductRecord.from_product(product)
+
+    # 验证关键字段
+    if record.title is None and record.current_price is None:
+        logger.warning(f"Failed to extract essential information for {record.url}")
+        return None
+
+    return record
+
+
+class ProductPostProcessor:
+    """在后台线程中完成商品信息的文本后处理
+
+    浏览器线程只负责提取原始数据，提交后立即开始下一个商品；后台线程
+    在等待WebDriver响应期间处理已提取的商品。队列有上限，后处理跟不上时
+    submit 会阻塞，内存占用不会无限增长。
+    """
+
+    _STOP = object()
+
+    def __init__(self, maxsize=None):
+        self._queue = queue.Queue(maxsize=maxsize or ScraperConfig.POSTPROCESS_QUEUE_SIZE)
+        self._results = []
+        self.busy_time = 0.0  # 后台线程实际处理耗时（秒）
+        self._thread = threading.Thread(target=self._worker, name='product-postprocess', daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        with thread_profile():
+            self._process_queue()
+
+    def _process_queue(self):
+        while True:
+            raw_product = self._queue.get()
+            if raw_product is self._STOP:
+                break
+            start = time.perf_counter()
+            try:
+                product = finalize_product(raw_product)
+            except Exception as e:
+                logger.error(f"Error post-processing product {raw_product.get('url')}: {str(e)}")
+                product = None
+            elapsed = time.perf_counter() - start
+            self.busy_time += elapsed
+            metrics.observe('postprocess', elapsed)
+            if product:
+                self._results.append(product)
+
+    def submit(self, raw_product):
+        """提交一个原始商品信息，为空时忽略"""
+        if raw_product:
+            self._queue.put(raw_product)
+
+    def close(self):
+        """等待所有已提交的商品处理完成，按提交顺序返回有效的商品信息"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        return self._results
@@ -0,0 +1,115 @@
+import time
+import argparse
+from config import ScraperConfig
+from logger import logger, get_log_queue
+from metrics import metrics
+import profiling
+
+# 已知ASIN的价格快速刷新
+#   - 只提取价格、原价、折扣和可用性，不读取描述、图片和评论，不做滚动和页面加载后的随机等待
+#   - 商品之间仍按 MIN_SLEEP/MAX_SLEEP 随机等待，访问频率与完整采集相同
+#   - 页面出现价格或可用性区域即读取（AmazonScraper.extract_price_snapshot）
+#   - 结果写入 PRICE_SNAPSHOT_DIR 下的紧凑CSV文件，开启 RECRAWL_TRACKING 时同时记入价格历史
+#
+#   python price_refresh.py B0XXXXXXXX B0YYYYYYYY
+#   python price_refresh.py --file asins.txt
+#   python price_refresh.py --export output_excel/*.csv --workers 4
+
+
+def read_asin_file(path):
+    """读取ASIN列表文件，每行一个，忽略空行和 # 开头的行"""
+    with open(path, encoding='utf-8-sig') as fp:
+        return [line.strip() for line in fp if line.strip() and not line.startswith('#')]
+
+
+def refresh_chunk(asins):
+    """采集进程中刷新一组ASIN的价格，返回 (快照列表, 失败的ASIN列表, 本进程的指标)"""
+    from driver_manager import DriverManager
+    from scraper import AmazonScraper
+
+    snapshots, failed = [], []
+    driver_manager = DriverManager()
+    try:
+        driver_manager.setup_driver(ScraperConfig.HEADLESS)
+        scraper = AmazonScraper(driver_manager)
+        for i, asin in enumerate(asins, 1):
+            with metrics.timer('refresh_product'):
+                snapshot = scraper.extract_price_snapshot(f"{ScraperConfig.BASE_URL}/dp/{asin}")
+            if snapshot:
+                snapshots.append(snapshot)
+            else:
+                failed.append(asin)
+            if i < len(asins):
+                scraper.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+    except Exception as e:
+        logger.error(f"Error refreshing prices: {str(e)}")
+        done = {snapshot.asin for snapshot in snapshots}
+        failed.extend(asin for asin in asins if asin not in done and asin not in failed)
+    finally:
+        driver_manager.quit()
+    return snapshots, failed, metrics.snapshot(reset=True)
+
+
+def run_refresh(asins, max_workers=None):
+    """刷新一组ASIN的价格和可用性，返回快照文件路径"""
+    from parallel_scraper import ParallelScraper, get_mp_context
+    from data_saver import DataSaver
+
+    asins = list(dict.fromkeys(asins))
+    if not asins:
+        logger.warning("No ASINs to refresh")
+        return None
+
+    chunk_size = max(ScraperConfig.CHUNK_SIZE, 1)
+    chunks = [asins[i:i + chunk_size] for i in range(0, len(asins), chunk_size)]
+    workers = max(min(max_workers or ScraperConfig.MAX_WORKERS, len(chunks)), 1)
+    logger.info(f"Refreshing prices for {len(asins)} ASINs with {workers} workers")
+
+    start_time = time.time()
+    snapshots, failed = [], []
+    context = get_mp_context()
+    with context.Pool(workers, initializer=ParallelScraper.init_worker,
+                      initargs=(get_log_queue(context), profiling.settings())) as pool:
+        for chunk_snapshots, chunk_failed, snapshot in pool.imap_unordered(refresh_chunk, chunks):
+            metrics.merge(snapshot)
+            snapshots.extend(chunk_snapshots)
+            failed.extend(chunk_failed)
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start_time
+    rate = len(snapshots) / elapsed * 60 if elapsed else 0
+    logger.info(f"Refreshed {len(snapshots)} prices in {elapsed:.1f}s ({rate:.1f} pages/min), "
+                f"{len(failed)} failed")
+    if failed:
+        logger.warning(f"Failed ASINs: {', '.join(failed)}")
+
+    if ScraperConfig.RECRAWL_TRACKING and snapshots:
+        from recrawl_scheduler import RecrawlScheduler
+        RecrawlScheduler().record_products(snapshots, source='refresh')
+
+    output = DataSaver.save_price_snapshot(snapshots)
+    metrics.write()
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="只刷新已知ASIN的价格和可用性，生成价格快照文件")
+    parser.add_argument("asins", nargs="*", help="要刷新的ASIN")
+    parser.add_argument("--file", help="ASIN列表文件，每行一个")
+    parser.add_argument("--export", nargs="+", help="从之前的导出文件（原始CSV或WooCommerce导入文件）读取ASIN")
+    parser.add_argument("--workers", type=int, help="并行进程数，默认MAX_WORKERS")
+    args = parser.parse_args()
+
+    asins = list(args.asins)
+    if args.file:
+        asins += read_asin_file(args.file)
+    if args.export:
+        from recrawl_scheduler import read_export_asins
+        asins += list(read_export_asins(args.export))
+    if not asins:
+        parser.error("no ASINs given")
+
+    output = run_refresh(asins, args.workers)
+    if output:
+        print(f"Price snapshot written to: {output}")
@@ -0,0 +1,164 @@
+import sys
+
+# 采集结果的紧凑商品记录
+#   - 价格以分为单位的整数保存，评分为浮点数，评论数为整数，缺失值统一为None（不再使用 'N/A' 字符串）
+#   - 类别和可用性在同一批商品中大量重复，使用驻留字符串共享同一对象
+#   - __slots__ 没有每个实例的 __dict__；只保留实际会被填充的价格字段（原先嵌套的
+#     deal_price、price_range、prime_price 等从未被赋值）
+#   - to_row() 按 COLUMNS 顺序返回带类型的元组，DataSaver 直接构造表格，无需再次解析价格文本
+
+
+def to_cents(value):
+    """'12.99'、12.99 或 'N/A' 转换为以分为单位的整数，缺失时返回None"""
+    if value is None or value == 'N/A' or value == '':
+        return None
+    try:
+        return int(round(float(value) * 100))
+    except (TypeError, ValueError):
+        return None
+
+
+def format_cents(cents):
+    """以分为单位的整数格式化为两位小数的价格文本，缺失时返回空字符串"""
+    if cents is None:
+        return ''
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def _missing(value):
+    """'N/A' 和空字符串统一为None"""
+    return None if value == 'N/A' or value == '' else value
+
+
+def _intern(value):
+    value = _missing(value)
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _number(value, kind):
+    value = _missing(value)
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentage(value):
+    """折扣百分比可能带小数（'13.4'），整数值保存为int，其余为float"""
+    value = _number(value, float)
+    return int(value) if value is not None and value.is_integer() else value
+
+
+class ProductRecord:
+    """一个商品的采集结果"""
+
+    __slots__ = (
+        'url', 'asin', 'title', 'brand', 'category', 'availability', 'description',
+        'image_url', 'images', 'variants', 'sizes', 'colors',
+        'current_price', 'original_price', 'savings_amount', 'savings_percentage',
+        'rating', 'review_count', 'timestamp', 'field_timings', 'image_file',
+    )
+
+    # to_row() 的列，价格列为浮点数（元）
+    COLUMNS = (
+        'asin', 'title', 'brand', 'current_price', 'original_price', 'savings_amount', 'savings_percentage',
+        'rating', 'review_count', 'availability', 'description', 'image_url', 'url', 'category', 'scraped_at',
+    )
+
+    def __init__(self, url=None, asin=None, title=None, brand=None, category=None, availability=None,
+                 description=None, image_url=None, images=(), variants=(), sizes=None, colors=None,
+                 current_price=None, original_price=None, savings_amount=None, savings_percentage=None,
+                 rating=None, review_count=None, timestamp=None, field_timings=None, image_file=None):
+        self.url = url
+        self.asin = asin
+        self.title = title
+        self.brand = brand
+        self.category = _intern(category)
+        self.availability = _intern(availability)
+        self.description = description
+        self.image_url = image_url
+        self.images = tuple(images or ())
+        self.variants = list(variants or ())
+        self.sizes = sizes
+        self.colors = colors
+        self.current_price = current_price
+        self.original_price = original_price
+        self.savings_amount = savings_amount
+        self.savings_percentage = savings_percentage
+        self.rating = rating
+        self.review_count = review_count
+        self.timestamp = timestamp
+        self.field_timings = field_timings
+        self.image_file = image_file
+
+    @classmethod
+    def from_product(cls, product):
+        """从旧格式的商品字典（嵌套价格、'N/A' 表示缺失）创建记录，价格文本只在这里解析一次"""
+        price = product.get('price') or {}
+        savings = price.get('savings') or {}
+        return cls(
+            url=product.get('url'),
+            asin=_missing(product.get('asin')),
+            title=_missing(product.get('title')),
+            brand=_missing(product.get('brand')),
+            category=product.get('category'),
+            availability=product.get('availability'),
+            description=_missing(product.get('description')),
+            image_url=_missing(product.get('image_url')),
+            images=product.get('images'),
+            variants=product.get('variants'),
+            sizes=product.get('sizes'),
+            colors=product.get('colors'),
+            current_price=to_cents(price.get('current_price')),
+            original_price=to_cents(price.get('original_price')),
+            savings_amount=to_cents(savings.get('amount')),
+            savings_percentage=_percentage(savings.get('percentage')),
+            rating=_number(product.get('rating'), float),
+            review_count=_number(product.get('review_count'), int),
+            timestamp=product.get('timestamp'),
+            field_timings=product.get('field_timings'),
+            image_file=product.get('image_file'),
+        )
+
+    @classmethod
+    def coerce(cls, product):
+        """记录原样返回，旧格式的字典转换为记录"""
+        return product if isinstance(product, cls) else cls.from_product(product)
+
+    def to_dict(self):
+        """可JSON序列化的字典（价格仍为分），用于在进程或节点之间传递"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict() 的逆操作，旧格式（含嵌套 price）的字典按 from_product 转换"""
+        if 'price' in data:
+            return cls.from_product(data)
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_row(self):
+        """按 COLUMNS 顺序返回带类型的一行"""
+        return (
+            self.asin, self.title, self.brand,
+            None if self.current_price is None else self.current_price / 100,
+            None if self.original_price is None else self.original_price / 100,
+            None if self.savings_amount is None else self.savings_amount / 100,
+            self.savings_percentage, self.rating, self.review_count, self.availability,
+            self.description, self.image_url, self.url, self.category, self.timestamp,
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+        # 跨进程传递后重新驻留
+        self.category = _intern(self.category)
+        self.availability = _intern(self.availability)
+
+    def __repr__(self):
+        return (f"ProductRecord(asin={self.asin!r}, price={format_cents(self.current_price) or None!r}, "
+                f"category={self.category!r})")
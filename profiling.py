@@ -0,0 +1,267 @@
+import os
+import re
+import io
+import sys
+import time
+import pstats
+import argparse
+import cProfile
+import functools
+import tracemalloc
+import importlib.util
+import multiprocessing as mp
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from config import ScraperConfig
+from logger import logger
+
+# 采集进程的性能分析（默认关闭）
+#   - 开启后每个进程每个类别写出一个分析文件：cProfile 的 .prof，或安装了
+#     pyinstrument 且 PROFILE_MODE=sampling 时的采样结果 .pyisession
+#   - PROFILE_MEMORY 开启时同时用 tracemalloc 记录内存分配（.tracemalloc 快照和 .mem.txt 摘要）
+#   - python profiling.py profiles/<运行ID> 将同一次运行的所有文件合并为一份排序报告
+
+_settings = {
+    'enabled': ScraperConfig.PROFILE_ENABLED,
+    'mode': ScraperConfig.PROFILE_MODE,
+    'memory': ScraperConfig.PROFILE_MEMORY,
+    'output_dir': ScraperConfig.PROFILE_DIR,
+}
+_active = None  # 当前进程中正在进行的分析
+
+MEMORY_TOP = 25
+
+
+def configure(**settings):
+    """修改分析设置，值为None的项保持不变"""
+    _settings.update({key: value for key, value in settings.items() if value is not None})
+
+
+def settings():
+    """当前的分析设置，传给进程池的 initializer 使子进程使用相同设置"""
+    return dict(_settings)
+
+
+def _slug(label):
+    """将类别URL转换为文件名：优先使用搜索关键词"""
+    parsed = urlparse(label)
+    text = (parse_qs(parsed.query).get('k') or [parsed.path or label])[0]
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-')[:60] or 'task'
+
+
+class ProfileSession:
+    """一次任务的性能分析，结束时写出分析文件"""
+
+    def __init__(self, label, mode, memory, output_dir):
+        self.label = label
+        self.memory = memory
+        self.output_dir = output_dir
+        self.profiler = None  # cProfile.Profile
+        self.sampler = None   # pyinstrument.Profiler
+        self._thread_profilers = []
+        self._started_tracemalloc = False
+
+        if mode == 'sampling':
+            if importlib.util.find_spec('pyinstrument') is not None:
+                from pyinstrument import Profiler
+                self.sampler = Profiler(interval=0.001)
+            else:
+                logger.warning("pyinstrument is not installed, falling back to cProfile")
+        if self.sampler is None:
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(ScraperConfig.PROFILE_MEMORY_FRAMES)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+        self._start_time = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.start()
+        else:
+            self.profiler.enable()
+
+    def add_thread_profile(self, profiler):
+        self._thread_profilers.append(profiler)
+
+    def _base_path(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{mp.current_process().name}_{_slug(self.label)}_{time.strftime('%H%M%S')}"
+        return os.path.join(self.output_dir, re.sub(r'[^A-Za-z0-9_.-]+', '-', name))
+
+    def stop(self):
+        """停止分析并写出文件，返回写出的文件列表"""
+        if self.sampler is not None:
+            session = self.sampler.stop()
+        else:
+            self.profiler.disable()
+        elapsed = time.perf_counter() - self._start_time
+        base_path = self._base_path()
+        files = []
+
+        # 先取内存快照，不计入下面写分析文件时的分配
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ])
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot.dump(f"{base_path}.tracemalloc")
+            with open(f"{base_path}.mem.txt", 'w', encoding='utf-8') as fp:
+                fp.write(f"{self.label}\npeak traced memory: {peak / 1024 / 1024:.1f} MiB\n\n")
+                for stat in snapshot.statistics('lineno')[:MEMORY_TOP]:
+                    fp.write(f"{stat}\n")
+            files.extend([f"{base_path}.tracemalloc", f"{base_path}.mem.txt"])
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+        if self.sampler is not None:
+            session.save(f"{base_path}.pyisession")
+            files.append(f"{base_path}.pyisession")
+        else:
+            # 后台线程的调用记录合并到同一个文件中
+            stats = pstats.Stats(self.profiler)
+            for profiler in self._thread_profilers:
+                stats.add(profiler)
+            stats.dump_stats(f"{base_path}.prof")
+            files.append(f"{base_path}.prof")
+
+        logger.info(f"Profile for {self.label} ({elapsed:.1f}s) written to {base_path}.*")
+        return files
+
+
+@contextmanager
+def profile_session(label):
+    """在代码块执行期间进行性能分析，未开启时不做任何事"""
+    global _active
+    if not _settings['enabled'] or _active is not None:
+        yield
+        return
+
+    session = ProfileSession(label, _settings['mode'], _settings['memory'], _settings['output_dir'])
+    _active = session
+    session.start()
+    try:
+        yield
+    finally:
+        _active = None
+        try:
+            session.stop()
+        except Exception as e:
+            logger.error(f"Error writing profile for {label}: {str(e)}")
+
+
+def profiled(func):
+    """装饰采集任务：开启分析时以第一个参数（类别URL）为标签记录整个任务"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _settings['enabled']:
+            return func(*args, **kwargs)
+        label = str(args[0]) if args else func.__name__
+        with profile_session(label):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def thread_profile():
+    """在后台线程中使用，该线程的调用也计入当前任务的分析文件
+
+    cProfile 只记录开启它的线程，文本后处理等在后台线程中的工作需要单独记录。
+    Python 3.12 起 cProfile 基于 sys.monitoring，已覆盖所有线程，
+    且不能同时开启第二个分析器，此时直接跳过。
+    """
+    session = _active
+    if session is None or session.profiler is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        session.add_thread_profile(profiler)
+
+
+def _merge_cprofile(files, sort, limit):
+    stats = pstats.Stats(*files, stream=io.StringIO())
+    merged_path = os.path.join(os.path.dirname(files[0]), 'merged.prof')
+    stats.dump_stats(merged_path)  # 可用 snakeviz 等工具查看
+    stats.stream = io.StringIO()
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return f"cProfile: {len(files)} files, sorted by {sort} (merged stats: {merged_path})\n" \
+           f"{stats.stream.getvalue()}"
+
+
+def _merge_sampling(files):
+    if importlib.util.find_spec('pyinstrument') is None:
+        return f"Skipped {len(files)} pyinstrument sessions: pyinstrument is not installed\n"
+    from pyinstrument.session import Session
+    from pyinstrument.renderers import ConsoleRenderer
+    session = functools.reduce(Session.combine, (Session.load(path) for path in files))
+    return f"pyinstrument: {len(files)} sessions\n" \
+           f"{ConsoleRenderer(unicode=False, color=False).render(session)}"
+
+
+def _merge_memory(files, limit):
+    totals = {}  # 分配位置 -> [大小, 次数]
+    for path in files:
+        for stat in tracemalloc.Snapshot.load(path).statistics('lineno'):
+            total = totals.setdefault(str(stat.traceback), [0, 0])
+            total[0] += stat.size
+            total[1] += stat.count
+    ranked = sorted(totals.items(), key=lambda item: -item[1][0])[:limit]
+    lines = [f"tracemalloc: {len(files)} snapshots, allocations still held at task end"]
+    lines += [f"{size / 1024:>12.1f} KiB {count:>9} blocks  {where}" for where, (size, count) in ranked]
+    return '\n'.join(lines) + '\n'
+
+
+def merge_profiles(profile_dir, sort='cumulative', limit=40):
+    """将一个目录中所有进程、所有类别的分析文件合并为一份报告，写入 report.txt 并返回路径"""
+    names = sorted(os.listdir(profile_dir))
+    by_type = {
+        extension: [os.path.join(profile_dir, name) for name in names
+                    if name.endswith(extension) and name != 'merged.prof']
+        for extension in ('.prof', '.pyisession', '.tracemalloc')
+    }
+    if not any(by_type.values()):
+        logger.warning(f"No profile files found in {profile_dir}")
+        return None
+
+    sections = []
+    if by_type['.prof']:
+        sections.append(_merge_cprofile(by_type['.prof'], sort, limit))
+    if by_type['.pyisession']:
+        sections.append(_merge_sampling(by_type['.pyisession']))
+    if by_type['.tracemalloc']:
+        sections.append(_merge_memory(by_type['.tracemalloc'], limit))
+
+    report_path = os.path.join(profile_dir, 'report.txt')
+    with open(report_path, 'w', encoding='utf-8') as fp:
+        fp.write(('\n' + '=' * 80 + '\n').join(sections))
+    return report_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并采集进程的性能分析文件并输出排序报告")
+    parser.add_argument("profile_dir", help="一次运行的分析目录，如 profiles/20250101_120000")
+    parser.add_argument("--sort", default="cumulative", help="cProfile 排序字段：cumulative、tottime、ncalls 等")
+    parser.add_argument("--limit", type=int, default=40, help="报告中显示的条目数量")
+    args = parser.parse_args()
+
+    report = merge_profiles(args.profile_dir, args.sort, args.limit)
+    if report:
+        with open(report, encoding='utf-8') as fp:
+            print(fp.read())
+        print(f"Report written to: {report}")
+    else:
+        print("No profile files found.")
+        sys.exit(1)
@@ -0,0 +1,167 @@
+import os
+import time
+import queue
+import signal
+import threading
+import multiprocessing as mp
+from config import ScraperConfig
+from logger import logger
+
+# 采集进程向主进程报告进度的通道，以及停止请求
+#   - 子进程通过 report() 发送事件（开始任务、搜索完成、商品完成、页面加载、限流、浏览器进程号等）
+#   - 主进程的 RunControl 汇总事件，供界面显示每个进程的状态、吞吐量和预计剩余时间
+#   - 停止时设置共享的事件，子进程在商品之间和等待中检查，完成当前商品后保存已采集的部分
+# 未通过 init_worker_progress 接入时（如命令行运行）report() 不做任何事
+
+_progress_queue = None
+_cancel_event = None
+
+
+def init_worker_progress(progress_queue, cancel_event):
+    """进程池 initializer 中调用，接入主进程的进度队列和停止事件"""
+    global _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+
+
+def report(kind, **fields):
+    """向主进程报告一个进度事件"""
+    if _progress_queue is None:
+        return
+    try:
+        _progress_queue.put_nowait({'kind': kind, 'worker': mp.current_process().name,
+                                    'time': time.time(), **fields})
+    except Exception as e:
+        logger.debug(f"Error reporting progress: {str(e)}")
+
+
+def cancel_requested():
+    """主进程是否已请求停止"""
+    return _cancel_event is not None and _cancel_event.is_set()
+
+
+def wait(seconds):
+    """等待指定时间，收到停止请求时立即返回"""
+    if _cancel_event is None:
+        time.sleep(seconds)
+    else:
+        _cancel_event.wait(seconds)
+
+
+class RunControl:
+    """主进程一侧的进度汇总和停止控制，由界面创建后传给 main.main"""
+
+    def __init__(self, context=None):
+        context = context or mp
+        self.queue = context.Queue()
+        self.cancel_event = context.Event()
+        self.stop_deadline = None
+        self._lock = threading.Lock()
+        self.reset(0)
+
+    def reset(self, total_tasks):
+        """开始新的一次运行"""
+        with self._lock:
+            self.start_time = time.time()
+            self.total_tasks = total_tasks
+            self.workers = {}   # 进程名 -> 状态
+            self.tasks_done = 0
+            self.products_done = 0
+            self.products_failed = 0
+            self.searched_tasks = 0
+            self.known_products = 0  # 已完成搜索的任务的商品总数
+            self.pages = 0
+            self.throttled = 0
+            self.driver_pids = {}  # 进程名 -> 浏览器相关进程号
+
+    def worker_args(self):
+        """传给进程池 initializer 的参数"""
+        return self.queue, self.cancel_event
+
+    def request_stop(self, grace_period=None):
+        """请求停止：未开始的任务直接跳过，进行中的任务完成当前商品后保存已采集的部分"""
+        if self.cancel_event.is_set():
+            return
+        grace_period = ScraperConfig.STOP_GRACE_PERIOD if grace_period is None else grace_period
+        self.stop_deadline = time.time() + grace_period
+        self.cancel_event.set()
+        logger.warning(f"Stop requested, waiting up to {grace_period}s for in-flight products")
+
+    @property
+    def stopping(self):
+        return self.cancel_event.is_set()
+
+    def grace_expired(self):
+        return self.stop_deadline is not None and time.time() >= self.stop_deadline
+
+    def poll(self):
+        """取出队列中的所有事件并更新汇总状态"""
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            with self._lock:
+                self._apply(event)
+
+    def _apply(self, event):
+        kind, name = event['kind'], event['worker']
+        worker = self.workers.setdefault(name, {'status': 'starting', 'term': '', 'done': 0, 'total': None})
+        if kind == 'task_start':
+            worker.update(status='searching', term=event['term'], done=0, total=None)
+        elif kind == 'search_done':
+            worker.update(status='scraping', total=event['total'])
+            self.searched_tasks += 1
+            self.known_products += event['total']
+        elif kind == 'product':
+            worker['done'] += 1
+            self.products_done += 1
+            self.products_failed += not event['ok']
+        elif kind == 'page':
+            self.pages += 1
+        elif kind == 'throttled':
+            self.throttled += 1
+        elif kind == 'driver':
+            self.driver_pids[name] = event['pids']
+        elif kind == 'task_done':
+            worker['status'] = 'cancelled' if event['cancelled'] else ('done' if event['success'] else 'failed')
+            self.tasks_done += 1
+            self.driver_pids.pop(name, None)
+
+    def snapshot(self):
+        """当前的汇总状态，用于界面显示"""
+        self.poll()
+        with self._lock:
+            elapsed = max(time.time() - self.start_time, 1e-6)
+            # 未完成搜索的任务按每类最大商品数估算
+            expected = self.known_products + \
+                (self.total_tasks - self.searched_tasks) * ScraperConfig.MAX_PRODUCTS_PER_CATEGORY
+            remaining = max(expected - self.products_done, 0)
+            rate = self.products_done / elapsed
+            return {
+                'elapsed': elapsed,
+                'tasks_done': self.tasks_done,
+                'total_tasks': self.total_tasks,
+                'products_done': self.products_done,
+                'products_failed': self.products_failed,
+                'products_expected': expected,
+                'pages': self.pages,
+                'pages_per_min': self.pages / elapsed * 60,
+                'throttled': self.throttled,
+                'eta_seconds': remaining / rate if rate and not self.stopping else None,
+                'stopping': self.stopping,
+                'workers': {name: dict(worker) for name, worker in sorted(self.workers.items())},
+            }
+
+    def kill_drivers(self):
+        """强制结束仍在运行的 chromedriver 和浏览器进程（进程池被强制终止后调用）"""
+        self.poll()
+        with self._lock:
+            pids = [pid for worker_pids in self.driver_pids.values() for pid in worker_pids]
+            self.driver_pids.clear()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                logger.info(f"Killed browser process {pid}")
+            except OSError:
+                pass
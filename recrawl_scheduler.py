@@ -0,0 +1,334 @@
+import os
+import re
+import csv
+import math
+import time
+import sqlite3
+import argparse
+import functools
+import threading
+from config import ScraperConfig
+from logger import logger, get_log_queue
+from metrics import metrics
+from product_record import format_cents
+import profiling
+
+# 按价格变化频率安排的定期复查
+#   - 每个ASIN记录每次观察到的价格、原价和可用性，以及与上一次相比是否变化
+#   - 下次复查间隔自适应：发生变化时减半，未变化时逐步延长（在最小、最大间隔之间）
+#   - 每天的页面预算有限：到期的ASIN按“自上次检查以来已变化的概率”排序，
+#     优先复查最可能已过期的数据
+#   - ASIN来自开启 RECRAWL_TRACKING 的正常采集，或之前的导出文件
+#
+#   python recrawl_scheduler.py add output_excel/*.csv
+#   python recrawl_scheduler.py due --limit 20
+#   python recrawl_scheduler.py run
+
+_ASIN = re.compile(r'^[A-Z0-9]{10}$')
+
+
+class RecrawlScheduler:
+    """基于SQLite的ASIN变化历史和复查计划
+
+    正常采集的各进程和复查运行可以同时写入（WAL模式，写入时短暂加锁）。
+    """
+
+    def __init__(self, db_path=None, daily_budget=None):
+        self.db_path = db_path or ScraperConfig.RECRAWL_DB_PATH
+        self.daily_budget = daily_budget if daily_budget is not None else ScraperConfig.RECRAWL_DAILY_BUDGET
+        self.min_interval = ScraperConfig.RECRAWL_MIN_INTERVAL
+        self.max_interval = ScraperConfig.RECRAWL_MAX_INTERVAL
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self):
+        """打开数据库并创建所需的表"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS asins (
+            asin TEXT PRIMARY KEY,
+            category TEXT,
+            first_seen REAL NOT NULL,
+            last_checked REAL,
+            next_due REAL NOT NULL,
+            interval REAL NOT NULL,
+            checks INTEGER NOT NULL DEFAULT 0,
+            changes INTEGER NOT NULL DEFAULT 0,
+            current_price TEXT,
+            original_price TEXT,
+            availability TEXT)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS observations (
+            asin TEXT NOT NULL,
+            observed_at REAL NOT NULL,
+            source TEXT NOT NULL,            -- crawl（正常采集）或 recrawl（复查）
+            current_price TEXT,
+            original_price TEXT,
+            savings TEXT,
+            availability TEXT,
+            changed INTEGER NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS observations_time ON observations (observed_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS asins_due ON asins (next_due)')
+        return conn
+
+    def track(self, asins, category=None):
+        """加入新的ASIN（立即到期），已存在的不变，返回新增数量"""
+        now = time.time()
+        with self._lock:
+            added = 0
+            for asin in asins:
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO asins (asin, category, first_seen, next_due, interval) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (asin, category, now, now, ScraperConfig.RECRAWL_INITIAL_INTERVAL))
+                added += cursor.rowcount
+            return added
+
+    def record(self, product, source='recrawl', asin=None, category=None):
+        """记录一次观察结果并安排下次复查，返回价格或可用性是否变化
+
+        product 为 extract_product_info 或 extract_price_snapshot 返回的 ProductRecord；
+        提取失败（None）时需要指定 asin，该次页面照样计入预算，在最小间隔后重试。
+        历史中的价格保存为两位小数的文本，缺失值为 'N/A'。
+        """
+        now = time.time()
+        asin = product.asin if product else asin
+        if not asin or asin == 'N/A':
+            return False
+        observed, savings = (None, None, None), None
+        if product:
+            observed = (format_cents(product.current_price) or 'N/A', format_cents(product.original_price) or 'N/A',
+                        product.availability or 'N/A')
+            savings = 'N/A' if product.savings_percentage is None else str(product.savings_percentage)
+            category = category or product.category
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT * FROM asins WHERE asin = ?', (asin,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        'INSERT INTO asins (asin, category, first_seen, next_due, interval) VALUES (?, ?, ?, ?, ?)',
+                        (asin, category, now, now, ScraperConfig.RECRAWL_INITIAL_INTERVAL))
+                    row = self._conn.execute('SELECT * FROM asins WHERE asin = ?', (asin,)).fetchone()
+
+                previous = (row['current_price'], row['original_price'], row['availability'])
+                changed = bool(product) and row['checks'] > 0 and observed != previous
+                if not product:
+                    interval, next_due = row['interval'], now + self.min_interval
+                elif row['checks'] == 0:
+                    interval = row['interval']
+                    next_due = now + interval
+                else:
+                    factor = 0.5 if changed else ScraperConfig.RECRAWL_BACKOFF
+                    interval = min(max(row['interval'] * factor, self.min_interval), self.max_interval)
+                    next_due = now + interval
+
+                self._conn.execute(
+                    'UPDATE asins SET category = COALESCE(?, category), last_checked = ?, next_due = ?, '
+                    'interval = ?, checks = checks + ?, changes = changes + ?, '
+                    'current_price = ?, original_price = ?, availability = ? WHERE asin = ?',
+                    (category, now, next_due, interval, int(bool(product)), int(changed),
+                     *(observed if product else previous), asin))
+                self._conn.execute(
+                    'INSERT INTO observations (asin, observed_at, source, current_price, original_price, '
+                    'savings, availability, changed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (asin, now, source, observed[0], observed[1], savings, observed[2], int(changed)))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if changed:
+            metrics.inc('recrawl_changes')
+        return changed
+
+    def record_products(self, products, category=None, source='crawl'):
+        """记录一次正常采集的所有商品"""
+        for product in products:
+            try:
+                self.record(product, source=source, category=category)
+            except Exception as e:
+                logger.warning(f"Error recording price history for {product.asin}: {str(e)}")
+
+    def pages_used_today(self, now=None):
+        """今天（本地时间）复查已使用的页面数"""
+        now = now or time.time()
+        midnight = time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1))
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM observations WHERE source = 'recrawl' AND observed_at >= ?",
+                (midnight,)).fetchone()[0]
+
+    @staticmethod
+    def change_probability(row, now):
+        """自上次检查以来已发生变化的概率
+
+        按观察到的变化次数估算每秒的变化率（加0.5平滑，观察时间不足一个间隔时按一个间隔计），
+        假设变化为泊松过程：p = 1 - exp(-变化率 × 距上次检查的时间)。从未检查过的ASIN为1。
+        """
+        if not row['checks'] or row['last_checked'] is None:
+            return 1.0
+        span = max(row['last_checked'] - row['first_seen'], row['interval'])
+        rate = (row['changes'] + 0.5) / span
+        return 1 - math.exp(-rate * max(now - row['last_checked'], 0))
+
+    def due(self, limit=None, now=None):
+        """到期的ASIN，按变化概率从高到低排列，数量不超过今天剩余的预算"""
+        now = now or time.time()
+        remaining = max(self.daily_budget - self.pages_used_today(now), 0) if self.daily_budget else None
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM asins WHERE next_due <= ?', (now,)).fetchall()
+        ranked = sorted(({**dict(row), 'probability': self.change_probability(row, now)} for row in rows),
+                        key=lambda item: (-item['probability'], item['next_due']))
+        for limit_value in (remaining, limit):
+            if limit_value is not None:
+                ranked = ranked[:limit_value]
+        return ranked
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*) AS tracked, SUM(next_due <= ?) AS due, AVG(interval) AS avg_interval, '
+                'SUM(changes) AS changes, SUM(checks) AS checks FROM asins', (now,)).fetchone()
+        return {
+            'tracked': row['tracked'],
+            'due': row['due'] or 0,
+            'avg_interval_hours': round((row['avg_interval'] or 0) / 3600, 1),
+            'checks': row['checks'] or 0,
+            'changes': row['changes'] or 0,
+            'pages_used_today': self.pages_used_today(now),
+            'daily_budget': self.daily_budget,
+        }
+
+
+def read_export_asins(paths):
+    """从导出文件（原始CSV或WooCommerce导入文件）中读取ASIN和类别"""
+    asins = {}
+    for path in paths:
+        with open(path, encoding='utf-8-sig', newline='') as fp:
+            for row in csv.DictReader(fp):
+                sku = (row.get('SKU') or '').strip()
+                if _ASIN.match(sku):
+                    asins.setdefault(sku, (row.get('Category') or row.get('Categories') or '').split(',')[0] or None)
+    return asins
+
+
+def recrawl_chunk(items, price_only=False):
+    """采集进程中复查一组ASIN，返回 (ASIN, 商品信息) 列表和本进程的指标
+
+    price_only 时只读取价格和可用性（extract_price_snapshot），页面之间同样随机等待。
+    """
+    from driver_manager import DriverManager
+    from scraper import AmazonScraper
+
+    results = []
+    driver_manager = DriverManager()
+    try:
+        driver_manager.setup_driver(ScraperConfig.HEADLESS)
+        scraper = AmazonScraper(driver_manager)
+        for i, item in enumerate(items, 1):
+            scraper.category_name = item['category']
+            url = f"{ScraperConfig.BASE_URL}/dp/{item['asin']}"
+            with metrics.timer('recrawl_product'):
+                product = scraper.extract_price_snapshot(url) if price_only else scraper.extract_product_info(url)
+            results.append((item['asin'], item['category'], product))
+            if i < len(items):
+                scraper.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+    except Exception as e:
+        logger.error(f"Error recrawling: {str(e)}")
+    finally:
+        driver_manager.quit()
+    return results, metrics.snapshot(reset=True)
+
+
+def run_recrawl(limit=None, max_workers=None, price_only=False):
+    """复查到期的ASIN，记录变化并生成导出文件，返回导出文件路径
+
+    price_only 时只刷新价格和可用性，结果写入价格快照文件而不是WooCommerce导入文件。
+    """
+    from parallel_scraper import ParallelScraper, get_mp_context
+    from data_saver import DataSaver
+    from finalExcel import process_excel
+
+    scheduler = RecrawlScheduler()
+    due = scheduler.due(limit)
+    if not due:
+        logger.info(f"No ASINs due for recrawl ({scheduler.stats()})")
+        return None
+
+    workers = max(min(max_workers or ScraperConfig.MAX_WORKERS, len(due)), 1)
+    chunks = [[{'asin': row['asin'], 'category': row['category'] or 'Recrawl'} for row in due[i::workers]]
+              for i in range(workers)]
+    logger.info(f"Recrawling {len(due)} due ASINs with {workers} workers "
+                f"(budget used today: {scheduler.pages_used_today()}/{scheduler.daily_budget})")
+
+    start_time = time.time()
+    products, changed, failed = [], 0, 0
+    context = get_mp_context()
+    with context.Pool(workers, initializer=ParallelScraper.init_worker,
+                      initargs=(get_log_queue(context), profiling.settings())) as pool:
+        task = functools.partial(recrawl_chunk, price_only=price_only)
+        for results, snapshot in pool.imap_unordered(task, chunks):
+            metrics.merge(snapshot)
+            for asin, category, product in results:
+                changed += scheduler.record(product, asin=asin, category=category)
+                if product:
+                    products.append(product)
+                else:
+                    failed += 1
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start_time
+    logger.info(f"Recrawled {len(products)} products in {elapsed:.1f}s ({failed} failed), "
+                f"{changed} changed price or availability")
+    output = None
+    if products and price_only:
+        output = DataSaver.save_price_snapshot(products, 'recrawl')
+        logger.info(f"Recrawl price snapshot written to: {output}")
+    elif products:
+        output = process_excel(DataSaver.build_dataframe(products), DataSaver.FINAL_OUTPUT_DIR, 'recrawl')
+        logger.info(f"Recrawl export written to: {output}")
+    metrics.write()
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按价格变化频率复查已知ASIN，每天的页面数不超过预算")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="从导出文件中加入ASIN")
+    add.add_argument("files", nargs="+", help="DataSaver保存的CSV或WooCommerce导入文件")
+    due = subparsers.add_parser("due", help="列出到期的ASIN和变化概率")
+    due.add_argument("--limit", type=int, default=20)
+    run = subparsers.add_parser("run", help="复查到期的ASIN")
+    run.add_argument("--limit", type=int, help="本次最多复查的数量（另受每日预算限制）")
+    run.add_argument("--workers", type=int, help="并行进程数，默认MAX_WORKERS")
+    run.add_argument("--price-only", action="store_true", help="只刷新价格和可用性，生成价格快照文件")
+    subparsers.add_parser("stats", help="查看统计")
+    args = parser.parse_args()
+
+    scheduler = RecrawlScheduler()
+    if args.command == "add":
+        asins = read_export_asins(args.files)
+        by_category = {}
+        for asin, category in asins.items():
+            by_category.setdefault(category, []).append(asin)
+        added = sum(scheduler.track(items, category) for category, items in by_category.items())
+        print(f"Added {added} new ASINs ({len(asins)} found)")
+    elif args.command == "due":
+        now = time.time()
+        for row in scheduler.due(args.limit, now):
+            last = time.strftime('%Y-%m-%d %H:%M', time.localtime(row['last_checked'])) \
+                if row['last_checked'] else 'never'
+            print(f"{row['asin']}  p={row['probability']:.2f}  interval={row['interval'] / 3600:.1f}h  "
+                  f"changes={row['changes']}/{row['checks']}  last={last}  {row['category'] or ''}")
+    elif args.command == "run":
+        run_recrawl(args.limit, args.workers, args.price_only)
+    else:
+        for key, value in scheduler.stats().items():
+            print(f"{key}: {value}")
@@ -1,7 +1,7 @@
 import re
 import time
 import random
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
@@ -10,6 +10,16 @@ from selenium.webdriver.support.wait import WebDriverWait
 from config import ScraperConfig
 from logger import logger
 from data_saver import DataSaver
+from text_normalizer import (build_description, build_price_info, clean_price_text, normalize_brand,
+                             parse_rating, parse_review_count, truncate_to_last_complete_section)
+from post_processor import ProductPostProcessor, finalize_product
+from extraction_context import ExtractionContext
+from page_data import parse_page_data
+from image_pipeline import ImagePipeline
+from metrics import metrics
+from product_record import ProductRecord
+from search_cache import SearchCache
+import progress
 
 
 class AmazonScraper:
@@ -19,29 +29,109 @@ class AmazonScraper:
         self.wait = driver_manager.wait
         self.products = []
         self.category_name = None
-
-    def scroll_page(self):
-        """滚动页面以加载更多内容"""
+        self._context = None  # 当前商品页的字段提取上下文
+
+    # 在浏览器中滚动并等待内容加载（execute_async_script）：
+    #   - MutationObserver 监视页面变化，结果数量达到目标时立即返回
+    #   - 每次滚动后页面高度增长就继续滚动，SCROLL_SETTLE_TIME 内不再增长视为已到底部
+    #   - 达到最大滚动次数后不再滚动，但继续等待最后一次滚动触发的加载，直到高度稳定
+    #   - 整体不超过 SCROLL_TIMEOUT 秒
+    # 只等待页面本身的加载，不包含随机延迟；访问间隔由导航后和商品之间的 random_sleep 控制
+    _SCROLL_WAIT_SCRIPT = """
+        const selector = arguments[0], target = arguments[1], timeout = arguments[2],
+              settle = arguments[3], maxScrolls = arguments[4], done = arguments[arguments.length - 1];
+        const count = () => selector ? document.querySelectorAll(selector).length : 0;
+        const height = () => document.body.scrollHeight;
+        let scrolls = 0, lastHeight = height(), finished = false, quietTimer = null;
+
+        const finish = (reason) => {
+            if (finished) {
+                return;
+            }
+            finished = true;
+            observer.disconnect();
+            clearTimeout(deadline);
+            clearTimeout(quietTimer);
+            done({reason: reason, count: count(), height: height(), scrolls: scrolls});
+        };
+        const quiet = () => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(() => finish('stable'), settle);
+        };
+        const scroll = () => {
+            window.scrollTo(0, height());
+            scrolls++;
+            quiet();
+        };
+        const check = () => {
+            if (selector && count() >= target) {
+                finish('count');
+            } else if (height() > lastHeight) {
+                lastHeight = height();
+                if (scrolls < maxScrolls) {
+                    scroll();
+                } else {
+                    quiet();
+                }
+            }
+        };
+
+        const observer = new MutationObserver(check);
+        const deadline = setTimeout(() => finish('timeout'), timeout);
+        observer.observe(document.body, {childList: true, subtree: true});
+        if (selector && count() >= target) {
+            finish('count');
+        } else if (maxScrolls > 0) {
+            scroll();
+        } else {
+            quiet();
+        }
+    """
+
+    def scroll_page(self, selector=None, target=0, max_scrolls=None):
+        """滚动页面以加载更多内容
+
+        selector 匹配的元素达到 target 个、页面高度不再增长或超过 SCROLL_TIMEOUT 时返回，
+        返回浏览器中的结果 {'reason', 'count', 'height', 'scrolls'}，出错时返回None。
+        """
+        max_scrolls = ScraperConfig.SCROLL_STEPS if max_scrolls is None else max_scrolls
         try:
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
-            for _ in range(ScraperConfig.SCROLL_STEPS):
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            with metrics.timer('scroll_wait'):
+                result = self.driver.execute_async_script(
+                    self._SCROLL_WAIT_SCRIPT, selector, target, int(ScraperConfig.SCROLL_TIMEOUT * 1000),
+                    int(ScraperConfig.SCROLL_SETTLE_TIME * 1000), max_scrolls)
+            logger.debug(f"Scroll finished ({result['reason']}): {result['count']} results, "
+                         f"{result['scrolls']} scrolls")
+            return result
         except Exception as e:
             logger.warning(f"Error during page scroll: {str(e)}")
+            return None
 
     def random_sleep(self, min_time=None, max_time=None):
         """随机等待时间"""
         min_time = min_time or ScraperConfig.MIN_SLEEP
         max_time = max_time or ScraperConfig.MAX_SLEEP
         sleep_time = random.uniform(min_time, max_time)
-        time.sleep(sleep_time)
+        # 收到停止请求时立即结束等待
+        progress.wait(sleep_time)
+        metrics.observe('sleep', sleep_time)
+
+    def _field(self, name, extractor, default='N/A'):
+        """在当前商品页上下文中提取字段，没有上下文时直接提取"""
+        if self._context is None:
+            return extractor()
+        return self._context.get(name, extractor, default)
+
+    def _wait_timeout(self, timeout):
+        """元素等待时间，不超过当前商品剩余的时间预算"""
+        if self._context is None:
+            return timeout
+        return self._context.cap_timeout(timeout)
 
     def safe_find_element(self, by, selector, timeout=10):
+        timeout = self._wait_timeout(timeout)
+        if timeout <= 0:
+            return None
         try:
             element = WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_element_located((by, selector))
@@ -58,14 +148,20 @@ class AmazonScraper:
         """使用多个选择器和重试机制查找元素"""
         for _ in range(max_retries):
             for by_method, selector in selectors:
+                timeout = self._wait_timeout(ScraperConfig.WAIT_TIME)
+                if timeout <= 0:
+                    return None
+                wait = self.wait if timeout == ScraperConfig.WAIT_TIME else WebDriverWait(self.driver, timeout)
                 try:
-                    element = self.wait.until(
+                    element = wait.until(
                         EC.presence_of_element_located((getattr(By, by_method), selector))
                     )
                     if element and element.is_displayed():
                         return element
                 except:
                     continue
+            if self._context is not None and self._context.expired():
+                return None
             self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
         return None
 
@@ -155,49 +251,25 @@ class AmazonScraper:
         title_elem = self.find_element_with_retry(ScraperConfig.TITLE_SELECTORS)
         return self.get_text_safely(title_elem)
 
-    def _clean_price_text(self, price_text):
-        """清理价格文本"""
-        try:
-            if not price_text:
-                return 'N/A'
-
-            # 移除所有空白字符
-            price_text = ''.join(price_text.split())
+    def _get_product_price(self):
+        """获取商品所有价格相关信息"""
+        return build_price_info(self._get_raw_price())
 
-            # 确保有数字
-            if not re.search(r'\d', price_text):
-                return 'N/A'
+    def _get_page_source(self):
+        """获取页面源代码，同一商品页只传输一次"""
+        return self._field('page_source', lambda: self.driver.page_source, None)
 
-            # 提取价格数字（包括小数点）
-            price_match = re.search(r'(\d+\.?\d*)', price_text)
-            if price_match:
-                price = float(price_match.group(1))
-                return "{:.2f}".format(price)
+    def _get_page_data(self):
+        """解析页面中嵌入的结构化数据（价格、品牌、图片、变体）"""
+        return parse_page_data(self._get_page_source())
 
-            return 'N/A'
-        except:
-            return 'N/A'
+    def _get_raw_price(self, current=None):
+        """获取页面中的原始价格文本，解析由 build_price_info 完成
 
-    def _get_product_price(self):
-        """获取商品所有价格相关信息"""
+        current 为结构化数据中已取得的当前价格，此时不再通过选择器查找。
+        """
+        raw_price = {'current': current, 'original': None, 'savings': None, 'page_source': None}
         try:
-            price_info = {
-                'current_price': 'N/A',
-                'original_price': 'N/A',
-                'deal_price': 'N/A',
-                'price_range': {
-                    'min': 'N/A',
-                    'max': 'N/A'
-                },
-                'savings': {
-                    'amount': 'N/A',
-                    'percentage': 'N/A'
-                },
-                'prime_price': 'N/A',
-                'installment': 'N/A',
-                'coupon': 'N/A'
-            }
-
             # 1. 获取当前价格 - 更新选择器和提取逻辑
             current_price_script = """
                 function getCurrentPrice() {
@@ -231,9 +303,8 @@ class AmazonScraper:
                 return getCurrentPrice();
             """
 
-            current_price = self.driver.execute_script(current_price_script)
-            if current_price:
-                price_info['current_price'] = self._clean_price_text(current_price)
+            if not raw_price['current']:
+                raw_price['current'] = self.driver.execute_script(current_price_script)
 
             # 2. 获取原价/划线价 - 更新选择器
             original_price_script = """
@@ -257,9 +328,7 @@ class AmazonScraper:
                 return getOriginalPrice();
             """
 
-            original_price = self.driver.execute_script(original_price_script)
-            if original_price:
-                price_info['original_price'] = self._clean_price_text(original_price)
+            raw_price['original'] = self.driver.execute_script(original_price_script)
 
             # 3. 获取折扣信息
             savings_script = """
@@ -294,83 +363,83 @@ class AmazonScraper:
                 return getSavings();
             """
 
-            savings = self.driver.execute_script(savings_script)
-            if savings:
-                if savings['amount']:
-                    price_info['savings']['amount'] = self._clean_price_text(savings['amount'])
-                if savings['percentage']:
-                    percentage = re.search(r'(\d+(?:\.\d+)?)', savings['percentage'])
-                    if percentage:
-                        price_info['savings']['percentage'] = percentage.group(1)
-
-            # 如果没有找到当前价格，尝试从页面源代码中提取
-            if price_info['current_price'] == 'N/A':
+            raw_price['savings'] = self.driver.execute_script(savings_script)
+
+            # 如果没有找到当前价格，保留页面源代码用于提取
+            if clean_price_text(raw_price['current']) == 'N/A':
                 try:
-                    page_source = self.driver.page_source
-                    price_matches = re.findall(r'\"price\":\s*\"?\$?(\d+\.?\d*)\"?', page_source)
-                    if price_matches:
-                        price_info['current_price'] = self._clean_price_text(price_matches[0])
+                    raw_price['page_source'] = self._get_page_source()
                 except Exception as e:
                     logger.error(f"Error extracting price from page source: {str(e)}")
 
-            return price_info
-
         except Exception as e:
             logger.error(f"Error extracting price information: {str(e)}")
-            return {
-                'current_price': 'N/A',
-                'original_price': 'N/A',
-                'deal_price': 'N/A',
-                'price_range': {'min': 'N/A', 'max': 'N/A'},
-                'savings': {'amount': 'N/A', 'percentage': 'N/A'},
-                'prime_price': 'N/A',
-                'installment': 'N/A',
-                'coupon': 'N/A'
+            # 与逐项解析时一致，出错时不保留部分结果
+            return None
+
+        return raw_price
+
+    # 一次查询读取评分和评论数所在的节点，避免序列化整个页面的文本
+    _REVIEW_SUMMARY_SCRIPT = """
+        function text(selector) {
+            const element = document.querySelector(selector);
+            return element ? (element.getAttribute('title') || element.textContent || '').trim() : null;
+        }
+
+        const star = document.querySelector('#averageCustomerReviews i[class*="a-star-"]');
+        const summary = {
+            star_class: star ? star.className : null,
+            rating_text: text('#acrPopover') || text('#averageCustomerReviews .a-icon-alt') || text('.a-icon-alt'),
+            review_text: text('#acrCustomerReviewText') || text('[data-hook="total-review-count"]'),
+            fallback_text: null
+        };
+
+        // 专用节点不存在时只读取评分区域附近有限长度的文本
+        if (!summary.review_text) {
+            const region = document.querySelector('#averageCustomerReviews_feature_div')
+                || document.querySelector('#centerCol')
+                || document.querySelector('#ppd');
+            if (region) {
+                summary.fallback_text = (region.innerText || '').slice(0, arguments[0]);
             }
+        }
+        return summary;
+    """
 
-    def _get_product_rating(self):
+    def _get_review_summary(self):
+        """获取商品评分和评论数量"""
         try:
-            # 1. 尝试从星级图标类名中提取
-            star_elem = self.safe_find_element(By.CSS_SELECTOR, "[class*='a-size-base a-color-base']")
-            if star_elem:
-                class_name = star_elem.get_attribute('class')
-                star_match = re.search(r'a-star-(\d-\d|\d)', class_name)
-                if star_match:
-                    rating = star_match.group(1).replace('-', '.')
-                    return float(rating)
-
-            # 2. 备选方案:从评分文本中提取
-            rating_text = self.safe_find_element(By.CSS_SELECTOR, ".a-icon-alt")
-            if rating_text:
-                rating_match = re.search(r'([\d.]+) out of 5', rating_text.get_attribute('textContent'))
-                if rating_match:
-                    return float(rating_match.group(1))
-
-            return 'N/A'
+            summary = self.driver.execute_script(self._REVIEW_SUMMARY_SCRIPT, ScraperConfig.REVIEW_FALLBACK_CHARS)
         except Exception as e:
-            logger.error(f"Error extracting rating: {str(e)}")
-            return 'N/A'
+            logger.error(f"Error extracting review summary: {str(e)}")
+            return {'rating': 'N/A', 'review_count': 'N/A'}
+
+        summary = summary or {}
+        return {
+            'rating': parse_rating(summary.get('star_class'), summary.get('rating_text')),
+            'review_count': parse_review_count(summary.get('review_text'), summary.get('fallback_text')),
+        }
+
+    def _get_product_rating(self):
+        """获取商品评分"""
+        return self._get_review_summary()['rating']
 
     def _get_review_count(self):
         """获取商品评论数量"""
-        try:
-            page_text = self.driver.find_element(By.TAG_NAME, 'body').text
-            matches = re.findall(r'(\d+(?:,\d+)?)\s*(?:[^\d\n]*\s+)?ratings?', page_text)
-            if matches:
-                return int(matches[0].replace(',', ''))
-
-            return 'N/A'
-        except Exception as e:
-            logger.error(f"Error extracting review count: {str(e)}")
-            return 'N/A'
+        return self._get_review_summary()['review_count']
 
     def _get_product_description(self):
         """获取商品完整描述信息"""
         try:
-            description_parts = []
-            seen_content = set()  # 用于去重
+            return build_description(self._get_raw_description())
+        except Exception as e:
+            logger.error(f"Error getting product description: {str(e)}")
+            return 'N/A'
 
-            # 1. 使用 JavaScript 获取描述内容
+    def _get_raw_description(self):
+        """获取页面中的原始描述段落，清理和组合由 build_description 完成"""
+        try:
+            # 使用 JavaScript 获取描述内容
             js_script = """
                 function getDescription() {
                     let descriptions = [];
@@ -409,114 +478,12 @@ class AmazonScraper:
                 return getDescription();
             """
 
-            js_results = self.driver.execute_script(js_script)
-
-            # 2. 处理和清理描述内容
-            if js_results:
-                for result in js_results:
-                    if result['content'] and result['content'].strip():
-                        content = self._clean_description_text(result['content'])
-                        # 额外的过滤步骤
-                        content = self._filter_code_content(content)
-                        if content and content not in seen_content:
-                            description_parts.append(f"{result['type']}:\n{content}")
-                            seen_content.add(content)
-
-            # 3. 组合并格式化描述内容
-            if description_parts:
-                final_description = "\n\n".join(description_parts)
-                if len(final_description) > 32000:
-                    final_description = self._truncate_to_last_complete_section(final_description, 32000)
-                return final_description
-
-            return 'N/A'
+            return self.driver.execute_script(js_script) or []
 
         except Exception as e:
             logger.error(f"Error getting product description: {str(e)}")
-            return 'N/A'
-
-    def _filter_code_content(self, text):
-        """过滤掉代码内容"""
-        if not text:
             return None
 
-        try:
-            # 移除常见的代码标记
-            code_patterns = [
-                r'<script[\s\S]*?</script>',  # 移除JavaScript代码
-                r'<style[\s\S]*?</style>',  # 移除CSS代码
-                r'function\s*\w*\s*\{[\s\S]*?\}',  # 移除函数定义
-                r'var\s+\w+\s*=',  # 移除变量声明
-                r'\.[\w-]+\s*\{[^}]*\}',  # 移除CSS规则
-                r'/\*[\s\S]*?\*/',  # 移除多行注释
-                r'//.*',  # 移除单行注释
-                r'console\.log\(.*?\)',  # 移除console.log语句
-                r'document\..*?;',  # 移除document操作
-                r'window\..*?;',  # 移除window操作
-                r'\$\(.*?\)',  # 移除jQuery选择器
-            ]
-
-            # 应用所有过滤模式
-            for pattern in code_patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.MULTILINE)
-
-            # 移除空行和多余的空白
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            text = '\n'.join(lines)
-
-            # 如果文本看起来仍然像代码，返回None
-            code_indicators = [
-                'function(', 'return', 'var ', 'let ', 'const ', '=>',
-                '{', '}', ';', 'if(', 'for(', 'while('
-            ]
-            if any(indicator in text for indicator in code_indicators):
-                return None
-
-            return text.strip() if text else None
-
-        except Exception as e:
-            logger.warning(f"Error filtering code content: {str(e)}")
-            return text.strip() if text else None
-
-    def _clean_description_text(self, text):
-        """清理和格式化描述文本"""
-        if not text:
-            return None
-
-        try:
-            # 基本清理
-            text = text.strip()
-            # 替换多个空白字符为单个空格
-            text = re.sub(r'\s+', ' ', text)
-            # 替换多个换行为双换行
-            text = re.sub(r'\n\s*\n\s*\n*', '\n\n', text)
-            # 移除特殊字符但保留基本标点
-            text = re.sub(r'[^\w\s.,;:!?()\'"\-–—/\n]', '', text)
-            # 移除重复的标点符号
-            text = re.sub(r'([.,!?])\1+', r'\1', text)
-            # 确保段落之间有适当的间距
-            text = re.sub(r'([.!?])\s*(\w)', r'\1\n\2', text)
-
-            # 移除常见的无用文本
-            useless_patterns = [
-                r'Read more',
-                r'Show more',
-                r'See more',
-                r'Click to open expanded view',
-                r'Scroll left/right to see more',
-                r'Roll over image to zoom in',
-            ]
-            for pattern in useless_patterns:
-                text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-
-            # 最终清理
-            text = text.strip()
-            return text if text else None
-
-        except Exception as e:
-            logger.warning(f"Error cleaning description text: {str(e)}")
-            return text.strip() if text else None
-
     def _get_content_type(self, element):
         """获取描述内容的类型"""
         try:
@@ -555,18 +522,7 @@ class AmazonScraper:
 
     def _truncate_to_last_complete_section(self, text, max_length):
         """在不切断段落的情况下截断文本"""
-        if len(text) <= max_length:
-            return text
-
-        # 找到最后一个完整段落的位置
-        last_paragraph = max_length
-        for separator in ['\n\n', '. ', '! ', '? ']:
-            pos = text.rfind(separator, 0, max_length)
-            if pos > 0:
-                last_paragraph = pos + len(separator)
-                break
-
-        return text[:last_paragraph].strip()
+        return truncate_to_last_complete_section(text, max_length)
 
     def _get_product_image(self):
         """获取商品主图"""
@@ -580,62 +536,29 @@ class AmazonScraper:
 
     def _get_product_brand(self):
         """获取商品品牌"""
+        raw_brand = self._get_raw_brand()
+        brand = normalize_brand(raw_brand['text'], raw_brand['url'])
+        if brand == 'N/A':
+            # 尝试从页面标题中提取品牌
+            try:
+                brand = normalize_brand(None, None, self._field('title', self._get_product_title))
+            except Exception as e:
+                logger.warning(f"Error getting brand: {str(e)}")
+        return brand
+
+    def _get_raw_brand(self):
+        """获取品牌元素的原始文本和链接，清理由 normalize_brand 完成"""
+        raw_brand = {'text': None, 'url': None}
         try:
             brand_elem = self.find_element_with_retry(ScraperConfig.BRAND_SELECTORS)
             if brand_elem:
-                brand_text = self.get_text_safely(brand_elem)
-                if brand_text and brand_text != 'N/A':
-                    # 改进品牌文本清理逻辑
-                    brand_text = brand_text.replace('Brand:', '').replace('Visit the', '').replace('Store', '')
-
-                    # 移除首尾的符号和空格
-                    brand_text = re.sub(r'^[^\w\s]+|[^\w\s]+$', '', brand_text)
-
-                    # 移除多余的空格和重复的词
-                    words = [word.strip() for word in brand_text.split() if word.strip()]
-                    # 移除每个词首尾的符号
-                    words = [re.sub(r'^[^\w]+|[^\w]+$', '', word) for word in words]
-
-                    # 移除重复的词并过滤掉空字符串
-                    unique_words = []
-                    for word in words:
-                        if word and word not in unique_words:
-                            unique_words.append(word)
-
-                    brand_text = ' '.join(unique_words).strip()
-                    if brand_text:
-                        return brand_text
-
-                # 如果上面的方法失败，尝试获取href属性中的品牌信息
-                brand_url = brand_elem.get_attribute('href')
-                if brand_url:
-                    brand_match = re.search(r'/stores/([^/]+)/', brand_url)
-                    if brand_match:
-                        brand_name = brand_match.group(1).replace('-', ' ').title()
-                        # 同样处理可能的重复和符号
-                        words = [word.strip() for word in brand_name.split() if word.strip()]
-                        words = [re.sub(r'^[^\w]+|[^\w]+$', '', word) for word in words]
-                        unique_words = []
-                        for word in words:
-                            if word and word not in unique_words:
-                                unique_words.append(word)
-                        brand_name = ' '.join(unique_words).strip()
-                        if brand_name:
-                            return brand_name
-
-            # 尝试从页面标题中提取品牌
-            title = self._get_product_title()
-            if title != 'N/A':
-                first_word = title.split()[0]
-                # 清理首个词的首尾符号
-                first_word = re.sub(r'^[^\w]+|[^\w]+$', '', first_word)
-                if len(first_word) > 2:  # 避免像"A"、"An"这样的词
-                    return first_word.strip()
-
+                raw_brand['text'] = self.get_text_safely(brand_elem)
+                # 文本中没有品牌时才需要读取链接
+                if normalize_brand(raw_brand['text']) == 'N/A':
+                    raw_brand['url'] = brand_elem.get_attribute('href')
         except Exception as e:
             logger.warning(f"Error getting brand: {str(e)}")
-
-        return 'N/A'
+        return raw_brand
 
     def _get_product_availability(self):
         """获取商品可用性状态"""
@@ -702,7 +625,7 @@ class AmazonScraper:
                 return availability.strip()
 
             # 3. 检查价格信息来推断可用性
-            price = self._get_product_price()
+            price = build_price_info(self._field('raw_price', self._get_raw_price, None))
             if price and price != 'N/A':
                 return 'In Stock'  # 如果有价格，很可能是在售的
 
@@ -754,6 +677,11 @@ class AmazonScraper:
         asin_match = re.search(r'/dp/([A-Z0-9]{10})', url)
         return asin_match.group(1) if asin_match else 'N/A'
 
+    def _cookie_domain(self):
+        """站点Cookie的域名，如 .amazon.com"""
+        host = urlparse(ScraperConfig.BASE_URL).hostname or ''
+        return '.' + host[4:] if host.startswith('www.') else host
+
     def _check_and_handle_throttling(self):
         """检查是否出现限流信息并处理"""
         try:
@@ -761,19 +689,27 @@ class AmazonScraper:
             page_source = self.driver.page_source
             if throttle_text in page_source:
                 logger.warning("Detected throttling message, attempting to refresh...")
+                metrics.inc('throttled')
+                progress.report('throttled')
                 return True
             return False
         except Exception as e:
             logger.error(f"Error checking throttling: {str(e)}")
             return False
 
-    def _handle_page_with_retry(self, url, max_retries=10):
-        """处理页面加载，包含重试逻辑"""
+    def _handle_page_with_retry(self, url, max_retries=10, settle=True):
+        """处理页面加载，包含重试逻辑
+
+        settle=False 时导航后不做随机等待，由调用方等待具体的就绪标记。
+        """
         retries = 0
         while retries < max_retries:
+            if progress.cancel_requested():
+                return False
             try:
                 if retries > 0:
                     logger.info(f"Retry attempt {retries}/{max_retries}")
+                    metrics.inc('navigation_retries')
 
                 # 添加请求头设置
                 self.driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {
@@ -785,9 +721,9 @@ class AmazonScraper:
 
                 # 设置 Cookie 强制使用美国站点
                 self.driver.execute_script("""
-                    document.cookie = "i18n-prefs=USD; domain=.amazon.com; path=/";
-                    document.cookie = "lc-main=en_US; domain=.amazon.com; path=/";
-                """)
+                    document.cookie = "i18n-prefs=USD; domain=" + arguments[0] + "; path=/";
+                    document.cookie = "lc-main=en_US; domain=" + arguments[0] + "; path=/";
+                """, self._cookie_domain())
 
                 # 确保使用美国亚马逊域名
                 if isinstance(url, dict):
@@ -800,18 +736,19 @@ class AmazonScraper:
                 url_str = url_str.replace('amazon.co.jp', 'amazon.com')
                 url_str = url_str.replace('amazon.co.uk', 'amazon.com')
 
-                logger.info(f"Attempting to navigate to URL: {url_str}")
+                logger.debug(f"Attempting to navigate to URL: {url_str}")
                 self.driver.get(url_str)
 
                 # 检查并处理地区重定向
                 current_url = self.driver.current_url
-                if 'amazon.com' not in current_url or '/gp/switch-language' in current_url:
+                if urlparse(ScraperConfig.BASE_URL).netloc not in current_url or '/gp/switch-language' in current_url:
                     logger.warning("Detected region/language redirect, attempting to force US site...")
-                    self.driver.get('https://www.amazon.com/?language=en_US')
+                    self.driver.get(f'{ScraperConfig.BASE_URL}/?language=en_US')
                     self.driver.get(url_str)
 
-                logger.info("Successfully navigated to URL")
-                self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+                logger.debug("Successfully navigated to URL")
+                if settle:
+                    self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
 
                 if self._check_and_handle_throttling():
                     logger.info("Throttling detected, will retry...")
@@ -819,6 +756,7 @@ class AmazonScraper:
                     self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
                     continue
 
+                progress.report('page')
                 return True
 
             except Exception as e:
@@ -832,10 +770,127 @@ class AmazonScraper:
 
     def extract_product_info(self, url):
         """提取商品详细信息"""
+        return finalize_product(self.extract_raw_product_info(url))
+
+    # 价格刷新模式的就绪标记：价格或可用性区域出现即可读取
+    _PRICE_READY_SELECTOR = ('.a-price .a-offscreen, .apexPriceToPay .a-offscreen, #priceblock_ourprice, '
+                             '#availability, #outOfStock')
+
+    # 一次查询读取价格、原价、折扣和可用性，选择器与 _get_raw_price、_get_product_availability 相同
+    _PRICE_SNAPSHOT_SCRIPT = """
+        function first(selectors) {
+            for (const selector of selectors) {
+                const element = document.querySelector(selector);
+                if (element) {
+                    return element.textContent.trim();
+                }
+            }
+            return null;
+        }
+
+        let current = first([
+            '.a-price .a-offscreen',
+            '.apexPriceToPay .a-offscreen',
+            '.a-price[data-a-size="l"] .a-offscreen',
+            '#priceblock_ourprice',
+            '#priceblock_dealprice',
+            '.a-price:not([data-a-strike="true"]) .a-offscreen',
+            '.reinventPriceAccordionT2 .a-price .a-offscreen'
+        ]);
+        const whole = document.querySelector('.a-price-whole');
+        const fraction = document.querySelector('.a-price-fraction');
+        if (!current && whole && fraction) {
+            current = `$${whole.textContent.trim()}${fraction.textContent.trim()}`;
+        }
+
+        let availability = null;
+        const enabled = (selector) => {
+            const button = document.querySelector(selector);
+            return button && button.disabled !== true;
+        };
+        if (enabled('#add-to-cart-button') || enabled('#buy-now-button')
+                || document.querySelector('.a-price, #priceblock_ourprice, #price')) {
+            availability = 'In Stock';
+        } else if (document.querySelector('#outOfStock, .out-of-stock')) {
+            availability = 'Currently unavailable';
+        } else if (document.querySelector('#preOrderButton')) {
+            availability = 'Available for Pre-order';
+        } else {
+            availability = first(['#availability span', '#merchantInfoFeature', '#buybox-see-all-buying-choices']);
+        }
+
+        return {
+            current: current,
+            original: first([
+                '.a-text-price[data-a-strike="true"] .a-offscreen',
+                '.a-text-price .a-offscreen',
+                '#priceblock_listprice',
+                '.a-price[data-a-strike="true"] .a-offscreen',
+                '.a-text-strike'
+            ]),
+            savings: {
+                amount: first(['.savingsPercentage', '.priceBlockSavingsString']),
+                percentage: first(['.savingsPercentage'])
+            },
+            availability: availability
+        };
+    """
+
+    def extract_price_snapshot(self, url):
+        """价格刷新模式：只提取价格和可用性
+
+        不读取描述、品牌、图片和评论，导航后不做随机等待和滚动，只等待价格或可用性
+        区域出现（最多 REFRESH_READY_TIMEOUT 秒），再用一次脚本读取所有字段。
+        返回只填充价格、可用性和时间的 ProductRecord，提取失败时返回None。
+        """
         try:
-            if not self._handle_page_with_retry(url):
+            with metrics.timer('navigation'):
+                loaded = self._handle_page_with_retry(url, settle=False)
+            if not loaded:
+                metrics.inc('prices_failed')
                 return None
 
+            readiness_start = time.perf_counter()
+            try:
+                WebDriverWait(self.driver, ScraperConfig.REFRESH_READY_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self._PRICE_READY_SELECTOR))
+                )
+            except TimeoutException:
+                logger.warning(f"Price element not found for {url}, reading what is available")
+            metrics.observe('refresh_readiness_wait', time.perf_counter() - readiness_start)
+
+            with metrics.timer('field_price_snapshot'):
+                snapshot = self.driver.execute_script(self._PRICE_SNAPSHOT_SCRIPT)
+            raw_price = {'current': snapshot['current'], 'original': snapshot['original'],
+                         'savings': snapshot['savings'], 'page_source': None}
+            # 没有找到当前价格时才传输页面源代码
+            if clean_price_text(raw_price['current']) == 'N/A':
+                raw_price['page_source'] = self.driver.page_source
+
+            metrics.inc('prices_refreshed')
+            return ProductRecord.from_product({
+                'url': url,
+                'asin': self._extract_asin(url),
+                'price': build_price_info(raw_price),
+                'availability': (snapshot['availability'] or 'Status Unknown').strip(),
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            })
+
+        except Exception as e:
+            logger.error(f"Error extracting price snapshot from {url}: {str(e)}")
+            metrics.inc('prices_failed')
+            return None
+
+    def extract_raw_product_info(self, url):
+        """提取商品的原始信息，文本清理和解析由 finalize_product 完成"""
+        try:
+            with metrics.timer('navigation'):
+                loaded = self._handle_page_with_retry(url)
+            if not loaded:
+                metrics.inc('products_failed')
+                return None
+
+            readiness_start = time.perf_counter()
             # 等待页面主要内容加载
             self.wait.until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
@@ -855,37 +910,63 @@ class AmazonScraper:
 
             if not price_loaded:
                 logger.warning("Price element not found, proceeding anyway...")
+            metrics.observe('readiness_wait', time.perf_counter() - readiness_start)
 
             # 添加短暂滚动以触发动态内容加载
             self.driver.execute_script("window.scrollTo(0, 200)")
             self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
 
+            # 页面就绪后开始计时，所有字段共享同一个时间预算
+            context = self._context = ExtractionContext(ScraperConfig.PRODUCT_TIME_BUDGET)
+            no_review_summary = {'rating': 'N/A', 'review_count': 'N/A'}
+            review_summary = self._field('review_summary', self._get_review_summary, no_review_summary)
+
+            # 优先使用页面中嵌入的结构化数据，缺失的字段再通过DOM选择器获取
+            page_data = self._field('page_data', self._get_page_data, parse_page_data(None))
+            images = page_data['images']
+            if page_data['brand']:
+                self._field('raw_brand', lambda: {'text': page_data['brand'], 'url': None})
             product_info = {
                 'url': url,
                 'asin': self._extract_asin(url),
-                'title': self._get_product_title(),
-                'price': self._get_product_price(),
-                'rating': self._get_product_rating(),
-                'review_count': self._get_review_count(),
-                'description': self._get_product_description(),
-                'image_url': self._get_product_image(),
-                'brand': self._get_product_brand(),
-                'availability': self._get_product_availability(),
+                'title': self._field('title', self._get_product_title),
+                'raw_price': self._field('raw_price', lambda: self._get_raw_price(page_data['price']), None),
+                'rating': review_summary['rating'],
+                'review_count': review_summary['review_count'],
+                'raw_description': self._field('raw_description', self._get_raw_description, None),
+                'image_url': images[0] if images else self._field('image_url', self._get_product_image),
+                'images': images,
+                'variants': page_data['variants'],
+                'raw_brand': self._field('raw_brand', self._get_raw_brand, {'text': None, 'url': None}),
+                'availability': self._field('availability', self._get_product_availability),
                 'category': self.category_name,
-                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'field_timings': context.timings
             }
 
-            # 验证关键字段
-            if product_info['title'] == 'N/A' and product_info['price'] == 'N/A':
-                logger.warning(f"Failed to extract essential information for {url}")
-                return None
+            for name, elapsed in context.timings.items():
+                metrics.observe(f'field_{name}', elapsed)
+            metrics.inc('fields_skipped', len(context.skipped))
+            metrics.inc('products_extracted')
+
+            if context.skipped:
+                logger.warning(f"Time budget of {context.budget}s exhausted for {url}, "
+                               f"skipped fields: {', '.join(context.skipped)}")
+            slowest = max(context.timings, key=context.timings.get)
+            logger.debug(f"Field timings for {url}: " + ', '.join(
+                f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in context.timings.items()
+            ) + f" (slowest: {slowest})")
 
             return product_info
 
         except Exception as e:
             logger.error(f"Error extracting product info from {url}: {str(e)}")
+            metrics.inc('products_failed')
             return None
 
+        finally:
+            self._context = None
+
     def _get_category_name(self, category_url):
         """获取类别名称"""
         # 首先尝试从URL中提取类别名称
@@ -912,73 +993,117 @@ class AmazonScraper:
         return "Amazon_Bestsellers"
 
     def get_bestsellers(self, category_url=None):
-        """获取畅销商品列表"""
+        """获取畅销商品列表（按排名，最多 MAX_PRODUCTS_PER_CATEGORY 个）"""
         try:
-            url = category_url or "https://www.amazon.com/Best-Sellers/zgbs/"
-            if not self._handle_page_with_retry(url):
+            url = category_url or f"{ScraperConfig.BASE_URL}/Best-Sellers/zgbs/"
+            page = self.get_bestseller_page(url)
+            if page is None:
                 return []
 
-            # 执行页面滚动
-            self.scroll_page()
-
-            # 获取类别名称
-            self.category_name = self._get_category_name(category_url)
-
-            # 使用JavaScript获取所有产品链接及其排名
-            ranked_products = []
-            script = """
-                let products = [];
-                let rankElements = document.querySelectorAll('.zg-bdg-text, [class*="zg-badge-text"]');
-
-                rankElements.forEach(rankElem => {
-                    let rank = parseInt(rankElem.textContent.match(/\\d+/)[0]);
-                    let productCard = rankElem.closest('[class*="zg-item"], [class*="zg-grid-item"]');
-                    if (productCard) {
-                        let link = productCard.querySelector('a[href*="/dp/"]');
-                        if (link && link.href) {
-                            let match = link.href.match(/\/dp\/([A-Z0-9]{10})/);
-                            if (match) {
-                                products.push({
-                                    rank: rank,
-                                    url: 'https://www.amazon.com/dp/' + match[1]
-                                });
-                            }
-                        }
-                    }
-                });
-
-                // 按排名排序
-                products.sort((a, b) => a.rank - b.rank);
-                return products;
-            """
-
-            try:
-                ranked_products = self.driver.execute_script(script)
-            except Exception as e:
-                logger.error(f"Error executing JavaScript for ranked products: {str(e)}")
-                # 如果JavaScript方法失败，使用备选方法
-                ranked_products = self._get_ranked_products_fallback()
-
-            if not ranked_products:
-                logger.warning("No ranked products found with primary method, trying fallback...")
-                ranked_products = self._get_ranked_products_fallback()
-
-            # 确保结果按排名排序并限制数量
-            ranked_products = sorted(ranked_products, key=lambda x: x['rank'])[:ScraperConfig.MAX_PRODUCTS_PER_CATEGORY]
-
-            # 提取URL列表
-            unique_links = [product['url'] for product in ranked_products]
-
-            logger.info(f"Found {len(unique_links)} ranked products")
+            self.category_name = page['category']
+            ranked_products = page['products'][:ScraperConfig.MAX_PRODUCTS_PER_CATEGORY]
             for product in ranked_products:
                 logger.info(f"Rank {product['rank']}: {product['url']}")
-
-            return unique_links
+            return [product['url'] for product in ranked_products]
 
         except Exception as e:
             logger.error(f"Error getting bestsellers: {str(e)}")
             return []
 
+    # 畅销榜页面的排名商品（含标题和价格）和类别树中的子类别链接
+    _BESTSELLER_PAGE_SCRIPT = """
+        const products = [];
+        document.querySelectorAll('.zg-bdg-text, [class*="zg-badge-text"]').forEach(rankElem => {
+            const rankMatch = rankElem.textContent.match(/\\d+/);
+            const card = rankElem.closest('#gridItemRoot, [class*="zg-item"], [class*="zg-grid-item"]');
+            if (!rankMatch || !card) {
+                return;
+            }
+            const holder = card.querySelector('[data-asin]');
+            const link = card.querySelector('a[href*="/dp/"]');
+            const linkMatch = link && link.href.match(/\\/dp\\/([A-Z0-9]{10})/);
+            const asin = (holder && holder.getAttribute('data-asin')) || (linkMatch && linkMatch[1]);
+            if (!asin) {
+                return;
+            }
+            const title = card.querySelector('[class*="line-clamp"], .p13n-sc-truncated, img[alt]');
+            const price = card.querySelector('[class*="p13n-sc-price"], .a-price .a-offscreen, .a-color-price');
+            products.push({
+                rank: parseInt(rankMatch[0]),
+                asin: asin,
+                url: arguments[0] + '/dp/' + asin,
+                title: title ? (title.getAttribute('alt') || title.textContent).trim() : null,
+                price: price ? price.textContent.trim() : null
+            });
+        });
+
+        // 子类别是当前类别（树中选中的节点）之后嵌套的一组链接；节点地址是扁平的
+        // （/zgbs/<店铺>/<节点ID>），不能从路径判断父子关系
+        const subcategories = [];
+        if (arguments[1]) {
+            const selected = document.querySelector(
+                '[role="treeitem"] [class*="zg-selected"], #zg_browseRoot .zg_selected');
+            const item = selected && selected.closest('[role="treeitem"], li');
+            const group = item && item.nextElementSibling;
+            if (group && group.matches('[role="group"], ul')) {
+                group.querySelectorAll('a[href*="/zgbs/"]').forEach(link => {
+                    subcategories.push({name: link.textContent.trim(), url: link.href});
+                });
+            } else if (!selected) {
+                // 整站根页面没有选中的节点，树中只有各个店铺
+                document.querySelectorAll(
+                    '[role="treeitem"] a[href*="/zgbs/"], #zg_browseRoot a[href*="/zgbs/"]'
+                ).forEach(link => {
+                    subcategories.push({name: link.textContent.trim(), url: link.href});
+                });
+            }
+        }
+        return {products: products, subcategories: subcategories};
+    """
+
+    def get_bestseller_page(self, category_url, category_name=None):
+        """读取一个畅销榜类别的全部排名（BESTSELLER_PAGES 页，每页50名）和子类别链接
+
+        只读取榜单页面上的排名、ASIN、标题和价格，不打开商品页。同一类别内重复的ASIN保留最高排名。
+        返回 {'category', 'products', 'subcategories'}，页面加载失败时返回None。
+        """
+        products, subcategories = {}, []
+        base_url = category_url.split('?')[0]
+        for page in range(1, ScraperConfig.BESTSELLER_PAGES + 1):
+            page_url = base_url if page == 1 else f"{base_url}?pg={page}"
+            with metrics.timer('navigation'):
+                loaded = self._handle_page_with_retry(page_url)
+            if not loaded:
+                if page == 1:
+                    return None
+                break
+
+            # 榜单在滚动时才加载后半部分（每页50名）
+            self.scroll_page('.zg-bdg-text, [class*="zg-badge-text"]', 50)
+            if page == 1:
+                category_name = category_name or self._get_category_name(category_url)
+
+            try:
+                result = self.driver.execute_script(self._BESTSELLER_PAGE_SCRIPT, ScraperConfig.BASE_URL, page == 1)
+            except Exception as e:
+                logger.error(f"Error executing JavaScript for bestseller page: {str(e)}")
+                result = {'products': [dict(item, asin=self._extract_asin(item['url']), title=None, price=None)
+                                       for item in self._get_ranked_products_fallback()],
+                          'subcategories': []}
+
+            for item in result['products']:
+                if item['asin'] not in products or item['rank'] < products[item['asin']]['rank']:
+                    products[item['asin']] = item
+            if page == 1:
+                subcategories = result['subcategories']
+            if not result['products']:
+                break
+
+        ranked = sorted(products.values(), key=lambda item: item['rank'])
+        logger.info(f"Found {len(ranked)} ranked products and {len(subcategories)} category links "
+                    f"in {category_name}")
+        return {'category': category_name, 'products': ranked, 'subcategories': subcategories}
+
     def _get_ranked_products_fallback(self):
         """备选方法：使用传统的DOM遍历获取排名产品"""
         ranked_products = []
@@ -1020,7 +1145,7 @@ class AmazonScraper:
                             if match:
                                 ranked_products.append({
                                     'rank': rank,
-                                    'url': f'https://www.amazon.com/dp/{match.group(1)}'
+                                    'url': f'{ScraperConfig.BASE_URL}/dp/{match.group(1)}'
                                 })
 
                     except Exception as e:
@@ -1053,7 +1178,7 @@ class AmazonScraper:
     def get_search_results(self, search_url, max_retries=5):
         """获取搜索结果中的商品链接"""
         retry_count = 0
-        while retry_count < max_retries:
+        while retry_count < max_retries and not progress.cancel_requested():
             try:
                 if not self._handle_page_with_retry(search_url):
                     retry_count += 1
@@ -1103,7 +1228,7 @@ class AmazonScraper:
                                     if (!isSponsored) {
                                         products.push({
                                             rank: rank,
-                                            url: 'https://www.amazon.com/dp/' + asinMatch[1],
+                                            url: arguments[1] + '/dp/' + asinMatch[1],
                                             asin: asinMatch[1]
                                         });
                                     }
@@ -1117,10 +1242,11 @@ class AmazonScraper:
                         // 只返回指定数量的产品
                         return products.slice(0, arguments[0]);
                     }
-                    return getProducts(arguments[0]);
+                    return getProducts(arguments[0], arguments[1]);
                 """
 
-                product_links = self.driver.execute_script(script, ScraperConfig.MAX_PRODUCTS_PER_CATEGORY)
+                product_links = self.driver.execute_script(script, ScraperConfig.MAX_PRODUCTS_PER_CATEGORY,
+                                                           ScraperConfig.BASE_URL)
 
                 if not product_links:
                     logger.warning(
@@ -1164,36 +1290,25 @@ class AmazonScraper:
         logger.error(f"Failed to get search results after {max_retries} attempts")
         return []
 
+    def discover_products(self, search_url):
+        """搜索结果中的商品链接，缓存中有未过期的结果时不打开搜索页"""
+        cache = SearchCache()
+        product_links = cache.get(search_url)
+        if product_links is None:
+            with metrics.timer('search_results'):
+                product_links = self.get_search_results(search_url)
+            cache.put(search_url, product_links)
+        return product_links
+
     def _scroll_until_enough_results(self):
         """滚动页面直到获取足够数量的结果"""
-        max_scroll_attempts = 10
-        scroll_attempt = 0
-        previous_height = 0
-
-        while scroll_attempt < max_scroll_attempts:
-            # 获取当前有效的搜索结果数量
-            valid_results = len(self.driver.find_elements(By.CSS_SELECTOR,
-                                                          '[data-component-type="s-search-result"]:not([data-component-type="sp-sponsored-result"])'))
-
-            if valid_results >= ScraperConfig.MAX_PRODUCTS_PER_CATEGORY:
-                logger.info(f"Found enough results: {valid_results}")
-                break
-
-            # 滚动到页面底部
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
-
-            # 检查是否已经到达底部
-            current_height = self.driver.execute_script("return document.body.scrollHeight")
-            if current_height == previous_height:
-                logger.info("Reached bottom of page")
-                break
-
-            previous_height = current_height
-            scroll_attempt += 1
-
-            # 等待新内容加载
-            self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+        result = self.scroll_page(
+            '[data-component-type="s-search-result"]:not([data-component-type="sp-sponsored-result"])',
+            ScraperConfig.MAX_PRODUCTS_PER_CATEGORY, max_scrolls=10)
+        if result and result['reason'] == 'count':
+            logger.info(f"Found enough results: {result['count']}")
+        elif result:
+            logger.info(f"Reached bottom of page with {result['count']} results ({result['reason']})")
 
     def _get_search_results_fallback(self):
         """备用方法：使用多种选择器组合获取搜索结果"""
@@ -1231,7 +1346,7 @@ class AmazonScraper:
                                     asin = match.group(1)
                                     if not any(asin in p['url'] for p in products):
                                         products.append({
-                                            'url': f'https://www.amazon.com/dp/{asin}'
+                                            'url': f'{ScraperConfig.BASE_URL}/dp/{asin}'
                                         })
                         except:
                             continue
@@ -1258,7 +1373,7 @@ class AmazonScraper:
                             if match and match.group(1) not in seen_asins:
                                 seen_asins.add(match.group(1))
                                 products.append({
-                                    'url': f'https://www.amazon.com/dp/{match.group(1)}'
+                                    'url': f'{ScraperConfig.BASE_URL}/dp/{match.group(1)}'
                                 })
                     except:
                         continue
@@ -1272,27 +1387,81 @@ class AmazonScraper:
         """运行爬虫"""
         try:
             self.products = []
-            # 获取搜索结果中的商品链接
-            product_links = self.get_search_results(search_url)
+            # 获取搜索结果中的商品链接（最近搜索过的使用缓存）
+            product_links = self.discover_products(search_url)
 
             # 提取搜索关键词作为类别名称
             search_term = re.search(r'k=([^&]+)', search_url)
             self.category_name = unquote(search_term.group(1)).replace('+', ' ') if search_term else "Search_Results"
+            progress.report('search_done', total=len(product_links))
+
+            # 浏览器线程只提取原始数据，文本后处理在后台线程中与下一个商品的加载重叠进行
+            run_start = time.perf_counter()
+            extract_time = 0.0
+            post_processor = ProductPostProcessor()
+            # 主图在后台线程池中与采集同时下载
+            image_pipeline = ImagePipeline() if ScraperConfig.IMAGE_DOWNLOAD_ENABLED else None
+            try:
+                for i, link in enumerate(product_links, 1):
+                    # 收到停止请求时不再开始新的商品，已采集的部分照常保存
+                    if progress.cancel_requested():
+                        logger.warning(f"Stop requested, keeping {i - 1}/{len(product_links)} products "
+                                       f"for {self.category_name}")
+                        break
+                    logger.info(f"Scraping product {i}/{len(product_links)}: {link}")
+                    extract_start = time.perf_counter()
+                    raw_product = self.extract_raw_product_info(link)
+                    product_time = time.perf_counter() - extract_start
+                    extract_time += product_time
+                    metrics.observe('product', product_time)
+                    progress.report('product', ok=raw_product is not None)
+                    if raw_product and image_pipeline:
+                        image_pipeline.submit(raw_product['image_url'], raw_product['asin'])
+                    post_processor.submit(raw_product)
+                    if i < len(product_links):
+                        self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
+            finally:
+                self.products = post_processor.close()
+                if image_pipeline:
+                    image_pipeline.close()
+                    image_pipeline.attach(self.products)
+
+            stage_timings = {
+                'extract': extract_time,
+                'postprocess': post_processor.busy_time,
+                'wall': time.perf_counter() - run_start,
+            }
+            logger.info(
+                f"Stage timings for {self.category_name}: extract {stage_timings['extract']:.2f}s, "
+                f"post-process {stage_timings['postprocess']:.2f}s (overlapped), wall {stage_timings['wall']:.2f}s"
+            )
 
-            for i, link in enumerate(product_links, 1):
-                logger.info(f"Scraping product {i}/{len(product_links)}: {link}")
-                product = self.extract_product_info(link)
-                if product:
-                    self.products.append(product)
-                if i < len(product_links):
-                    self.random_sleep(ScraperConfig.MIN_SLEEP, ScraperConfig.MAX_SLEEP)
-
-            # 保存数据到Excel并获取保存的文件路径
-            saved_file_path = DataSaver.save_to_excel(self.products, self.category_name)
+            # 汇总各字段的提取耗时，便于找出占用时间预算的字段
+            field_timings = {}
+            for product in self.products:
+                for name, elapsed in (product.field_timings or {}).items():
+                    field_timings[name] = field_timings.get(name, 0.0) + elapsed
+            stage_timings['fields'] = field_timings
+            if field_timings:
+                logger.info("Field timings: " + ', '.join(
+                    f"{name} {elapsed:.2f}s" for name, elapsed in
+                    sorted(field_timings.items(), key=lambda item: item[1], reverse=True)
+                ))
+
+            # 转换为WooCommerce格式，中间CSV仅在调试时保存
+            dataframe = DataSaver.build_dataframe(self.products)
+            saved_file_path = None
+            if dataframe is not None and ScraperConfig.SAVE_INTERMEDIATE_CSV:
+                saved_file_path = DataSaver.save_dataframe(dataframe, self.category_name)
+            if ScraperConfig.PARQUET_ENABLED:
+                DataSaver.save_to_parquet(self.products, self.category_name)
             return {
                 'success': True,
                 'saved_file_path': saved_file_path,
-                'category_name': self.category_name
+                'dataframe': dataframe,
+                'category_name': self.category_name,
+                'stage_timings': stage_timings,
+                'cancelled': progress.cancel_requested()
             }
 
         except Exception as e:
@@ -1300,6 +1469,7 @@ class AmazonScraper:
             return {
                 'success': False,
                 'saved_file_path': None,
+                'dataframe': None,
                 'category_name': self.category_name
             }
 
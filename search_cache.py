@@ -0,0 +1,99 @@
+import os
+import re
+import json
+import time
+import hashlib
+from urllib.parse import urlparse, parse_qsl, urlencode, unquote_plus
+from config import ScraperConfig
+from logger import logger
+from metrics import metrics
+
+# 不影响搜索结果的跟踪参数，生成缓存键时忽略
+_TRACKING_PARAMS = {'ref', 'crid', 'sprefix', 'qid', 'dib', 'dib_tag', '_encoding', 'content-id', 'pd_rd_r',
+                    'pd_rd_w', 'pd_rd_wg', 'pf_rd_p', 'pf_rd_r'}
+_ASIN_IN_URL = re.compile(r'/dp/([A-Z0-9]{10})')
+
+
+class SearchCache:
+    """搜索结果的磁盘缓存
+
+    以规范化的搜索URL为键，保存排序后的ASIN列表和获取时间；每个键一个JSON文件，
+    写入临时文件后替换，多个采集进程同时读写不会读到不完整的文件。超过
+    SEARCH_CACHE_TTL 秒的结果视为过期，TTL 为0时不使用缓存。
+    """
+
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = cache_dir or ScraperConfig.SEARCH_CACHE_DIR
+        self.ttl = ScraperConfig.SEARCH_CACHE_TTL if ttl is None else ttl
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @staticmethod
+    def normalize_url(url):
+        """去掉跟踪参数、统一搜索词的大小写和空白，并按参数名排序"""
+        parsed = urlparse(url)
+        params = []
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True):
+            if name in _TRACKING_PARAMS:
+                continue
+            if name == 'k':
+                value = ' '.join(unquote_plus(value).lower().split())
+            params.append((name, value))
+        path = parsed.path.split('/ref=')[0].rstrip('/') or '/'
+        return f"{parsed.netloc.lower()}{path}?{urlencode(sorted(params))}"
+
+    def _path(self, url):
+        key = hashlib.sha1(self.normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url, max_products=None):
+        """未过期的缓存结果（商品链接列表），没有、过期或数量不足时返回None
+
+        缓存时的结果比当前需要的数量少，且当时的上限也比现在小（结果可能被截断）时视为未命中。
+        """
+        if not self.enabled:
+            return None
+        max_products = max_products or ScraperConfig.MAX_PRODUCTS_PER_CATEGORY
+        try:
+            with open(self._path(url), encoding='utf-8') as fp:
+                entry = json.load(fp)
+            age = time.time() - entry['fetched_at']
+            truncated = len(entry['asins']) < max_products and entry['max_products'] < max_products
+        except FileNotFoundError:
+            metrics.inc('search_cache_misses')
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable search cache entry for {url}: {str(e)}")
+            metrics.inc('search_cache_misses')
+            return None
+
+        if age > self.ttl or truncated:
+            metrics.inc('search_cache_misses')
+            return None
+
+        metrics.inc('search_cache_hits')
+        logger.info(f"Using cached search results for {url} ({len(entry['asins'])} products, "
+                    f"fetched {age / 60:.0f} min ago)")
+        return [f"{ScraperConfig.BASE_URL}/dp/{asin}" for asin in entry['asins'][:max_products]]
+
+    def put(self, url, links, max_products=None):
+        """保存一次搜索的商品链接（按搜索结果排序）"""
+        if not self.enabled or not links:
+            return
+        entry = {
+            'url': self.normalize_url(url),
+            'fetched_at': time.time(),
+            'max_products': max_products or ScraperConfig.MAX_PRODUCTS_PER_CATEGORY,
+            'asins': [match.group(1) for match in map(_ASIN_IN_URL.search, links) if match],
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as fp:
+                json.dump(entry, fp)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Error writing search cache for {url}: {str(e)}")
@@ -0,0 +1,273 @@
+import re
+
+# 描述文本规范化。输出与重构前依次应用各个正则的实现（保留在
+# benchmarks/bench_description.py 中作为参考）相同，但只需少量几次扫描：
+# 清理后的文本只剩下 [\w\s.,;:!?()'"\-–—/] 字符，且句末标点后紧跟
+# 单词时总会插入换行，因此大部分代码过滤模式不可能再命中，只有
+# 文本中出现 '//' 或 ';' 时才需要执行对应的模式。
+
+# 需要移除的特殊字符（基本标点以外）
+_DISALLOWED_CHARS = re.compile(r'[^\w\s.,;:!?()\'"\-–—/\n]')
+
+# 一段重复标点及其后的空白，一次替换完成标点去重和句末换行
+_PUNCT_RUN = re.compile(r'(?P<punct>[.,!?])(?P=punct)*(?P<space>\s*)')
+
+# 无用文本。'Scroll left/right to see more' 不在其中：逐个替换时 'See more'
+# 会先被移除。忽略大小写的多选正则在每个位置都要逐一尝试，速度较慢，
+# 这里把每个字母展开为区分大小写的字符集，匹配结果与 re.IGNORECASE 相同
+# （Unicode下 i/k/s 还分别等价于 İı/K/ſ）
+_CASE_EQUIVALENTS = {'i': 'İı', 'k': '\u212a', 's': 'ſ'}
+
+
+def _ignore_case_literal(phrase):
+    return ''.join(
+        f"[{ch}{ch.upper()}{_CASE_EQUIVALENTS.get(ch, '')}]" if ch.isalpha() else re.escape(ch)
+        for ch in phrase.lower()
+    )
+
+
+_NOISE = re.compile('|'.join(_ignore_case_literal(phrase) for phrase in [
+    'Read more', 'Show more', 'See more', 'Click to open expanded view', 'Roll over image to zoom in',
+]))
+# 小写副本中不包含这些关键词时不可能出现无用文本
+_NOISE_KEYWORDS = ('more', 'expanded', 'zoom')
+_WORD_CHAR = re.compile(r'\w')
+
+# 清理后仍可能命中的代码过滤模式
+_LINE_COMMENT = re.compile(r'//.*', re.IGNORECASE | re.MULTILINE)
+_DOCUMENT_CALL = re.compile(r'document\..*?;', re.IGNORECASE | re.MULTILINE)
+_WINDOW_CALL = re.compile(r'window\..*?;', re.IGNORECASE | re.MULTILINE)
+
+# 换行两侧的空格和空行
+_BLANK_LINES = re.compile(r' *\n[ \n]*')
+
+# 出现这些片段时认为文本仍然是代码
+_CODE_INDICATORS = re.compile('|'.join(re.escape(indicator) for indicator in [
+    'function(', 'return', 'var ', 'let ', 'const ', '=>',
+    '{', '}', ';', 'if(', 'for(', 'while('
+]))
+
+
+def _replace_punct_run(match):
+    """重复标点合并为一个，句末标点后接单词时换行"""
+    punct = match.group('punct')
+    if punct != ',' and _WORD_CHAR.match(match.string, match.end()):
+        return punct + '\n'
+    return punct + match.group('space')
+
+
+def normalize_description_text(text):
+    """清理一段商品描述并过滤代码内容，无有效内容时返回None"""
+    if not text:
+        return None
+
+    # 合并空白字符并移除特殊字符
+    text = _DISALLOWED_CHARS.sub('', ' '.join(text.split()))
+    text = _PUNCT_RUN.sub(_replace_punct_run, text)
+    lowered = text.lower()
+    if any(keyword in lowered for keyword in _NOISE_KEYWORDS):
+        text = _NOISE.sub('', text)
+    text = text.strip()
+    if not text:
+        return None
+
+    # 只有包含相应字符时才可能命中的代码模式
+    if '//' in text:
+        text = _LINE_COMMENT.sub('', text)
+    if ';' in text:
+        text = _DOCUMENT_CALL.sub('', text)
+        text = _WINDOW_CALL.sub('', text)
+
+    # 移除空行和每行首尾的空白
+    text = _BLANK_LINES.sub('\n', text).strip(' \n')
+
+    if not text or _CODE_INDICATORS.search(text):
+        return None
+    return text
+
+
+def truncate_to_last_complete_section(text, max_length):
+    """在不切断段落的情况下截断文本"""
+    if len(text) <= max_length:
+        return text
+
+    # 找到最后一个完整段落的位置
+    last_paragraph = max_length
+    for separator in ['\n\n', '. ', '! ', '? ']:
+        pos = text.rfind(separator, 0, max_length)
+        if pos > 0:
+            last_paragraph = pos + len(separator)
+            break
+
+    return text[:last_paragraph].strip()
+
+
+def build_description(sections, max_length=32000):
+    """将页面中提取的原始描述段落清理、去重并组合为最终描述"""
+    description_parts = []
+    seen_content = set()  # 用于去重
+    for section in sections or []:
+        if section['content'] and section['content'].strip():
+            content = normalize_description_text(section['content'])
+            if content and content not in seen_content:
+                description_parts.append(f"{section['type']}:\n{content}")
+                seen_content.add(content)
+
+    if not description_parts:
+        return 'N/A'
+
+    final_description = "\n\n".join(description_parts)
+    if len(final_description) > max_length:
+        final_description = truncate_to_last_complete_section(final_description, max_length)
+    return final_description
+
+
+_DIGIT = re.compile(r'\d')
+_PRICE_NUMBER = re.compile(r'(\d+\.?\d*)')
+
+
+def clean_price_text(price_text):
+    """从价格文本中提取数字并格式化为两位小数"""
+    try:
+        if not price_text:
+            return 'N/A'
+
+        # 移除所有空白字符
+        price_text = ''.join(price_text.split())
+
+        # 确保有数字
+        if not _DIGIT.search(price_text):
+            return 'N/A'
+
+        # 提取价格数字（包括小数点）
+        price_match = _PRICE_NUMBER.search(price_text)
+        if price_match:
+            return "{:.2f}".format(float(price_match.group(1)))
+
+        return 'N/A'
+    except Exception:
+        return 'N/A'
+
+
+_EDGE_SYMBOLS = re.compile(r'^[^\w\s]+|[^\w\s]+$')
+_WORD_EDGE_SYMBOLS = re.compile(r'^[^\w]+|[^\w]+$')
+_STORE_PATH = re.compile(r'/stores/([^/]+)/')
+
+
+def _unique_words(text):
+    """移除每个词首尾的符号以及重复的词"""
+    unique_words = []
+    for word in text.split():
+        word = _WORD_EDGE_SYMBOLS.sub('', word)
+        if word and word not in unique_words:
+            unique_words.append(word)
+    return ' '.join(unique_words).strip()
+
+
+def normalize_brand(brand_text, brand_url=None, title=None):
+    """根据品牌元素文本、品牌店铺链接或商品标题确定品牌名称"""
+    if brand_text and brand_text != 'N/A':
+        brand_text = brand_text.replace('Brand:', '').replace('Visit the', '').replace('Store', '')
+        # 移除首尾的符号和空格
+        brand_text = _unique_words(_EDGE_SYMBOLS.sub('', brand_text))
+        if brand_text:
+            return brand_text
+
+    # 尝试从品牌店铺链接中提取
+    if brand_url:
+        brand_match = _STORE_PATH.search(brand_url)
+        if brand_match:
+            brand_name = _unique_words(brand_match.group(1).replace('-', ' ').title())
+            if brand_name:
+                return brand_name
+
+    # 尝试从商品标题中提取
+    if title and title != 'N/A':
+        first_word = _WORD_EDGE_SYMBOLS.sub('', title.split()[0])
+        if len(first_word) > 2:  # 避免像"A"、"An"这样的词
+            return first_word.strip()
+
+    return 'N/A'
+
+
+_PRICE_IN_SOURCE = re.compile(r'\"price\":\s*\"?\$?(\d+\.?\d*)\"?')
+_PERCENTAGE = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def empty_price_info():
+    """所有价格字段均为N/A的价格信息"""
+    return {
+        'current_price': 'N/A',
+        'original_price': 'N/A',
+        'deal_price': 'N/A',
+        'price_range': {'min': 'N/A', 'max': 'N/A'},
+        'savings': {'amount': 'N/A', 'percentage': 'N/A'},
+        'prime_price': 'N/A',
+        'installment': 'N/A',
+        'coupon': 'N/A'
+    }
+
+
+def build_price_info(raw_price):
+    """将页面中提取的原始价格文本解析为价格信息"""
+    price_info = empty_price_info()
+    if not raw_price:
+        return price_info
+
+    if raw_price.get('current'):
+        price_info['current_price'] = clean_price_text(raw_price['current'])
+    if raw_price.get('original'):
+        price_info['original_price'] = clean_price_text(raw_price['original'])
+
+    savings = raw_price.get('savings')
+    if savings:
+        if savings.get('amount'):
+            price_info['savings']['amount'] = clean_price_text(savings['amount'])
+        if savings.get('percentage'):
+            percentage = _PERCENTAGE.search(savings['percentage'])
+            if percentage:
+                price_info['savings']['percentage'] = percentage.group(1)
+
+    # 如果没有找到当前价格，从页面源代码中提取
+    if price_info['current_price'] == 'N/A' and raw_price.get('page_source'):
+        price_match = _PRICE_IN_SOURCE.search(raw_price['page_source'])
+        if price_match:
+            price_info['current_price'] = clean_price_text(price_match.group(1))
+
+    return price_info
+
+
+_STAR_CLASS = re.compile(r'a-star-(\d-\d|\d)')
+_RATING_TEXT = re.compile(r'([\d.]+) out of 5')
+_REVIEW_NUMBER = re.compile(r'(\d[\d,]*)')
+# 千分位数字必须完整匹配，避免 '1,234,567 ratings' 被截断为 234567
+_REVIEW_IN_TEXT = re.compile(r'(?<![\d,.])(\d{1,3}(?:,\d{3})+|\d+)\s+(?:global\s+)?ratings?\b')
+
+
+def parse_rating(star_class, rating_text):
+    """从星级图标类名或 'x out of 5 stars' 文本中解析评分"""
+    try:
+        if star_class:
+            star_match = _STAR_CLASS.search(star_class)
+            if star_match:
+                return float(star_match.group(1).replace('-', '.'))
+        if rating_text:
+            rating_match = _RATING_TEXT.search(rating_text)
+            if rating_match:
+                return float(rating_match.group(1))
+    except ValueError:
+        pass
+    return 'N/A'
+
+
+def parse_review_count(review_text, fallback_text=None):
+    """从评论数节点文本（如 '1,234 ratings'）或评分区域文本中解析评论数量"""
+    if review_text:
+        number_match = _REVIEW_NUMBER.search(review_text)
+        if number_match:
+            return int(number_match.group(1).replace(',', ''))
+    if fallback_text:
+        review_match = _REVIEW_IN_TEXT.search(fallback_text)
+        if review_match:
+            return int(review_match.group(1).replace(',', ''))
+    return 'N/A'